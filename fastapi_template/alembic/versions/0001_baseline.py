@@ -0,0 +1,243 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+The schema as it was before the migrations existed, frozen here: later model
+changes go in new revisions. Databases created by the app before Alembic
+(create_all on startup) already have some or all of these tables, so each
+one is only created if missing; `alembic upgrade head` works on both.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "pipeline_checkpoints" not in existing:
+        op.create_table('pipeline_checkpoints',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+        )
+
+    if "search_query_rollups" not in existing:
+        op.create_table('search_query_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('query', sa.String(), nullable=False),
+        sa.Column('language', sa.String(), nullable=False),
+        sa.Column('window_start', sa.DateTime(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('query', 'language', 'window_start', name='uq_search_query_rollup')
+        )
+        op.create_index(op.f('ix_search_query_rollups_id'), 'search_query_rollups', ['id'], unique=False)
+
+    if "songs" not in existing:
+        op.create_table('songs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('artist', sa.String(), nullable=False),
+        sa.Column('youtube_id', sa.String(), nullable=True),
+        sa.Column('spotify_id', sa.String(), nullable=True),
+        sa.Column('duration', sa.Integer(), nullable=True),
+        sa.Column('language', sa.String(), nullable=True),
+        sa.Column('genre', sa.String(), nullable=True),
+        sa.Column('lyrics', sa.Text(), nullable=True),
+        sa.Column('thumbnail_url', sa.String(), nullable=True),
+        sa.Column('audio_features', sa.Text(), nullable=True),
+        sa.Column('view_count', sa.Integer(), nullable=True),
+        sa.Column('is_explicit', sa.Boolean(), nullable=True),
+        sa.Column('canonical_song_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['canonical_song_id'], ['songs.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_songs_canonical_song_id'), 'songs', ['canonical_song_id'], unique=False)
+        op.create_index(op.f('ix_songs_id'), 'songs', ['id'], unique=False)
+        op.create_index(op.f('ix_songs_spotify_id'), 'songs', ['spotify_id'], unique=True)
+        op.create_index(op.f('ix_songs_youtube_id'), 'songs', ['youtube_id'], unique=True)
+
+    if "spotify_youtube_links" not in existing:
+        op.create_table('spotify_youtube_links',
+        sa.Column('spotify_id', sa.String(), nullable=False),
+        sa.Column('youtube_id', sa.String(), nullable=True),
+        sa.Column('confidence', sa.Float(), nullable=True),
+        sa.Column('matched_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('spotify_id')
+        )
+        op.create_index(op.f('ix_spotify_youtube_links_youtube_id'), 'spotify_youtube_links', ['youtube_id'], unique=False)
+
+    if "translation_cache" not in existing:
+        op.create_table('translation_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('text_hash', sa.String(length=64), nullable=False),
+        sa.Column('source_lang', sa.String(), nullable=False),
+        sa.Column('target_lang', sa.String(), nullable=False),
+        sa.Column('translated_text', sa.Text(), nullable=False),
+        sa.Column('provider', sa.String(), nullable=True),
+        sa.Column('hit_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('text_hash', 'source_lang', 'target_lang', name='uq_translation_cache_key')
+        )
+        op.create_index(op.f('ix_translation_cache_id'), 'translation_cache', ['id'], unique=False)
+
+    if "users" not in existing:
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('full_name', sa.String(), nullable=True),
+        sa.Column('preferred_language', sa.String(), nullable=True),
+        sa.Column('role', sa.Enum('USER', 'ADMIN', 'MODERATOR', name='userrole'), nullable=True),
+        sa.Column('spotify_access_token', sa.Text(), nullable=True),
+        sa.Column('spotify_refresh_token', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_verified', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+        op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+
+    if "api_usage" not in existing:
+        op.create_table('api_usage',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('endpoint', sa.String(), nullable=False),
+        sa.Column('method', sa.String(), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('response_time', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_api_usage_id'), 'api_usage', ['id'], unique=False)
+
+    if "lyrics_fetch_leases" not in existing:
+        op.create_table('lyrics_fetch_leases',
+        sa.Column('song_id', sa.Integer(), nullable=False),
+        sa.Column('owner', sa.String(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['song_id'], ['songs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('song_id')
+        )
+
+    if "playlists" not in existing:
+        op.create_table('playlists',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('is_public', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_playlists_id'), 'playlists', ['id'], unique=False)
+
+    if "recommendations" not in existing:
+        op.create_table('recommendations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('song_id', sa.Integer(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('reason', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['song_id'], ['songs.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_recommendations_id'), 'recommendations', ['id'], unique=False)
+
+    if "search_query_log" not in existing:
+        op.create_table('search_query_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('query', sa.String(), nullable=False),
+        sa.Column('language', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_search_query_log_created_at'), 'search_query_log', ['created_at'], unique=False)
+        op.create_index(op.f('ix_search_query_log_id'), 'search_query_log', ['id'], unique=False)
+
+    if "song_fingerprint_buckets" not in existing:
+        op.create_table('song_fingerprint_buckets',
+        sa.Column('band', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.String(length=16), nullable=False),
+        sa.Column('song_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['song_id'], ['songs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('band', 'bucket', 'song_id')
+        )
+        op.create_index(op.f('ix_song_fingerprint_buckets_song_id'), 'song_fingerprint_buckets', ['song_id'], unique=False)
+
+    if "song_fingerprints" not in existing:
+        op.create_table('song_fingerprints',
+        sa.Column('song_id', sa.Integer(), nullable=False),
+        sa.Column('signature', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['song_id'], ['songs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('song_id')
+        )
+
+    if "playlist_songs" not in existing:
+        op.create_table('playlist_songs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('playlist_id', sa.Integer(), nullable=True),
+        sa.Column('song_id', sa.Integer(), nullable=True),
+        sa.Column('position', sa.Integer(), nullable=True),
+        sa.Column('added_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['playlist_id'], ['playlists.id'], ),
+        sa.ForeignKeyConstraint(['song_id'], ['songs.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_playlist_songs_id'), 'playlist_songs', ['id'], unique=False)
+
+    # Databases created before near-duplicate clustering have songs without
+    # canonical_song_id (it used to be added at startup)
+    if "songs" in existing:
+        columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("songs")}
+        if "canonical_song_id" not in columns:
+            # Plain ALTER (not batch mode): rebuilding songs on SQLite would drop the FTS triggers
+            op.execute(
+                "ALTER TABLE songs ADD COLUMN canonical_song_id INTEGER "
+                "REFERENCES songs (id) ON DELETE SET NULL"
+            )
+            op.create_index("ix_songs_canonical_song_id", "songs", ["canonical_song_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("playlist_songs")
+    op.drop_table("song_fingerprints")
+    op.drop_table("song_fingerprint_buckets")
+    op.drop_table("search_query_log")
+    op.drop_table("recommendations")
+    op.drop_table("playlists")
+    op.drop_table("lyrics_fetch_leases")
+    op.drop_table("api_usage")
+    op.drop_table("users")
+    op.drop_table("translation_cache")
+    op.drop_table("spotify_youtube_links")
+    op.drop_table("songs")
+    op.drop_table("search_query_rollups")
+    op.drop_table("pipeline_checkpoints")
@@ -0,0 +1,86 @@
+"""composite and partial indexes for the hot query shapes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+- songs (view_count DESC): /music/trending and admin popular songs
+- songs (language, view_count DESC): /music/trending?language=
+- songs (language, view_count DESC) WHERE youtube_id IS NOT NULL:
+  popular/diverse/similar-artist recommendations (only songs with a video)
+- songs (language, created_at) WHERE youtube_id IS NOT NULL: trending
+  recommendations (last 30 days)
+- playlists (owner_id), playlist_songs (playlist_id, song_id),
+  recommendations (user_id, song_id): the user history joins
+- api_usage (created_at, endpoint): admin usage stats by time window
+- search_query_rollups (language, window_start) and (window_start): top queries
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PLAYABLE_SONG = "youtube_id IS NOT NULL"
+
+
+def upgrade() -> None:
+    # if_not_exists: databases the app created (create_all on startup) after
+    # these indexes were added to the models already have them
+    op.create_index(
+        "ix_songs_view_count", "songs", [sa.text("view_count DESC")], if_not_exists=True
+    )
+    op.create_index(
+        "ix_songs_language_view_count", "songs", ["language", sa.text("view_count DESC")],
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_songs_playable_language_view_count", "songs", ["language", sa.text("view_count DESC")],
+        sqlite_where=sa.text(PLAYABLE_SONG), postgresql_where=sa.text(PLAYABLE_SONG),
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_songs_playable_language_created_at", "songs", ["language", "created_at"],
+        sqlite_where=sa.text(PLAYABLE_SONG), postgresql_where=sa.text(PLAYABLE_SONG),
+        if_not_exists=True
+    )
+    op.create_index("ix_playlists_owner_id", "playlists", ["owner_id"], if_not_exists=True)
+    op.create_index(
+        "ix_playlist_songs_playlist_id_song_id", "playlist_songs", ["playlist_id", "song_id"],
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_recommendations_user_id_song_id", "recommendations", ["user_id", "song_id"],
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_api_usage_created_at_endpoint", "api_usage", ["created_at", "endpoint"],
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_search_query_rollups_language_window_start", "search_query_rollups",
+        ["language", "window_start"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_search_query_rollups_window_start", "search_query_rollups", ["window_start"],
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_search_query_rollups_window_start", table_name="search_query_rollups")
+    op.drop_index("ix_search_query_rollups_language_window_start", table_name="search_query_rollups")
+    op.drop_index("ix_api_usage_created_at_endpoint", table_name="api_usage")
+    op.drop_index("ix_recommendations_user_id_song_id", table_name="recommendations")
+    op.drop_index("ix_playlist_songs_playlist_id_song_id", table_name="playlist_songs")
+    op.drop_index("ix_playlists_owner_id", table_name="playlists")
+    op.drop_index("ix_songs_playable_language_created_at", table_name="songs")
+    op.drop_index("ix_songs_playable_language_view_count", table_name="songs")
+    op.drop_index("ix_songs_language_view_count", table_name="songs")
+    op.drop_index("ix_songs_view_count", table_name="songs")
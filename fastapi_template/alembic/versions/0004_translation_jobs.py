@@ -0,0 +1,58 @@
+"""translation jobs stored in the database
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+
+Background translation jobs and their chunks move from worker memory to
+translation_jobs / translation_job_chunks, so any worker can serve their
+status and stream.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases the app created (create_all on startup) may already have them
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "translation_jobs" not in existing:
+        op.create_table('translation_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('source_lang', sa.String(), nullable=False),
+        sa.Column('target_lang', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_translation_jobs_finished_at'), 'translation_jobs', ['finished_at'], unique=False)
+
+    if "translation_job_chunks" not in existing:
+        op.create_table('translation_job_chunks',
+        sa.Column('job_id', sa.String(), nullable=False),
+        sa.Column('index', sa.Integer(), nullable=False),
+        sa.Column('source', sa.Text(), nullable=False),
+        sa.Column('translated', sa.Text(), nullable=True),
+        sa.Column('provider', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['translation_jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('job_id', 'index')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('translation_job_chunks')
+    op.drop_index(op.f('ix_translation_jobs_finished_at'), table_name='translation_jobs')
+    op.drop_table('translation_jobs')
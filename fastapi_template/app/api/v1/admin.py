@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from sqlalchemy import Select, func, desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime, timedelta
 
-from app.database import get_db
+from app.database import get_async_db, get_read_db, SessionLocal, engine, async_engine, replica_router, sqlite_profile
+from app.core.db_pool import pool_stats
+from app.core.sqlite_profile import write_gate
 from app.models.models import User, Song, Playlist, Recommendation, APIUsage, UserRole
 from app.schemas.schemas import (
     User as UserSchema, UserAdmin, UserRoleUpdate, AdminStats, 
     APIUsageStats, PaginatedResponse
 )
 from app.api.v1.auth import get_current_user
+from app.services.translation_cache import translation_cache
+from app.services.translation_materializer import translation_materializer
+from app.services.language_detector import language_detector
+from app.services.spotify_enrichment import spotify_enrichment
+from app.services.spotify_youtube_matcher import spotify_youtube_matcher
+from app.services.song_fingerprints import song_fingerprinter
+from app.services.query_log import query_log, search_warmer
+from fastapi.concurrency import run_in_threadpool
 
 router = APIRouter()
 
@@ -23,10 +33,21 @@ def get_admin_user(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
+async def count_rows(db: AsyncSession, model, *criteria) -> int:
+    return await db.scalar(select(func.count()).select_from(model).where(*criteria))
+
+def run_with_session(job, *args):
+    """Run a batch job with its own sync session (called in a worker thread)"""
+    db = SessionLocal()
+    try:
+        return job(db, *args)
+    finally:
+        db.close()
+
 @router.get("/stats", response_model=AdminStats)
 async def get_admin_stats(
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get overall system statistics"""
     
@@ -34,13 +55,11 @@ async def get_admin_stats(
     today = datetime.utcnow().date()
     
     stats = AdminStats(
-        total_users=db.query(User).count(),
-        total_songs=db.query(Song).count(),
-        total_playlists=db.query(Playlist).count(),
-        total_recommendations=db.query(Recommendation).count(),
-        active_users_today=db.query(User).filter(
-            func.date(User.updated_at) == today
-        ).count()
+        total_users=await count_rows(db, User),
+        total_songs=await count_rows(db, Song),
+        total_playlists=await count_rows(db, Playlist),
+        total_recommendations=await count_rows(db, Recommendation),
+        active_users_today=await count_rows(db, User, func.date(User.updated_at) == today)
     )
     
     return stats
@@ -50,13 +69,13 @@ async def get_all_users(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all users with pagination"""
     
     offset = (page - 1) * size
-    total = db.query(User).count()
-    users = db.query(User).offset(offset).limit(size).all()
+    total = await count_rows(db, User)
+    users = (await db.scalars(select(User).offset(offset).limit(size))).all()
     
     return PaginatedResponse(
         items=[UserAdmin.from_orm(user).dict() for user in users],
@@ -71,17 +90,17 @@ async def update_user_role(
     user_id: int,
     role_update: UserRoleUpdate,
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a user's role"""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user.role = role_update.role
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     return user
 
@@ -89,11 +108,11 @@ async def update_user_role(
 async def delete_user(
     user_id: int,
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a user (admin only)"""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -103,8 +122,8 @@ async def delete_user(
             detail="Cannot delete admin users"
         )
     
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
     
     return {"message": f"User {user.email} deleted successfully"}
 
@@ -112,40 +131,43 @@ async def delete_user(
 async def activate_user(
     user_id: int,
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Activate/deactivate a user"""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user.is_active = not user.is_active
-    db.commit()
+    await db.commit()
     
     status_text = "activated" if user.is_active else "deactivated"
     return {"message": f"User {user.email} {status_text} successfully"}
 
+def api_usage_stmt(days: int) -> Select:
+    """Requests, average latency and error rate per endpoint over the last `days` days"""
+    since_date = datetime.utcnow() - timedelta(days=days)
+    return select(
+        APIUsage.endpoint,
+        func.count(APIUsage.id).label('total_requests'),
+        func.avg(APIUsage.response_time).label('avg_response_time'),
+        (func.count(func.nullif(APIUsage.status_code >= 400, False)) * 100.0 / 
+         func.count(APIUsage.id)).label('error_rate')
+    ).where(
+        APIUsage.created_at >= since_date
+    ).group_by(APIUsage.endpoint)
+
 @router.get("/api-usage", response_model=List[APIUsageStats])
 async def get_api_usage_stats(
     days: int = Query(7, ge=1, le=30),
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get API usage statistics"""
     
-    since_date = datetime.utcnow() - timedelta(days=days)
-    
     # Get usage stats grouped by endpoint
-    usage_stats = db.query(
-        APIUsage.endpoint,
-        func.count(APIUsage.id).label('total_requests'),
-        func.avg(APIUsage.response_time).label('avg_response_time'),
-        (func.count(func.nullif(APIUsage.status_code >= 400, False)) * 100.0 / 
-         func.count(APIUsage.id)).label('error_rate')
-    ).filter(
-        APIUsage.created_at >= since_date
-    ).group_by(APIUsage.endpoint).all()
+    usage_stats = (await db.execute(api_usage_stmt(days))).all()
     
     return [
         APIUsageStats(
@@ -161,11 +183,11 @@ async def get_api_usage_stats(
 async def get_popular_songs(
     limit: int = Query(20, ge=1, le=100),
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get most popular songs by view count"""
     
-    popular_songs = db.query(Song).order_by(desc(Song.view_count)).limit(limit).all()
+    popular_songs = (await db.scalars(select(Song).order_by(desc(Song.view_count)).limit(limit))).all()
     
     return {
         "songs": popular_songs,
@@ -176,15 +198,151 @@ async def get_popular_songs(
 async def delete_song(
     song_id: int,
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a song (admin only)"""
     
-    song = db.query(Song).filter(Song.id == song_id).first()
+    song = await db.get(Song, song_id)
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
     
-    db.delete(song)
-    db.commit()
+    await db.delete(song)
+    await db.commit()
+    
+    return {"message": f"Song '{song.title}' by {song.artist} deleted successfully"}
+
+@router.get("/db/pool")
+async def get_db_pool_metrics(
+    admin_user: User = Depends(get_admin_user)
+):
+    """Connection pool usage and checkout latency for this worker's engines"""
+    
+    stats = pool_stats({"async": async_engine.sync_engine, "sync": engine, **replica_router.engines()})
+    if sqlite_profile:
+        stats["sqlite_writer"] = write_gate.stats()
+    return stats
+
+@router.get("/db/replicas")
+async def get_db_replicas(
+    admin_user: User = Depends(get_admin_user)
+):
+    """Read replica health and lag as seen by this worker (checked now)"""
+    
+    await replica_router.check_all()
+    return replica_router.stats()
+
+@router.get("/translation-cache/stats")
+async def get_translation_cache_stats(
+    admin_user: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get translation cache usage and entries per provider"""
+    
+    return await db.run_sync(translation_cache.stats)
+
+@router.post("/translations/materialize")
+async def materialize_popular_translations(
+    admin_user: User = Depends(get_admin_user)
+):
+    """Pre-translate lyrics of the most popular songs now (one budgeted run)"""
+    
+    return await run_in_threadpool(translation_materializer.run_once)
+
+@router.get("/translations/materialize")
+async def get_last_materialization(
+    admin_user: User = Depends(get_admin_user)
+):
+    """Result of the last pre-translation run"""
+    
+    return {"last_run": translation_materializer.last_run}
+
+@router.post("/songs/detect-language")
+async def detect_song_languages(
+    overwrite: bool = Query(False, description="Also re-detect songs that already have a language"),
+    admin_user: User = Depends(get_admin_user)
+):
+    """Backfill Song.language with the local language detector (no network)"""
+    
+    return await run_in_threadpool(run_with_session, language_detector.backfill, overwrite)
+
+@router.post("/songs/fingerprint")
+async def fingerprint_songs(
+    admin_user: User = Depends(get_admin_user)
+):
+    """Fingerprint songs that have none yet and cluster near-duplicates"""
+    
+    return await run_in_threadpool(run_with_session, song_fingerprinter.backfill)
+
+@router.post("/spotify/enrich", status_code=202)
+async def start_spotify_enrichment(
+    background_tasks: BackgroundTasks,
+    admin_user: User = Depends(get_admin_user)
+):
+    """Resolve songs to Spotify and fill audio features and genres in the background"""
+    
+    if spotify_enrichment.running:
+        return {"message": "Enrichment already running"}
+    
+    background_tasks.add_task(spotify_enrichment.run)
+    return {"message": "Enrichment started"}
+
+@router.get("/spotify/enrich")
+async def get_spotify_enrichment_status(
+    admin_user: User = Depends(get_admin_user)
+):
+    """Status of the Spotify enrichment pipeline"""
+    
+    return {
+        "running": spotify_enrichment.running,
+        "last_run": spotify_enrichment.last_run
+    }
+
+@router.post("/spotify/link-youtube", status_code=202)
+async def start_spotify_youtube_linking(
+    background_tasks: BackgroundTasks,
+    admin_user: User = Depends(get_admin_user)
+):
+    """Match Spotify-sourced songs to YouTube videos in the background"""
+    
+    if spotify_youtube_matcher.running:
+        return {"message": "Matcher already running"}
+    
+    background_tasks.add_task(spotify_youtube_matcher.run)
+    return {"message": "Matcher started"}
+
+@router.get("/spotify/link-youtube")
+async def get_spotify_youtube_linking_status(
+    admin_user: User = Depends(get_admin_user)
+):
+    """Status of the Spotify to YouTube matcher"""
+    
+    return {
+        "running": spotify_youtube_matcher.running,
+        "last_run": spotify_youtube_matcher.last_run
+    }
+
+@router.get("/search/top-queries")
+async def get_top_search_queries(
+    language: str = Query(None, description="Language code (all languages if omitted)"),
+    hours: int = Query(24, ge=1, le=24 * 30),
+    limit: int = Query(20, le=100),
+    admin_user: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Most frequent searches in the last hours, from the hourly rollups"""
+    
+    await run_in_threadpool(query_log.flush)
+    return {
+        "language": language,
+        "hours": hours,
+        "queries": await db.run_sync(query_log.top_queries, language, hours, limit)
+    }
+
+@router.post("/search/warm")
+async def warm_search_cache(
+    admin_user: User = Depends(get_admin_user)
+):
+    """Pre-populate the search cache and catalog with the top queries now"""
     
-    return {"message": f"Song '{song.title}' by {song.artist} deleted successfully"}
\ No newline at end of file
+    await run_in_threadpool(query_log.flush)
+    return await search_warmer.run_once()
@@ -1,11 +1,12 @@
 from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import secrets
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.models import User, UserRole
 from app.schemas.schemas import User as UserSchema, UserCreate, Token, SpotifyAuthURL, SpotifyCallback
 from app.services.spotify_service import spotify_service
@@ -36,7 +37,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -50,7 +51,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if user is None:
         raise credentials_exception
     return user
@@ -65,9 +66,9 @@ async def get_current_admin(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.post("/register", response_model=UserSchema)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -84,8 +85,8 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         role=UserRole.USER  # Explicitly set to USER role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
@@ -93,11 +94,11 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 async def register_admin(
     user: UserCreate, 
     current_admin: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new admin user - requires existing admin authentication"""
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -116,16 +117,16 @@ async def register_admin(
         is_verified=True
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @router.post("/create-first-admin", response_model=UserSchema)
-async def create_first_admin(user: UserCreate, db: Session = Depends(get_db)):
+async def create_first_admin(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Create the first admin user - only works if no admin exists"""
     # Check if any admin already exists
-    existing_admin = db.query(User).filter(User.role == UserRole.ADMIN).first()
+    existing_admin = await db.scalar(select(User).where(User.role == UserRole.ADMIN).limit(1))
     if existing_admin:
         raise HTTPException(
             status_code=400,
@@ -133,7 +134,7 @@ async def create_first_admin(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -152,14 +153,14 @@ async def create_first_admin(user: UserCreate, db: Session = Depends(get_db)):
         is_verified=True
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -191,7 +192,7 @@ async def get_spotify_auth_url(current_user: User = Depends(get_current_user)):
 async def spotify_callback(
     callback_data: SpotifyCallback,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Handle Spotify OAuth callback"""
     token_info = await spotify_service.get_access_token(callback_data.code)
@@ -201,6 +202,6 @@ async def spotify_callback(
     # Store tokens in user record
     current_user.spotify_access_token = token_info.get("access_token")
     current_user.spotify_refresh_token = token_info.get("refresh_token")
-    db.commit()
+    await db.commit()
     
     return {"message": "Spotify account connected successfully"}
\ No newline at end of file
@@ -1,11 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import Select, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Tuple
 import re
+import time
+import asyncio
 import logging
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.database import get_async_db, get_read_db, AsyncSessionLocal, SessionLocal
 from app.models.models import Song, User
 from app.schemas.schemas import (
     MusicSearchRequest, MusicSearchResult, Song as SongSchema,
@@ -15,6 +22,17 @@ from app.services.youtube_service import youtube_service
 from app.services.spotify_service import spotify_service
 from app.services.lyrics_service import lyrics_service
 from app.services.translation_service import translation_service
+from app.services.lyrics_lease_service import lyrics_lease_service
+from app.services.translation_cache import translation_cache
+from app.services.translation_jobs import translation_job_manager
+from app.services.language_detector import language_detector
+from app.services.catalog_service import catalog_service
+from app.services.spotify_youtube_matcher import spotify_youtube_matcher
+from app.services.suggest_index import suggest_index
+from app.services.search_cursors import search_cursor_store, SearchCursor
+from app.services.query_log import query_log
+from app.core.config import settings
+from app.core.streaming import format_frame
 from app.api.v1.auth import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -28,6 +46,7 @@ class TranslationRequest(BaseModel):
     text: str
     target_lang: str = "en"
     source_lang: str = "auto"
+    use_memory: bool = True  # traducir solo líneas únicas no vistas antes
 
 
 
@@ -77,6 +96,11 @@ def clean_artist_name(artist: str) -> str:
 
 
 
+def has_cached_lyrics(lyrics: Optional[str]) -> bool:
+    """True si hay letras reales guardadas (no el marcador de 'no disponibles')"""
+    return bool(lyrics) and len(lyrics) > 50 and "no disponibles" not in lyrics.lower()
+
+
 def analyze_search_query(query: str) -> dict:
     """
     Analiza la consulta para determinar si busca una canción específica o un artista
@@ -108,96 +132,428 @@ def analyze_search_query(query: str) -> dict:
     }
 
 
+def store_youtube_results(db: Session, results: List[dict], language: Optional[str]) -> List[Song]:
+    """Guarda (o recupera) las canciones de resultados de YouTube en un solo lote"""
+    songs, created = catalog_service.ingest(db, [
+        {
+            'title': yt_result['title'],
+            'artist': yt_result['artist'],
+            'youtube_id': yt_result['youtube_id'],
+            'thumbnail_url': yt_result.get('thumbnail_url'),
+            'language': language_detector.detect_confident(yt_result['title']) or language
+        }
+        for yt_result in results
+    ])
+    logger.info(f" {created} canciones nuevas, {len(songs) - created} existentes")
+    return songs
+
+
+def store_spotify_results(db: Session, results: List[dict], language: Optional[str]) -> List[Song]:
+    """
+    Guarda (o recupera) las canciones de resultados de Spotify. Si la pista
+    ya está enlazada a un video, reutiliza ese youtube_id sin buscar
+    """
+    spotify_ids = [r['spotify_id'] for r in results]
+    links = spotify_youtube_matcher.linked_youtube_ids(db, spotify_ids)
+    known_spotify_ids = {
+        spotify_id for (spotify_id,) in db.query(Song.spotify_id).filter(Song.spotify_id.in_(spotify_ids)).all()
+    }
+    video_songs = {
+        song.youtube_id: song for song in db.query(Song).filter(Song.youtube_id.in_(list(links.values()))).all()
+    } if links else {}
+    
+    attached = {}
+    rows = []
+    for sp_result in results:
+        youtube_id = links.get(sp_result['spotify_id'])
+        video_song = video_songs.get(youtube_id)
+        if video_song and sp_result['spotify_id'] not in known_spotify_ids and not video_song.spotify_id:
+            # Misma canción ya guardada desde YouTube
+            video_song.spotify_id = sp_result['spotify_id']
+            attached[sp_result['spotify_id']] = video_song
+            continue
+        
+        rows.append({
+            'title': sp_result['title'],
+            'artist': sp_result['artist'],
+            'spotify_id': sp_result['spotify_id'],
+            'youtube_id': youtube_id if not video_song else None,
+            'duration': sp_result['duration'] // 1000 if sp_result.get('duration') else None,
+            'thumbnail_url': sp_result.get('thumbnail_url'),
+            'language': language_detector.detect_confident(sp_result['title']) or language
+        })
+    
+    songs, _ = catalog_service.ingest(db, rows, key="spotify_id")
+    by_spotify_id = {song.spotify_id: song for song in songs}
+    by_spotify_id.update(attached)
+    return [by_spotify_id[spotify_id] for spotify_id in dict.fromkeys(spotify_ids) if spotify_id in by_spotify_id]
+
+
+def local_search_hits(db: Session, query: str, limit: int, playable_only: bool = False) -> List[Song]:
+    """
+    Coincidencias relevantes del catálogo local, una por grupo de duplicados.
+    playable_only descarta las canciones sin video (solo de Spotify)
+    """
+    return catalog_service.collapse_duplicates([
+        song for song, score in catalog_service.search_local_scored(db, query, limit)
+        if score >= settings.LOCAL_SEARCH_MIN_SCORE and (song.youtube_id or not playable_only)
+    ])
+
+
+async def with_deadline(coro, deadline: float):
+    """Ejecuta una búsqueda remota con su deadline: (estado, resultados)"""
+    try:
+        return "ok", await asyncio.wait_for(coro, timeout=deadline)
+    except asyncio.TimeoutError:
+        return "timeout", []
+    except Exception as e:
+        logger.error(f"Error en búsqueda federada: {e}")
+        return "error", []
+
+
+async def federated_search(db: AsyncSession, search_request: MusicSearchRequest) -> MusicSearchResult:
+    """
+    Consulta catálogo local, YouTube y Spotify en paralelo, cada fuente con su
+    propio deadline, y fusiona lo que haya llegado deduplicando por la clave
+    normalizada de catalog_service (prioridad: local, YouTube, Spotify)
+    """
+    query, limit = search_request.query, search_request.limit
+    sources = {}
+    
+    youtube_task = asyncio.create_task(with_deadline(
+        youtube_service.search_music(query, limit, timeout=settings.SEARCH_DEADLINE_YOUTUBE_SECONDS),
+        settings.SEARCH_DEADLINE_YOUTUBE_SECONDS
+    ))
+    spotify_task = None
+    if spotify_service.enabled:
+        spotify_task = asyncio.create_task(with_deadline(
+            spotify_service.search_track(query, limit), settings.SEARCH_DEADLINE_SPOTIFY_SECONDS
+        ))
+    else:
+        sources["spotify"] = "disabled"
+    
+    # La consulta local corre mientras esperan las remotas
+    try:
+        local_songs = await db.run_sync(local_search_hits, query, limit)
+        sources["local"] = "ok"
+    except Exception as e:
+        logger.error(f"Error en búsqueda local: {e}")
+        local_songs = []
+        sources["local"] = "error"
+    
+    sources["youtube"], youtube_results = await youtube_task
+    spotify_results = []
+    if spotify_task:
+        sources["spotify"], spotify_results = await spotify_task
+        # search_track devuelve datos mock ante errores: no guardarlos
+        spotify_results = [r for r in spotify_results if not r['spotify_id'].startswith('mock_')]
+    
+    seen = set()
+    merged_local = []
+    for song in local_songs:
+        key = catalog_service.song_key(song.title, song.artist)
+        if key not in seen:
+            seen.add(key)
+            merged_local.append(song)
+    
+    def unseen(results: List[dict]) -> List[dict]:
+        fresh = []
+        for result in results:
+            key = catalog_service.song_key(result['title'], result['artist'])
+            if key not in seen:
+                seen.add(key)
+                fresh.append(result)
+        return fresh
+    
+    new_youtube = unseen(youtube_results)
+    new_spotify = unseen(spotify_results)
+    
+    songs = merged_local
+    songs += await db.run_sync(store_youtube_results, new_youtube, search_request.language)
+    songs += await db.run_sync(store_spotify_results, new_spotify, search_request.language)
+    songs = catalog_service.collapse_duplicates(songs)[:limit]
+    
+    logger.info(f" Búsqueda federada: {len(songs)} canciones ({sources})")
+    
+    return MusicSearchResult(
+        songs=songs,
+        total=len(songs),
+        tier="federated",
+        sources=sources
+    )
+
+
+async def search_stream(search_request: MusicSearchRequest, sse: bool) -> AsyncIterator[str]:
+    """
+    Búsqueda en streaming: primero las coincidencias del catálogo, después
+    los resultados de cada fuente remota en cuanto llegan y un frame final
+    con el resumen. Usa su propia sesión porque corre después de que el
+    endpoint haya respondido
+    """
+    started = time.monotonic()
+    query, limit = search_request.query, search_request.limit
+    sources = {}
+    tasks = {}
+    sent_keys, sent_clusters = set(), set()
+    sent = 0
+    db = AsyncSessionLocal()
+    
+    def frame_songs(songs: List[Song]) -> List[dict]:
+        nonlocal sent
+        payload = []
+        for song in songs:
+            cluster = song.canonical_song_id or song.id
+            if cluster in sent_clusters or sent >= limit:
+                continue
+            sent_clusters.add(cluster)
+            sent_keys.add(catalog_service.song_key(song.title, song.artist))
+            payload.append(SongSchema.model_validate(song).model_dump(mode="json"))
+            sent += 1
+        return payload
+    
+    try:
+        try:
+            local_hits = await db.run_sync(local_search_hits, query, limit)
+            sources["local"] = "ok"
+        except Exception as e:
+            logger.error(f"Error en búsqueda local: {e}")
+            local_hits = []
+            sources["local"] = "error"
+        yield format_frame({"type": "local", "songs": frame_songs(local_hits)}, sse)
+        
+        if search_request.federated:
+            tier = "federated"
+        elif settings.LOCAL_SEARCH_ENABLED and len(local_hits) >= min(limit, settings.LOCAL_SEARCH_MIN_RESULTS):
+            tier = "local"
+        else:
+            tier = "youtube"
+        
+        if tier != "local":
+            tasks[asyncio.create_task(with_deadline(
+                youtube_service.search_music(query, limit, timeout=settings.SEARCH_DEADLINE_YOUTUBE_SECONDS),
+                settings.SEARCH_DEADLINE_YOUTUBE_SECONDS
+            ))] = "youtube"
+            if search_request.federated and spotify_service.enabled:
+                tasks[asyncio.create_task(with_deadline(
+                    spotify_service.search_track(query, limit), settings.SEARCH_DEADLINE_SPOTIFY_SECONDS
+                ))] = "spotify"
+            elif search_request.federated:
+                sources["spotify"] = "disabled"
+        
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                source = tasks[task]
+                sources[source], results = task.result()
+                
+                fresh = []
+                for result in results:
+                    key = catalog_service.song_key(result['title'], result['artist'])
+                    if key not in sent_keys:
+                        sent_keys.add(key)
+                        fresh.append(result)
+                
+                if source == "youtube":
+                    songs = await db.run_sync(store_youtube_results, fresh, search_request.language)
+                else:
+                    fresh = [r for r in fresh if not r['spotify_id'].startswith('mock_')]
+                    songs = await db.run_sync(store_spotify_results, fresh, search_request.language)
+                yield format_frame({"type": source, "songs": frame_songs(songs)}, sse)
+        
+        yield format_frame({
+            "type": "done",
+            "total": sent,
+            "tier": tier,
+            "sources": sources,
+            "elapsed_ms": round((time.monotonic() - started) * 1000)
+        }, sse)
+    finally:
+        # El cliente puede cortar la conexión a mitad de la búsqueda
+        for task in tasks:
+            task.cancel()
+        await db.close()
+
+
+@router.post("/search/stream")
+async def stream_search_music(
+    search_request: MusicSearchRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Como /search pero en streaming (NDJSON o SSE): las canciones del
+    catálogo llegan de inmediato y los resultados remotos a continuación
+    """
+    sse = format == "sse"
+    query_log.record(
+        search_request.query, search_request.language or current_user.preferred_language, current_user.id
+    )
+    
+    return StreamingResponse(
+        search_stream(search_request, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson"
+    )
+
+
 @router.post("/search", response_model=MusicSearchResult)
 async def search_music(
     search_request: MusicSearchRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
      MEJORADO: Search for music on YouTube with better song matching
-    Ahora busca tanto por nombre de canción como por artista
+    Ahora busca tanto por nombre de canción como por artista.
+    Con federated=true consulta también el catálogo local y Spotify.
+    Paginado: next_cursor en la respuesta se envía como cursor para la
+    siguiente página
     """
     
     logger.info(f" Searching for: {search_request.query}")
     logger.info(f" Language: {search_request.language}")
     logger.info(f" Limit: {search_request.limit}")
     
-    # Analizar el tipo de búsqueda
-    query_analysis = analyze_search_query(search_request.query)
-    logger.info(f" Query type: {query_analysis['type']} (confidence: {query_analysis['confidence']})")
+    # Las páginas siguientes de un cursor no cuentan como búsquedas nuevas
+    if not search_request.cursor:
+        query_log.record(
+            search_request.query, search_request.language or current_user.preferred_language, current_user.id
+        )
+    
+    if search_request.federated:
+        return await federated_search(db, search_request)
+    
+    if search_request.cursor:
+        cursor = await search_cursor_store.get(db, search_request.cursor, current_user.id)
+        if not cursor:
+            raise HTTPException(status_code=404, detail="Search cursor not found or expired")
+        fetch_youtube = True
+    else:
+        # Analizar el tipo de búsqueda
+        query_analysis = analyze_search_query(search_request.query)
+        logger.info(f" Query type: {query_analysis['type']} (confidence: {query_analysis['confidence']})")
+        
+        cursor = search_cursor_store.create(
+            current_user.id, search_request.query, search_request.language, search_request.limit
+        )
+        
+        # Primero el catálogo local: si hay suficientes coincidencias relevantes
+        # la primera página se responde sin llamar a YouTube. Solo cuentan las
+        # que se pueden reproducir (las de Spotify sin video no tienen stream)
+        local_hits = []
+        if settings.LOCAL_SEARCH_ENABLED:
+            local_hits = await db.run_sync(
+                local_search_hits, search_request.query, settings.SEARCH_CURSOR_MAX_LOCAL, True
+            )
+            logger.info(f" Catálogo local: {len(local_hits)} coincidencias relevantes")
+        cursor.pending_ids = [song.id for song in local_hits]
+        cursor.seen_keys = {catalog_service.song_key(song.title, song.artist) for song in local_hits}
+        fetch_youtube = len(local_hits) < min(search_request.limit, settings.LOCAL_SEARCH_MIN_RESULTS)
+    
+    songs, used_youtube = await next_search_page(db, cursor, fetch_youtube)
+    
+    if cursor.exhausted:
+        await search_cursor_store.discard(db, cursor)
+    elif not await search_cursor_store.save(db, cursor):
+        raise HTTPException(
+            status_code=409, detail="Search cursor was advanced by another request, retry with the same cursor"
+        )
     
-    # Search on YouTube
-    youtube_results = await youtube_service.search_music(
-        search_request.query, 
-        search_request.limit
+    logger.info(f" Returning {len(songs)} songs")
+    
+    return MusicSearchResult(
+        songs=songs,
+        total=len(songs),
+        tier="youtube" if used_youtube else "local",
+        next_cursor=None if cursor.exhausted else cursor.id
     )
+
+
+def take_pending_songs(db: Session, cursor: SearchCursor, count: int) -> List[Song]:
+    """Saca del cursor las siguientes canciones del catálogo, sin repetir grupos"""
+    songs = []
+    while cursor.pending_ids and len(songs) < count:
+        ids = cursor.pending_ids[:count - len(songs)]
+        del cursor.pending_ids[:len(ids)]
+        for song in catalog_service.get_in_order(db, ids):
+            cluster = song.canonical_song_id or song.id
+            if cluster not in cursor.seen_clusters:
+                cursor.seen_clusters.add(cluster)
+                songs.append(song)
+    return songs
+
+
+async def next_search_page(db: AsyncSession, cursor: SearchCursor, fetch_youtube: bool = True) -> Tuple[List[Song], bool]:
+    """
+    Siguiente página del cursor: canciones pendientes del catálogo y, si no
+    llenan la página, una sola llamada a YouTube con el pageToken guardado.
+    Lo que sobra de YouTube queda pendiente para la página siguiente
+    """
+    songs = await db.run_sync(take_pending_songs, cursor, cursor.page_size)
+    if not fetch_youtube or len(songs) >= cursor.page_size or cursor.youtube_done:
+        return songs, False
     
+    youtube_results, next_token = await youtube_service.search_page(
+        cursor.query, cursor.page_size, cursor.youtube_token
+    )
+    cursor.youtube_token = next_token
+    cursor.youtube_done = next_token is None
     logger.info(f" YouTube returned {len(youtube_results)} results")
     
-    # Filtrar duplicados y mejorar resultados
-    seen_titles = set()
+    # Filtrar duplicados (también los de páginas anteriores)
     unique_results = []
-    
     for yt_result in youtube_results:
-        # Crear una clave única basada en el título normalizado
-        title_key = re.sub(r'[^\w\s]', '', yt_result['title'].lower())
-        
-        if title_key not in seen_titles:
-            seen_titles.add(title_key)
+        key = catalog_service.song_key(yt_result['title'], yt_result['artist'])
+        if key not in cursor.seen_keys:
+            cursor.seen_keys.add(key)
             unique_results.append(yt_result)
     
     logger.info(f" After deduplication: {len(unique_results)} unique results")
     
     # Store or update songs in database
-    songs = []
-    for yt_result in unique_results:
-        # Check if song already exists
-        existing_song = db.query(Song).filter(
-            Song.youtube_id == yt_result['youtube_id']
-        ).first()
-        
-        if existing_song:
-            songs.append(existing_song)
-            logger.info(f" Found existing: {existing_song.title}")
-        else:
-            # Create new song
-            new_song = Song(
-                title=yt_result['title'],
-                artist=yt_result['artist'],
-                youtube_id=yt_result['youtube_id'],
-                thumbnail_url=yt_result.get('thumbnail_url'),
-                language=search_request.language
-            )
-            db.add(new_song)
-            db.commit()
-            db.refresh(new_song)
-            songs.append(new_song)
-            logger.info(f" Created new: {new_song.title}")
-    
-    logger.info(f" Returning {len(songs)} songs")
-    
-    return MusicSearchResult(
-        songs=songs,
-        total=len(songs)
-    )
+    stored = await db.run_sync(store_youtube_results, unique_results, cursor.language)
+    cursor.pending_ids.extend(song.id for song in stored)
+    songs += await db.run_sync(take_pending_songs, cursor, cursor.page_size - len(songs))
+    return songs, True
+
+
+@router.get("/suggest")
+async def suggest(
+    q: str = Query(..., description="Texto escrito hasta ahora"),
+    limit: int = Query(8, ge=1, le=20),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Autocompletado desde el índice en memoria del catálogo (sin llamar a
+    YouTube): canciones y artistas cuyo título o nombre empieza por q
+    """
+    return {
+        "query": q,
+        "suggestions": suggest_index.suggest(q, limit)
+    }
 
 
 @router.get("/stream/{song_id}", response_model=StreamingURL)
 async def get_streaming_url(
     song_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get streaming URL for a song"""
     
-    song = db.query(Song).filter(Song.id == song_id).first()
+    song = await db.get(Song, song_id)
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
     
-    # Increment view count
-    song.view_count += 1
-    db.commit()
+    # Increment view count (in the database: concurrent plays don't overwrite each other)
+    view_count = await db.scalar(
+        update(Song).where(Song.id == song_id)
+        .values(view_count=Song.view_count + 1)
+        .returning(Song.view_count)
+    )
+    await db.commit()
+    set_committed_value(song, "view_count", view_count)
+    suggest_index.record_view(song)
     
     # Get YouTube streaming URL
     youtube_url = None
@@ -214,16 +570,16 @@ async def get_streaming_url(
 async def get_song_lyrics(
     song_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get lyrics for a song using free lyrics scraper"""
     
-    song = db.query(Song).filter(Song.id == song_id).first()
+    song = await db.get(Song, song_id)
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
     
     #  Check if lyrics already cached
-    if song.lyrics and len(song.lyrics) > 50 and "no disponibles" not in song.lyrics.lower():
+    if has_cached_lyrics(song.lyrics):
         logger.info(f" Usando letras en caché para: {song.title}")
         return LyricsResponse(
             song_id=song_id,
@@ -231,45 +587,98 @@ async def get_song_lyrics(
             source="cached"
         )
     
-    # Limpiar título y artista para mejor búsqueda
-    clean_title = clean_title_for_lyrics(song.title)
-    clean_artist = clean_artist_name(song.artist)
-    
-    logger.info(f"🎵 Buscando letras:")
-    logger.info(f"   Original: '{song.title}' by '{song.artist}'")
-    logger.info(f"   Limpio: '{clean_title}' by '{clean_artist}'")
-    
-    # Fetch lyrics from free lyrics service
-    lyrics = lyrics_service.get_lyrics(clean_title, clean_artist)
-    
-    if lyrics and len(lyrics) > 50:
-        # Cache the lyrics
-        song.lyrics = lyrics
-        db.commit()
-        logger.info(f" Letras guardadas en caché")
-        
-        return LyricsResponse(
-            song_id=song_id,
-            lyrics=lyrics,
-            source="free_service"
+    # Solo un worker hace el scraping; el resto espera su resultado
+    lease_token = await lyrics_lease_service.try_acquire(db, song_id)
+    if not lease_token:
+        logger.info(f" Otro worker está buscando letras para: {song.title}")
+        released = await lyrics_lease_service.wait_for_release(
+            db, song_id, settings.LYRICS_LEASE_WAIT_SECONDS
         )
-    else:
-        logger.warning(f" No se encontraron letras para: {song.title}")
         
-        # Store "not found" marker to avoid repeated searches
-        song.lyrics = f"Letras no disponibles para '{song.title}' by '{song.artist}'"
-        db.commit()
+        if not released:
+            return JSONResponse(
+                status_code=202,
+                content={"song_id": song_id, "status": "pending"},
+                headers={"Retry-After": "2"}
+            )
+        
+        lyrics = await lyrics_lease_service.current_lyrics(db, song_id)
+        if has_cached_lyrics(lyrics):
+            return LyricsResponse(
+                song_id=song_id,
+                lyrics=lyrics,
+                source="cached"
+            )
         
         raise HTTPException(
             status_code=404, 
             detail=f"Lyrics not found for '{song.title}'. Tried multiple sources."
         )
+    
+    try:
+        # El anterior dueño del lease pudo guardarlas después de nuestra lectura
+        lyrics = await lyrics_lease_service.current_lyrics(db, song_id)
+        if has_cached_lyrics(lyrics):
+            set_committed_value(song, "lyrics", lyrics)
+            return LyricsResponse(
+                song_id=song_id,
+                lyrics=lyrics,
+                source="cached"
+            )
+        
+        # Limpiar título y artista para mejor búsqueda
+        clean_title = clean_title_for_lyrics(song.title)
+        clean_artist = clean_artist_name(song.artist)
+        
+        logger.info(f"🎵 Buscando letras:")
+        logger.info(f"   Original: '{song.title}' by '{song.artist}'")
+        logger.info(f"   Limpio: '{clean_title}' by '{clean_artist}'")
+        
+        # Fetch lyrics from free lyrics service (fuera del event loop)
+        lyrics = await run_in_threadpool(lyrics_service.get_lyrics, clean_title, clean_artist)
+        
+        if lyrics and len(lyrics) > 50:
+            # Cache the lyrics
+            song.lyrics = lyrics
+            await db.commit()
+            logger.info(f" Letras guardadas en caché")
+            
+            return LyricsResponse(
+                song_id=song_id,
+                lyrics=lyrics,
+                source="free_service"
+            )
+        else:
+            logger.warning(f" No se encontraron letras para: {song.title}")
+            
+            # Store "not found" marker to avoid repeated searches
+            song.lyrics = f"Letras no disponibles para '{song.title}' by '{song.artist}'"
+            await db.commit()
+            
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Lyrics not found for '{song.title}'. Tried multiple sources."
+            )
+    finally:
+        await lyrics_lease_service.release(db, song_id, lease_token)
+
+
+def translate_with_memory(text: str, target_lang: str, source_lang: str):
+    """Traducción por líneas con su propia sesión síncrona (corre en un hilo)"""
+    db = SessionLocal()
+    try:
+        return translation_service.translate_lines(
+            text, target_lang, source_lang, translation_cache.line_memory(db)
+        )
+    finally:
+        db.close()
 
 
 @router.post("/translate")
 async def translate_text_endpoint(
     request: TranslationRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Traduce texto (letras) al idioma objetivo
@@ -279,12 +688,41 @@ async def translate_text_endpoint(
     if not request.text or len(request.text.strip()) == 0:
         raise HTTPException(status_code=400, detail="El texto no puede estar vacío")
     
-    # Traducir usando el servicio
-    translated_text = translation_service.translate(
-        request.text, 
-        request.target_lang, 
-        request.source_lang
-    )
+    cached = await db.run_sync(translation_cache.get, request.text, request.source_lang, request.target_lang)
+    if cached:
+        translated_text, provider = cached
+        logger.info(f" Traducción servida desde caché ({provider})")
+    elif request.use_memory:
+        # Memoria de traducción por líneas (bloqueante, fuera del event loop)
+        translated_text, provider, memory_stats = await run_in_threadpool(
+            translate_with_memory,
+            request.text, 
+            request.target_lang, 
+            request.source_lang
+        )
+        logger.info(
+            f" Caracteres traducidos: {memory_stats['chars_translated']}/{memory_stats['chars_total']}"
+        )
+        
+        if provider:
+            await db.run_sync(
+                translation_cache.set, request.text, request.source_lang, request.target_lang,
+                translated_text, provider
+            )
+    else:
+        # Traducir usando el servicio (bloqueante, fuera del event loop)
+        translated_text, provider = await run_in_threadpool(
+            translation_service.translate_with_provider,
+            request.text, 
+            request.target_lang, 
+            request.source_lang
+        )
+        
+        if provider:
+            await db.run_sync(
+                translation_cache.set, request.text, request.source_lang, request.target_lang,
+                translated_text, provider
+            )
     
     if not translated_text:
         raise HTTPException(status_code=500, detail="No se pudo traducir el texto")
@@ -293,40 +731,107 @@ async def translate_text_endpoint(
         "original": request.text[:200] + "..." if len(request.text) > 200 else request.text,
         "translated": translated_text,
         "source_lang": request.source_lang,
-        "target_lang": request.target_lang
+        "target_lang": request.target_lang,
+        "provider": provider,
+        "cached": cached is not None
+    }
+
+
+@router.post("/translate/jobs", status_code=202)
+async def create_translation_job(
+    request: TranslationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Crea un trabajo de traducción en segundo plano y devuelve su id.
+    El resultado se consulta en /translate/jobs/{job_id} o en streaming
+    en /translate/jobs/{job_id}/stream
+    """
+    if not request.text or len(request.text.strip()) == 0:
+        raise HTTPException(status_code=400, detail="El texto no puede estar vacío")
+    
+    job = await run_in_threadpool(
+        translation_job_manager.submit,
+        request.text,
+        request.target_lang,
+        request.source_lang,
+        current_user.id
+    )
+    
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "total_chunks": len(job.segments)
     }
 
 
+async def get_user_translation_job(job_id: str, current_user: User):
+    job = await run_in_threadpool(translation_job_manager.get, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Translation job not found")
+    return job
+
+
+@router.get("/translate/jobs/{job_id}")
+async def get_translation_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Estado y traducción parcial (fragmentos completados en orden)"""
+    
+    return (await get_user_translation_job(job_id, current_user)).to_dict()
+
+
+@router.get("/translate/jobs/{job_id}/stream")
+async def stream_translation_job(
+    job_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Envía cada fragmento traducido en cuanto termina (NDJSON o SSE)"""
+    
+    job = await get_user_translation_job(job_id, current_user)
+    sse = format == "sse"
+    
+    return StreamingResponse(
+        translation_job_manager.stream(job, sse=sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson"
+    )
+
+
 @router.get("/song/{song_id}", response_model=SongSchema)
 async def get_song_details(
     song_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get detailed information about a song"""
     
-    song = db.query(Song).filter(Song.id == song_id).first()
+    song = await db.get(Song, song_id)
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
     
     return song
 
 
+def trending_stmt(language: Optional[str], limit: int) -> Select:
+    """Canciones con más reproducciones, del idioma indicado si lo hay"""
+    query = select(Song)
+    if language:
+        query = query.where(Song.language == language)
+    return query.order_by(Song.view_count.desc()).limit(limit)
+
+
 @router.get("/trending")
 async def get_trending_music(
     limit: int = Query(20, le=50),
     language: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get trending music based on view count"""
     
-    query = db.query(Song)
-    
-    if language:
-        query = query.filter(Song.language == language)
-    
-    trending_songs = query.order_by(Song.view_count.desc()).limit(limit).all()
+    trending_songs = (await db.scalars(trending_stmt(language, limit))).all()
     
     return {
         "trending": trending_songs,
@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_async_db, get_read_db
 from app.models.models import User, Song
 from app.schemas.schemas import RecommendationRequest, RecommendationsResult
 from app.services.recommendation_service import recommendation_service
 from app.services.youtube_service import youtube_service
+from app.services.catalog_service import catalog_service
+from app.services.query_log import query_log
+from app.core.config import settings
 from app.api.v1.auth import get_current_user
 import logging
 
@@ -14,11 +18,18 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+async def seed_queries(db: AsyncSession, language: str, defaults: list) -> list:
+    """Búsquedas más frecuentes del idioma; la lista fija solo si aún no hay registro"""
+    top = await db.run_sync(query_log.top_queries, language, settings.QUERY_WARM_WINDOW_HOURS, len(defaults))
+    return [entry["query"] for entry in top] or defaults
+
+
 @router.post("/", response_model=RecommendationsResult)
 async def get_recommendations(
     request: RecommendationRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_read_db)
 ):
     """Get personalized music recommendations"""
     
@@ -26,7 +37,8 @@ async def get_recommendations(
         db=db,
         user_id=current_user.id,
         language=request.language,
-        limit=request.limit
+        limit=request.limit,
+        read_db=read_db
     )
     
     return RecommendationsResult(
@@ -39,7 +51,7 @@ async def get_recommendations(
 async def clean_and_initialize(
     language: str = Query("es", description="Language to initialize"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
      LIMPIA datos de prueba y carga canciones reales de YouTube
@@ -48,19 +60,19 @@ async def clean_and_initialize(
     logger.info(f" Limpiando datos de prueba...")
     
     
-    fake_songs = db.query(Song).filter(
+    fake_songs = (await db.scalars(select(Song).where(
         (Song.youtube_id == None) | 
         (Song.youtube_id == "") |
         (Song.title.like("%Song %")) |
         (Song.artist.like("%Artist %"))
-    ).all()
+    ))).all()
     
     deleted_count = len(fake_songs)
     
     for song in fake_songs:
-        db.delete(song)
+        await db.delete(song)
     
-    db.commit()
+    await db.commit()
     logger.info(f"    Eliminadas {deleted_count} canciones de prueba")
     
     
@@ -105,40 +117,19 @@ async def clean_and_initialize(
         ]
     }
     
-    queries = popular_queries.get(language, popular_queries['es'])
-    new_songs_count = 0
+    queries = await seed_queries(db, language, popular_queries.get(language, popular_queries['es']))
+    youtube_results = []
     
     for query in queries:
         try:
             logger.info(f"    Buscando: '{query}'")
-            
-            youtube_results = await youtube_service.search_music(query, limit=2)
-            
-            for yt_result in youtube_results:
-                # Verificar si ya existe
-                existing = db.query(Song).filter(
-                    Song.youtube_id == yt_result['youtube_id']
-                ).first()
-                
-                if not existing:
-                    new_song = Song(
-                        title=yt_result['title'],
-                        artist=yt_result['artist'],
-                        youtube_id=yt_result['youtube_id'],
-                        thumbnail_url=yt_result.get('thumbnail_url'),
-                        language=language,
-                        view_count=0
-                    )
-                    db.add(new_song)
-                    new_songs_count += 1
-                    logger.info(f"       {new_song.title} - {new_song.artist}")
-            
-            db.commit()
-            
+            youtube_results.extend(await youtube_service.search_music(query, limit=2))
         except Exception as e:
             logger.error(f"    Error: {e}")
             continue
     
+    _, new_songs_count = await db.run_sync(catalog_service.ingest, catalog_service.youtube_rows(youtube_results, language))
+    
     logger.info(f" Completado: {deleted_count} eliminadas, {new_songs_count} agregadas")
     
     return {
@@ -153,7 +144,7 @@ async def clean_and_initialize(
 async def initialize_recommendations(
     language: str = Query("es", description="Language to initialize"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Inicializa con canciones sin limpiar (mantiene las existentes)"""
     
@@ -176,36 +167,18 @@ async def initialize_recommendations(
         ]
     }
     
-    queries = popular_queries.get(language, popular_queries['es'])
-    new_songs_count = 0
+    queries = await seed_queries(db, language, popular_queries.get(language, popular_queries['es']))
+    youtube_results = []
     
     for query in queries:
         try:
-            youtube_results = await youtube_service.search_music(query, limit=3)
-            
-            for yt_result in youtube_results:
-                existing = db.query(Song).filter(
-                    Song.youtube_id == yt_result['youtube_id']
-                ).first()
-                
-                if not existing:
-                    new_song = Song(
-                        title=yt_result['title'],
-                        artist=yt_result['artist'],
-                        youtube_id=yt_result['youtube_id'],
-                        thumbnail_url=yt_result.get('thumbnail_url'),
-                        language=language,
-                        view_count=0
-                    )
-                    db.add(new_song)
-                    new_songs_count += 1
-            
-            db.commit()
-            
+            youtube_results.extend(await youtube_service.search_music(query, limit=3))
         except Exception as e:
             logger.error(f"Error: {e}")
             continue
     
+    _, new_songs_count = await db.run_sync(catalog_service.ingest, catalog_service.youtube_rows(youtube_results, language))
+    
     return {
         "message": f"Se agregaron {new_songs_count} canciones nuevas",
         "new_songs": new_songs_count,
@@ -218,7 +191,8 @@ async def get_recommendations_by_language(
     language: str = Query(..., description="Language code"),
     limit: int = Query(20, le=50),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_read_db)
 ):
     """Get recommendations for a specific language"""
     
@@ -226,7 +200,8 @@ async def get_recommendations_by_language(
         db=db,
         user_id=current_user.id,
         language=language,
-        limit=limit
+        limit=limit,
+        read_db=read_db
     )
     
     return {
@@ -241,7 +216,8 @@ async def discover_new_music(
     language: Optional[str] = Query(None),
     limit: int = Query(20, le=50),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_read_db)
 ):
     """Discover new music"""
     
@@ -249,7 +225,8 @@ async def discover_new_music(
         db=db,
         user_id=current_user.id,
         language=language or current_user.preferred_language,
-        limit=limit
+        limit=limit,
+        read_db=read_db
     )
     
     return {
@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 
@@ -20,6 +20,32 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./music_api.db"
     
+    # Database connection pools (one per engine, per worker process): the
+    # server must allow workers x 2 engines x (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # below the server/proxy idle timeout
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # wait for a free connection before failing
+    DB_POOL_SLOW_CHECKOUT_MS: float = 100.0  # checkouts slower than this are logged
+    DB_POOL_WAIT_SAMPLES: int = 1000  # recent checkout waits kept for percentiles
+    
+    # Read replicas (async driver URLs or the same forms as DATABASE_URL, as a JSON
+    # list in the environment). Read-only endpoints use them; writes and reads of
+    # the user's own data stay on DATABASE_URL
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_MAX_LAG_SECONDS: float = 10.0  # replicas further behind are skipped until they catch up
+    REPLICA_HEALTH_CHECK_SECONDS: float = 15.0
+    REPLICA_HEALTH_TIMEOUT_SECONDS: float = 2.0
+    
+    # SQLite performance profile (on-disk DATABASE_URL only): WAL + PRAGMAs on
+    # every connection, request writes queued one transaction at a time, and
+    # read-only endpoints served by a separate pool of query_only connections
+    SQLITE_PROFILE_ENABLED: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # safe with WAL; FULL also syncs every commit
+    SQLITE_MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KIB: int = 64 * 1024  # page cache per connection
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # wait for the write lock before "database is locked"
+    
 
     @property
     def BACKEND_CORS_ORIGINS(self) -> List[str]:
@@ -47,6 +73,114 @@ class Settings(BaseSettings):
     GENIUS_CLIENT_ID: str = ""
     GENIUS_CLIENT_SECRET: str = ""
     
+    # Spotify Web API client
+    SPOTIFY_TIMEOUT_SECONDS: float = 10.0
+    SPOTIFY_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    SPOTIFY_MAX_CONNECTIONS: int = 10
+    SPOTIFY_TOKEN_REFRESH_MARGIN_SECONDS: int = 300  # refresh this long before the token expires
+    SPOTIFY_ENRICH_RESOLVE_LIMIT: int = 200  # songs resolved to Spotify ids (one search each) per run
+    SPOTIFY_ENRICH_BATCH_SIZE: int = 500  # songs loaded per batch in the features/genres stages
+    
+    # YouTube search cache and Spotify -> YouTube cross-linking
+    YOUTUBE_SEARCH_CACHE_TTL_SECONDS: int = 3600
+    YOUTUBE_SEARCH_CACHE_SIZE: int = 1024
+    YOUTUBE_LINK_ENABLED: bool = False  # periodic matcher; can also be run from /admin
+    YOUTUBE_LINK_INTERVAL_SECONDS: int = 3600
+    YOUTUBE_LINK_BATCH_SIZE: int = 50  # each unmatched song costs one YouTube search (100 quota units)
+    YOUTUBE_LINK_MIN_CONFIDENCE: float = 0.75
+    
+    # Local catalog search (answered before calling YouTube)
+    LOCAL_SEARCH_ENABLED: bool = True
+    LOCAL_SEARCH_MIN_RESULTS: int = 5  # relevant local hits needed to skip YouTube (capped at the request limit)
+    LOCAL_SEARCH_MIN_SCORE: float = 1.0  # fraction of query terms a hit must match
+    
+    # Near-duplicate clustering (MinHash + LSH over normalized artist/title)
+    FINGERPRINT_NUM_PERM: int = 64
+    FINGERPRINT_BANDS: int = 16  # 16 bands x 4 rows: candidates from ~0.5 similarity
+    FINGERPRINT_MIN_SIMILARITY: float = 0.75  # estimated Jaccard to join a cluster
+    FINGERPRINT_BATCH_SIZE: int = 500
+    
+    # Search query log and cache warming
+    QUERY_LOG_ENABLED: bool = True
+    QUERY_LOG_FLUSH_SECONDS: float = 5.0
+    QUERY_LOG_MAX_BUFFER: int = 10000  # oldest entries are dropped if the database falls behind
+    QUERY_LOG_RETENTION_DAYS: int = 30  # raw log only; hourly rollups are kept
+    QUERY_WARM_ENABLED: bool = False  # spends YouTube quota; can also be run from /admin
+    QUERY_WARM_INTERVAL_SECONDS: int = 1800  # below YOUTUBE_SEARCH_CACHE_TTL_SECONDS
+    QUERY_WARM_MAX_SEARCHES: int = 10  # API calls per run, 100 quota units each (default daily quota: 10000)
+    QUERY_WARM_WINDOW_HOURS: int = 24
+    QUERY_WARM_TOP_QUERIES: int = 10  # per language
+    QUERY_WARM_RESULTS: int = 10  # same as the default search limit, so warmed entries are hit
+    
+    # Search pagination cursors (search_cursors table, shared by all workers)
+    SEARCH_CURSOR_TTL_SECONDS: int = 900
+    SEARCH_CURSOR_MAX_LOCAL: int = 200  # catalog hits collected for a cursor on its first page
+    
+    # Typeahead (/music/suggest)
+    SUGGEST_MIN_CHARS: int = 2
+    SUGGEST_MAX_SCAN: int = 2000  # index entries examined per prefix, keeps short prefixes fast
+    
+    # Federated search (local catalog + YouTube + Spotify)
+    SEARCH_DEADLINE_YOUTUBE_SECONDS: float = 2.5
+    SEARCH_DEADLINE_SPOTIFY_SECONDS: float = 1.5
+    
+    # Outbound HTTP (scrapers and translators)
+    HTTP_POOL_MAXSIZE: int = 10
+    HTTP_DEFAULT_RATE: float = 2.0  # requests per second per host
+    HTTP_DEFAULT_BURST: int = 4
+    HTTP_MAX_CONCURRENCY_PER_HOST: int = 4
+    HTTP_MAX_RETRY_AFTER: float = 30.0  # seconds
+    HTTP_THROTTLE_BACKOFF_SECONDS: float = 1.0  # first pause after a 429/503 without Retry-After, doubled each time
+    HTTP_HOST_RATES: Dict[str, float] = {
+        "genius.com": 1.0,
+        "www.musixmatch.com": 0.5,
+        "www.azlyrics.com": 0.5,
+        "translate.google.com": 3.0,
+        "libretranslate.com": 1.0,
+        "api.mymemory.translated.net": 1.0,
+    }
+    
+    # On-disk cache of raw scraped pages
+    PAGE_CACHE_ENABLED: bool = True
+    PAGE_CACHE_DIR: str = "./page_cache"
+    PAGE_CACHE_MAX_BYTES: int = 200 * 1024 * 1024
+    PAGE_CACHE_FRESH_SECONDS: int = 6 * 3600  # served without revalidation
+    PAGE_CACHE_OFFLINE: bool = False  # only serve from cache, never hit the network
+    
+    # Lyrics fetch leases (one scrape per song across workers)
+    LYRICS_LEASE_TTL_SECONDS: int = 120
+    LYRICS_LEASE_WAIT_SECONDS: float = 15.0
+    LYRICS_LEASE_POLL_SECONDS: float = 0.5
+    
+    # Translation cache
+    TRANSLATION_CACHE_MEMORY_SIZE: int = 4096  # entries (texts or lines) kept in the in-process LRU
+    TRANSLATION_MEMORY_BATCH_CHARS: int = 1500  # unique lines are sent to providers in batches of this size
+    TRANSLATION_PARALLELISM: Dict[str, int] = {  # concurrent chunk requests per provider
+        "Google Translate": 4,
+        "LibreTranslate": 2,
+        "MyMemory": 1,
+    }
+    
+    # Background translation jobs
+    TRANSLATION_JOB_WORKERS: int = 4
+    TRANSLATION_JOB_SEGMENT_CHARS: int = 600  # stanzas are grouped up to this size per streamed chunk
+    TRANSLATION_JOB_TTL_SECONDS: int = 3600  # finished jobs are kept this long (translation_jobs table, shared by all workers)
+    TRANSLATION_JOB_POLL_SECONDS: float = 0.25  # a stream re-reads its job from the database this often
+    
+    # Background pre-translation of popular songs
+    TRANSLATION_PREWARM_ENABLED: bool = False
+    TRANSLATION_PREWARM_INTERVAL_SECONDS: int = 6 * 3600
+    TRANSLATION_PREWARM_TOP_SONGS: int = 20  # per song language
+    TRANSLATION_PREWARM_TOP_TARGETS: int = 3
+    TRANSLATION_PREWARM_DEFAULT_TARGETS: List[str] = ["en", "es"]
+    TRANSLATION_PREWARM_MAX_SECONDS: int = 300  # budget per run
+    TRANSLATION_PREWARM_MAX_CHARS: int = 50000  # characters sent to providers per run
+    
+    # Local language detection
+    LANGUAGE_DETECTION_MIN_CONFIDENCE: float = 0.8
+    LANGUAGE_DETECTION_MIN_NGRAMS: int = 12  # shorter texts are not classified
+    LANGUAGE_DETECTION_MAX_CHARS: int = 2000  # only the start of long lyrics is analyzed
+    
     model_config = {
         "case_sensitive": True,
         "env_file": ".env",
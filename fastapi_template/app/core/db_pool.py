@@ -0,0 +1,165 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Checkout latency and connection counters for one engine's pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.waits = deque(maxlen=settings.DB_POOL_WAIT_SAMPLES)  # seconds
+        self.checkouts = 0
+        self.starved_checkouts = 0  # no idle connection and no overflow left: had to queue
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.max_wait = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_checkout(self, pool: QueuePool, wait: float, starved: bool):
+        with self.lock:
+            self.checkouts += 1
+            self.waits.append(wait)
+            self.max_wait = max(self.max_wait, wait)
+            self.starved_checkouts += starved
+            self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+            self.peak_overflow = max(self.peak_overflow, pool.overflow())
+            if wait * 1000 >= settings.DB_POOL_SLOW_CHECKOUT_MS:
+                self.slow_checkouts += 1
+                logger.warning(f" Pool {self.name}: checkout lento {wait * 1000:.0f} ms ({pool.status()})")
+
+    def record_timeout(self, pool: QueuePool):
+        with self.lock:
+            self.timeouts += 1
+        logger.error(f" Pool {self.name}: sin conexiones libres tras {settings.DB_POOL_TIMEOUT_SECONDS}s ({pool.status()})")
+
+    def snapshot(self, pool) -> Dict:
+        with self.lock:
+            waits = sorted(self.waits)
+            result = {
+                "checkouts": self.checkouts,
+                "starved_checkouts": self.starved_checkouts,
+                "timeouts": self.timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+                "wait_ms": {
+                    "p50": self._percentile(waits, 0.50),
+                    "p95": self._percentile(waits, 0.95),
+                    "p99": self._percentile(waits, 0.99),
+                    "max": round(self.max_wait * 1000, 2),
+                    "samples": len(waits),
+                },
+            }
+        if isinstance(pool, QueuePool):
+            result.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": pool._max_overflow,
+            })
+        result["pool"] = type(pool).__name__
+        return result
+
+    @staticmethod
+    def _percentile(values, fraction: float) -> Optional[float]:
+        if not values:
+            return None
+        return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 2)
+
+
+class InstrumentedPoolMixin:
+    """
+    Times Pool.connect(): the wait for a free connection plus opening a new
+    one (overflow) and the pre-ping, i.e. everything a request spends before
+    its first query
+    """
+
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        if self.metrics is None:
+            return super().connect()
+
+        starved = self.checkedin() == 0 and self.overflow() >= self._max_overflow
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(self)
+            raise
+        self.metrics.record_checkout(self, time.perf_counter() - started, starved)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() replaces the pool: keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# Métricas por engine ("primary", "async", ...)
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def pool_options(url: str, is_async: bool = False) -> Dict:
+    """create_engine kwargs for the configured pool (in-memory SQLite keeps its default pool)"""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+
+def instrument(engine: Engine, name: str) -> PoolMetrics:
+    """Attach metrics to an engine's pool (pass async_engine.sync_engine for async engines)"""
+    metrics = PoolMetrics(name)
+    pool_metrics[name] = metrics
+    engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        with metrics.lock:
+            metrics.connects += 1
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        with metrics.lock:
+            metrics.invalidations += 1
+
+    return metrics
+
+
+def pool_stats(engines: Dict[str, Engine]) -> Dict:
+    return {
+        name: pool_metrics[name].snapshot(engine.pool)
+        for name, engine in engines.items()
+        if name in pool_metrics
+    }
@@ -0,0 +1,149 @@
+import time
+import asyncio
+import logging
+import itertools
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.core.db_pool import instrument, pool_options
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary. 0 when it has replayed everything it
+# received (an idle primary leaves the last replay timestamp old without any lag)
+# and when the server is not in recovery (not a replica at all). NULL when there
+# is no WAL receiver: a disconnected replica has replayed everything it received
+# too, but it is falling behind by an unknown amount. Only pid is checked because
+# the other pg_stat_wal_receiver columns (status included) read as NULL for roles
+# without pg_read_all_stats
+POSTGRES_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE pid IS NOT NULL) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    """One read replica: its engine, session factory and last health check"""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine: AsyncEngine = create_async_engine(
+            url,
+            pool_pre_ping=True,
+            echo=False,
+            **pool_options(url, is_async=True)
+        )
+        instrument(self.engine.sync_engine, name)
+        self.sessionmaker = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        self.healthy = True  # until the first check says otherwise
+        self.lag: Optional[float] = None
+        self.last_check: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.failures = 0
+
+    def mark_unhealthy(self, reason: str):
+        if self.healthy:
+            logger.warning(f" Replica {self.name} out of rotation: {reason}")
+        self.healthy = False
+        self.last_error = reason
+        self.failures += 1
+
+    def stats(self) -> Dict:
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag_seconds": None if self.lag is None else round(self.lag, 3),
+            "last_check_age_seconds": None if self.last_check is None else round(time.monotonic() - self.last_check, 1),
+            "last_error": self.last_error,
+            "failures": self.failures,
+        }
+
+
+class ReplicaRouter:
+    """
+    Hands out sessions on healthy read replicas (round robin). A replica is
+    taken out of rotation when its health check fails, when it lags more than
+    REPLICA_MAX_LAG_SECONDS behind the primary, or when a request can't get a
+    connection to it; callers fall back to the primary when none is left.
+    """
+
+    def __init__(self, urls: List[str], prefix: str = "replica"):
+        self.replicas = [Replica(f"{prefix}-{index}", url) for index, url in enumerate(urls)]
+        self._turn = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    async def session(self) -> Optional[AsyncSession]:
+        """A connected session on a healthy replica, or None to use the primary"""
+        while True:
+            replica = self.pick()
+            if replica is None:
+                return None
+
+            db = replica.sessionmaker()
+            try:
+                await db.connection()
+                return db
+            except Exception as e:
+                await db.close()
+                replica.mark_unhealthy(f"connect failed: {e}")
+
+    async def check(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as conn:
+                if replica.engine.dialect.name == "postgresql":
+                    lag = await asyncio.wait_for(
+                        conn.scalar(POSTGRES_LAG_QUERY), settings.REPLICA_HEALTH_TIMEOUT_SECONDS
+                    )
+                else:
+                    await asyncio.wait_for(conn.execute(text("SELECT 1")), settings.REPLICA_HEALTH_TIMEOUT_SECONDS)
+                    lag = 0.0
+        except Exception as e:
+            replica.lag = None
+            replica.mark_unhealthy(f"health check failed: {e!r}")
+        else:
+            replica.lag = None if lag is None else float(lag)
+            if replica.lag is None:
+                replica.mark_unhealthy("no WAL receiver connected to the primary")
+            elif replica.lag > settings.REPLICA_MAX_LAG_SECONDS:
+                replica.mark_unhealthy(f"lagging {replica.lag:.1f}s behind the primary")
+            else:
+                if not replica.healthy:
+                    logger.info(f" Replica {replica.name} back in rotation (lag {replica.lag:.1f}s)")
+                replica.healthy = True
+                replica.last_error = None
+        replica.last_check = time.monotonic()
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def run_forever(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(settings.REPLICA_HEALTH_CHECK_SECONDS)
+
+    def stats(self) -> Dict:
+        return {
+            "max_lag_seconds": settings.REPLICA_MAX_LAG_SECONDS,
+            "replicas": {replica.name: replica.stats() for replica in self.replicas},
+        }
+
+    def engines(self) -> Dict:
+        return {replica.name: replica.engine.sync_engine for replica in self.replicas}
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
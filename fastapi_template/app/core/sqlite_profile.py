@@ -0,0 +1,202 @@
+import time
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import await_only
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Connection.info key: a write statement ran and its transaction hasn't ended
+WRITE_OPEN = "sqlite_write_open"
+
+# Session whose run_sync helper is running: its first write takes the gate
+_sync_writer: ContextVar[Optional["WriteSerializedSession"]] = ContextVar("sqlite_sync_writer", default=None)
+
+
+def is_file_sqlite(url: str) -> bool:
+    """On-disk SQLite database (the profile doesn't apply to in-memory ones)"""
+    return url.startswith("sqlite") and ":memory:" not in url and not url.rstrip("/").endswith(":")
+
+
+def apply_pragmas(engine: Engine, read_only: bool = False):
+    """
+    Performance PRAGMAs on every new connection (pass async_engine.sync_engine
+    for async engines). WAL lets readers run alongside the single writer, and
+    busy_timeout makes a writer wait for the lock instead of failing with
+    "database is locked".
+    """
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+            cursor.execute("PRAGMA journal_mode = WAL")  # persistent, stored in the file
+            cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE_BYTES)}")
+            cursor.execute(f"PRAGMA cache_size = {-int(settings.SQLITE_CACHE_SIZE_KIB)}")  # negative: KiB
+            cursor.execute("PRAGMA temp_store = MEMORY")
+            if read_only:
+                cursor.execute("PRAGMA query_only = ON")
+        finally:
+            cursor.close()
+
+
+def track_writes(engine: Engine):
+    """
+    Flag connections with an uncommitted write and take the write gate for
+    the first write of a WriteSerializedSession.run_sync helper
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:7].upper().startswith(("INSERT", "UPDATE", "DELETE", "REPLACE")):
+            writer = _sync_writer.get()
+            if writer is not None:
+                # Runs inside run_sync's greenlet, so it can wait on the asyncio lock
+                await_only(writer._enter_write())
+            conn.info[WRITE_OPEN] = True
+
+    @event.listens_for(engine, "commit")
+    @event.listens_for(engine, "rollback")
+    def on_end(conn):
+        conn.info.pop(WRITE_OPEN, None)
+
+    @event.listens_for(engine.pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info.pop(WRITE_OPEN, None)
+
+
+class WriteGate:
+    """
+    Process-wide queue for SQLite writers. SQLite allows one write transaction
+    at a time; waiting here in FIFO order is cheaper and fairer than sleeping
+    in the busy handler, and a transaction that holds the gate never has to
+    give up with SQLITE_BUSY because another request got in first.
+
+    Only the async engine goes through the gate. The sync engine (background
+    jobs, CLI) relies on busy_timeout instead, which assumes it always runs in
+    a worker thread (asyncio.to_thread / run_in_threadpool): a sync write on
+    the event loop thread would block the loop in the busy handler while the
+    gate holder, which needs the loop to commit, can't finish.
+    """
+
+    def __init__(self):
+        self._lock: Optional[asyncio.Lock] = None
+        self.acquisitions = 0
+        self.contended = 0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def acquire(self):
+        started = time.perf_counter()
+        if self.lock.locked():
+            self.contended += 1
+        await self.lock.acquire()
+        wait = time.perf_counter() - started
+        self.acquisitions += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def release(self):
+        self.lock.release()
+
+    def stats(self) -> Dict:
+        return {
+            "write_transactions": self.acquisitions,
+            "queued": self.contended,
+            "waiting_now": len(self.lock._waiters or ()) if self._lock else 0,
+            "avg_wait_ms": round(self.total_wait / self.acquisitions * 1000, 2) if self.acquisitions else None,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+        }
+
+
+write_gate = WriteGate()
+
+
+class WriteSerializedSession(AsyncSession):
+    """
+    AsyncSession that takes the write gate before its first write (flush,
+    DML statement, or the first statement that writes inside a run_sync
+    helper) and keeps it until the transaction ends, so request writers go
+    through SQLite one transaction at a time. Read-only use, including
+    read-only run_sync helpers, never touches the gate.
+    """
+
+    _holds_gate = False
+
+    async def _enter_write(self):
+        if not self._holds_gate:
+            await write_gate.acquire()
+            self._holds_gate = True
+
+    def _leave_write(self):
+        if self._holds_gate:
+            self._holds_gate = False
+            write_gate.release()
+
+    def _has_pending_writes(self) -> bool:
+        return bool(self.new or self.dirty or self.deleted)
+
+    async def execute(self, statement, *args, **kwargs):
+        if getattr(statement, "is_dml", False):
+            await self._enter_write()
+        return await super().execute(statement, *args, **kwargs)
+
+    async def flush(self, objects=None):
+        if self._has_pending_writes():
+            await self._enter_write()
+        return await super().flush(objects)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        # The sync helpers (catalog ingest, caches) start without the gate;
+        # track_writes takes it on their first write, and it is kept only if
+        # they leave that write uncommitted
+        def call(session, *args, **kwargs):
+            result = fn(session, *args, **kwargs)
+            write_open = session.in_transaction() and (
+                bool(session.new or session.dirty or session.deleted)
+                or session.connection().info.get(WRITE_OPEN, False)
+            )
+            return result, write_open
+
+        token = _sync_writer.set(self)
+        write_open = False
+        try:
+            result, write_open = await super().run_sync(call, *args, **kwargs)
+            return result
+        finally:
+            _sync_writer.reset(token)
+            if not write_open:
+                self._leave_write()
+
+    async def commit(self):
+        if self._has_pending_writes():
+            await self._enter_write()
+        try:
+            return await super().commit()
+        finally:
+            self._leave_write()
+
+    async def rollback(self):
+        try:
+            return await super().rollback()
+        finally:
+            self._leave_write()
+
+    async def close(self):
+        try:
+            return await super().close()
+        finally:
+            self._leave_write()
@@ -0,0 +1,9 @@
+import json
+
+
+def format_frame(payload: dict, sse: bool = False) -> str:
+    """One streamed frame: an NDJSON line, or an SSE event named after payload['type']"""
+    data = json.dumps(payload, ensure_ascii=False)
+    if sse:
+        return f"event: {payload['type']}\ndata: {data}\n\n"
+    return data + "\n"
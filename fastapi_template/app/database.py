@@ -1,24 +1,84 @@
+from fastapi import Depends
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.db_pool import instrument, pool_options
+from app.core.db_replicas import ReplicaRouter
+from app.core.sqlite_profile import WriteSerializedSession, apply_pragmas, is_file_sqlite, track_writes
 
 # Parse the database URL to determine if it's async or sync
 database_url = settings.DATABASE_URL
 
-# For async databases (asyncpg), we need to use the sync version for create_all
+# The sync engine is only for create_all, migrations and background/CLI jobs,
+# always in worker threads when called from async code (see WriteGate)
 # Replace asyncpg with psycopg2 for sync operations
 sync_database_url = database_url.replace("postgresql+asyncpg://", "postgresql://")
 
+# Request handlers use the async driver of the same database
+def to_async_url(url: str) -> str:
+    return (
+        url
+        .replace("postgresql+asyncpg://", "postgresql://", 1)
+        .replace("sqlite+aiosqlite://", "sqlite://", 1)
+        .replace("postgresql://", "postgresql+asyncpg://", 1)
+        .replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+        .replace("sqlite://", "sqlite+aiosqlite://", 1)
+    )
+
+async_database_url = to_async_url(sync_database_url)
+
 # Create engine - use sync URL
 engine = create_engine(
     sync_database_url,
     pool_pre_ping=True,
-    echo=False
+    echo=False,
+    **pool_options(sync_database_url)
+)
+
+async_engine = create_async_engine(
+    async_database_url,
+    pool_pre_ping=True,
+    echo=False,
+    **pool_options(async_database_url, is_async=True)
 )
 
+instrument(engine, "sync")
+instrument(async_engine.sync_engine, "async")
+
+# Single-node SQLite: the request engine becomes the (queued) writer
+sqlite_profile = settings.SQLITE_PROFILE_ENABLED and is_file_sqlite(sync_database_url)
+if sqlite_profile:
+    apply_pragmas(engine)
+    apply_pragmas(async_engine.sync_engine)
+    track_writes(async_engine.sync_engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# expire_on_commit=False: attributes can't be lazily reloaded outside an await
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=WriteSerializedSession if sqlite_profile else AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Read-only endpoints go to a replica when one is configured and healthy. With
+# the SQLite profile and no replicas, a read-only pool on the same file plays
+# that role (WAL readers see every commit, so there is no lag)
+if settings.DATABASE_REPLICA_URLS:
+    replica_router = ReplicaRouter([to_async_url(url) for url in settings.DATABASE_REPLICA_URLS])
+elif sqlite_profile:
+    replica_router = ReplicaRouter([async_database_url], prefix="reader")
+else:
+    replica_router = ReplicaRouter([])
+
+if sqlite_profile:
+    for replica in replica_router.replicas:
+        if is_file_sqlite(replica.engine.url.render_as_string()):
+            apply_pragmas(replica.engine.sync_engine, read_only=True)
+
 Base = declarative_base()
 
 # Dependency
@@ -27,4 +87,24 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db(primary: AsyncSession = Depends(get_async_db)):
+    """
+    Session for read-only endpoints: a healthy replica, or the request's
+    primary session when there are no replicas or none is usable. Never write
+    through it, and keep reads of data the same user just wrote on
+    get_async_db (replicas lag).
+    """
+    db = await replica_router.session() if replica_router.enabled else None
+    if db is None:
+        yield primary
+        return
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 import time
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from app.core.config import settings
@@ -24,6 +25,10 @@ async def lifespan(app: FastAPI):
     models.Base.metadata.create_all(bind=engine)
     logger.info(" Database tables created")
     
+    # Columns added to existing tables come from the Alembic migrations (alembic upgrade head)
+    from app.services.catalog_service import catalog_service
+    catalog_service.ensure_search_index(engine)
+    
     # Create admin user if it doesn't exist
     from app.database import SessionLocal
     from app.models.models import User, UserRole
@@ -51,12 +56,52 @@ async def lifespan(app: FastAPI):
     finally:
         db.close()
     
+    from app.services.suggest_index import suggest_index
+    db = SessionLocal()
+    try:
+        suggest_index.rebuild(db)
+    except Exception as e:
+        logger.error(f"Error building suggest index: {e}")
+    finally:
+        db.close()
+    
+    background_tasks = []
+    if settings.TRANSLATION_PREWARM_ENABLED:
+        from app.services.translation_materializer import translation_materializer
+        background_tasks.append(asyncio.create_task(translation_materializer.run_forever()))
+        logger.info(" Pre-traducción de canciones populares activada")
+    if settings.YOUTUBE_LINK_ENABLED:
+        from app.services.spotify_youtube_matcher import spotify_youtube_matcher
+        background_tasks.append(asyncio.create_task(spotify_youtube_matcher.run_forever()))
+        logger.info(" Enlace Spotify-YouTube en segundo plano activado")
+    from app.services.query_log import query_log, search_warmer
+    if settings.QUERY_LOG_ENABLED:
+        background_tasks.append(asyncio.create_task(query_log.run_forever()))
+    if settings.QUERY_WARM_ENABLED:
+        background_tasks.append(asyncio.create_task(search_warmer.run_forever()))
+        logger.info(" Precalentamiento de búsquedas frecuentes activado")
+    from app.database import replica_router
+    if replica_router.enabled:
+        await replica_router.check_all()
+        background_tasks.append(asyncio.create_task(replica_router.run_forever()))
+        logger.info(f" Lecturas en {', '.join(replica.name for replica in replica_router.replicas)}")
+    
     logger.info("Application startup complete!")
     
     yield
     
     # Shutdown
     logger.info("Shutting down Music Recommendation API...")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.to_thread(query_log.flush)
+    
+    from app.services.spotify_service import spotify_service
+    await spotify_service.close()
+    
+    from app.database import async_engine
+    await async_engine.dispose()
+    await replica_router.dispose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float, Enum, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
 
+# Partial-index predicate for songs with a video (the only ones recommended).
+# Kept to IS NOT NULL: SQLite and Postgres both infer it from any comparison
+# on youtube_id, including ones with bound parameters
+PLAYABLE_SONG = "youtube_id IS NOT NULL"
+
 class UserRole(enum.Enum):
     USER = "user"
     ADMIN = "admin"
@@ -44,10 +49,26 @@ class Song(Base):
     audio_features = Column(Text)  # JSON string of Spotify audio features
     view_count = Column(Integer, default=0)
     is_explicit = Column(Boolean, default=False)
+    canonical_song_id = Column(Integer, ForeignKey("songs.id", ondelete="SET NULL"), index=True)  # NULL = canonical
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     playlist_songs = relationship("PlaylistSong", back_populates="song")
+    
+    # Query-shape indexes (also created for existing databases by the Alembic migrations)
+    __table_args__ = (
+        Index("ix_songs_view_count", view_count.desc()),
+        Index("ix_songs_language_view_count", language, view_count.desc()),
+        # Only songs with a video are recommended: popular and trending by language
+        Index(
+            "ix_songs_playable_language_view_count", language, view_count.desc(),
+            sqlite_where=text(PLAYABLE_SONG), postgresql_where=text(PLAYABLE_SONG)
+        ),
+        Index(
+            "ix_songs_playable_language_created_at", language, created_at,
+            sqlite_where=text(PLAYABLE_SONG), postgresql_where=text(PLAYABLE_SONG)
+        ),
+    )
 
 class Playlist(Base):
     __tablename__ = "playlists"
@@ -55,7 +76,7 @@ class Playlist(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     is_public = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -74,6 +95,10 @@ class PlaylistSong(Base):
     
     playlist = relationship("Playlist", back_populates="playlist_songs")
     song = relationship("Song", back_populates="playlist_songs")
+    
+    __table_args__ = (
+        Index("ix_playlist_songs_playlist_id_song_id", "playlist_id", "song_id"),
+    )
 
 class Recommendation(Base):
     __tablename__ = "recommendations"
@@ -87,6 +112,10 @@ class Recommendation(Base):
     
     user = relationship("User", back_populates="recommendations")
     song = relationship("Song")
+    
+    __table_args__ = (
+        Index("ix_recommendations_user_id_song_id", "user_id", "song_id"),
+    )
 
 class APIUsage(Base):
     __tablename__ = "api_usage"
@@ -99,4 +128,140 @@ class APIUsage(Base):
     response_time = Column(Float)  # in milliseconds
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+    
+    __table_args__ = (
+        Index("ix_api_usage_created_at_endpoint", "created_at", "endpoint"),
+    )
+
+class LyricsFetchLease(Base):
+    """Lease to make sure only one worker scrapes lyrics for a song at a time"""
+    __tablename__ = "lyrics_fetch_leases"
+    
+    song_id = Column(Integer, ForeignKey("songs.id", ondelete="CASCADE"), primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TranslationCacheEntry(Base):
+    """Persistent translation cache keyed by (hash of normalized text, source, target)"""
+    __tablename__ = "translation_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    text_hash = Column(String(64), nullable=False)
+    source_lang = Column(String, nullable=False)
+    target_lang = Column(String, nullable=False)
+    translated_text = Column(Text, nullable=False)
+    provider = Column(String)  # "Google Translate", "LibreTranslate", "MyMemory"
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_hit_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        UniqueConstraint("text_hash", "source_lang", "target_lang", name="uq_translation_cache_key"),
+    )
+
+
+class PipelineCheckpoint(Base):
+    """Resume point (last processed id) of a background pipeline stage"""
+    __tablename__ = "pipeline_checkpoints"
+    
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class SpotifyYouTubeLink(Base):
+    """Spotify track matched to a YouTube video (youtube_id is NULL when no match was found)"""
+    __tablename__ = "spotify_youtube_links"
+    
+    spotify_id = Column(String, primary_key=True)
+    youtube_id = Column(String, index=True)
+    confidence = Column(Float, default=0.0)
+    matched_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SongFingerprint(Base):
+    """MinHash signature of a song's normalized artist and title"""
+    __tablename__ = "song_fingerprints"
+    
+    song_id = Column(Integer, ForeignKey("songs.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(Text, nullable=False)  # comma-separated hex minhashes
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SongFingerprintBucket(Base):
+    """LSH bucket: songs whose signatures agree on every row of one band"""
+    __tablename__ = "song_fingerprint_buckets"
+    
+    band = Column(Integer, primary_key=True)
+    bucket = Column(String(16), primary_key=True)
+    song_id = Column(Integer, ForeignKey("songs.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+class SearchQueryLog(Base):
+    """One search as typed by a user (normalized), written in batches"""
+    __tablename__ = "search_query_log"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    query = Column(String, nullable=False)
+    language = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    created_at = Column(DateTime, nullable=False, index=True)
+
+
+class SearchQueryRollup(Base):
+    """Searches per (query, language) and hour"""
+    __tablename__ = "search_query_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    query = Column(String, nullable=False)
+    language = Column(String, nullable=False)
+    window_start = Column(DateTime, nullable=False)  # UTC, truncated to the hour
+    count = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("query", "language", "window_start", name="uq_search_query_rollup"),
+        Index("ix_search_query_rollups_language_window_start", "language", "window_start"),
+        Index("ix_search_query_rollups_window_start", "window_start"),
+    )
+
+
+class SearchCursorState(Base):
+    """Server-side state of a paginated search, so any worker can serve its next page"""
+    __tablename__ = "search_cursors"
+    
+    id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    query = Column(String, nullable=False)
+    language = Column(String)
+    page_size = Column(Integer, nullable=False)
+    state = Column(Text, nullable=False)  # JSON: pending song ids, YouTube pageToken, seen keys/clusters
+    version = Column(Integer, nullable=False, default=1)  # bumped by every page (optimistic lock)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class TranslationJobRecord(Base):
+    """Background translation job; its chunks are in translation_job_chunks"""
+    __tablename__ = "translation_jobs"
+    
+    id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    text = Column(Text, nullable=False)
+    source_lang = Column(String, nullable=False)
+    target_lang = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="running")  # running | done
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, index=True)  # UTC; finished jobs expire after TRANSLATION_JOB_TTL_SECONDS
+
+
+class TranslationJobChunk(Base):
+    """One stanza group of a translation job, written by the thread that translated it"""
+    __tablename__ = "translation_job_chunks"
+    
+    job_id = Column(String, ForeignKey("translation_jobs.id", ondelete="CASCADE"), primary_key=True)
+    index = Column(Integer, primary_key=True)
+    source = Column(Text, nullable=False)
+    translated = Column(Text)  # NULL until the chunk is done
+    provider = Column(String)  # NULL once done = the translation failed and the source is kept
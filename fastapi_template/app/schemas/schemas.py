@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, field_validator, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -71,6 +71,7 @@ class Song(SongBase):
     audio_features: Optional[str] = None
     view_count: int = 0
     is_explicit: bool = False
+    canonical_song_id: Optional[int] = None
     created_at: datetime
 
 # Playlist schemas
@@ -94,6 +95,8 @@ class MusicSearchRequest(BaseModel):
     query: str
     language: Optional[str] = None
     limit: int = 10
+    federated: bool = False  # consultar catálogo local, YouTube y Spotify a la vez
+    cursor: Optional[str] = None  # next_cursor de la página anterior
     
     @field_validator('limit')
     @classmethod
@@ -105,6 +108,9 @@ class MusicSearchRequest(BaseModel):
 class MusicSearchResult(BaseModel):
     songs: List[Song]
     total: int
+    tier: Optional[str] = None  # "local", "youtube" o "federated": quién respondió
+    sources: Optional[Dict[str, str]] = None  # estado por fuente en búsqueda federada
+    next_cursor: Optional[str] = None  # None cuando no hay más páginas
 
 class StreamingURL(BaseModel):
     youtube_url: Optional[str] = None
@@ -0,0 +1,290 @@
+import re
+import logging
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.models import Song
+
+logger = logging.getLogger(__name__)
+
+
+# Ruido típico en títulos de YouTube/Spotify que no identifica la canción
+NOISE_PATTERN = re.compile(
+    r'\b(official|oficial|video|videoclip|audio|lyrics?|letra|visualizer|hd|hq|4k|'
+    r'remaster(ed)?|vevo|topic|music)\b'
+)
+FEATURING_PATTERN = re.compile(r'\b(ft|feat|featuring|con|with)\b.*$')
+
+
+class CatalogService:
+    """
+    Operaciones sobre el catálogo de canciones compartidas por la búsqueda,
+    las recomendaciones y los pipelines de ingesta
+    """
+
+    # Expresión del índice GIN de PostgreSQL; la consulta debe usar la misma
+    PG_TSVECTOR = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(artist, ''))"
+    CANDIDATE_FACTOR = 4
+
+    def __init__(self):
+        # Motor del índice de texto completo; None = ILIKE
+        self.fts_dialect: Optional[str] = None
+        logger.info(" Catalog Service initialized")
+
+    def fold(self, text: str) -> str:
+        """Minúsculas, sin acentos, sin paréntesis ni signos"""
+        text = unicodedata.normalize("NFKD", (text or "").lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        text = text.replace("&amp;", "&")
+        text = re.sub(r'\(.*?\)|\[.*?\]|\{.*?\}', ' ', text)
+        return text
+
+    def normalize_artist(self, artist: str) -> str:
+        """Primer artista, sin sufijos de canal (VEVO, - Topic, Official)"""
+        artist = self.fold(artist)
+        artist = re.sub(r'\s*-\s*topic$', '', artist)
+        artist = re.sub(r'(?<=\w)vevo\b', '', artist)  # "ShakiraVEVO"
+        artist = re.split(r',|&|\bx\b|\by\b|\band\b|\bft\b|\bfeat\b', artist)[0]
+        artist = NOISE_PATTERN.sub(' ', artist)
+        return " ".join(re.sub(r'[^\w\s]', ' ', artist).split())
+
+    def normalize_title(self, title: str, artist: str = "") -> str:
+        """Título sin artista delante ('Artista - Canción'), featurings ni ruido"""
+        title = self.fold(title)
+        parts = re.split(r'\s[-–—|]\s', title)
+        if len(parts) >= 2:
+            folded_artist = self.normalize_artist(artist)
+            first = " ".join(re.sub(r'[^\w\s]', ' ', parts[0]).split())
+            # "Artista - Canción": quedarse con la canción
+            if not folded_artist or folded_artist in first or first in folded_artist:
+                title = parts[1]
+            else:
+                title = parts[0]
+        title = FEATURING_PATTERN.sub(' ', title)
+        title = NOISE_PATTERN.sub(' ', title)
+        return " ".join(re.sub(r'[^\w\s]', ' ', title).split())
+
+    def song_key(self, title: str, artist: str) -> str:
+        """
+        Clave de normalización compartida para detectar la misma canción
+        entre fuentes (catálogo, YouTube, Spotify)
+        """
+        return f"{self.normalize_artist(artist)}|{self.normalize_title(title, artist)}"
+
+    def ensure_search_index(self, engine: Engine):
+        """
+        Crea (si no existe) el índice de texto completo sobre título y artista.
+        SQLite: tabla FTS5 de contenido externo sincronizada con triggers.
+        PostgreSQL: índices GIN de tsvector y de trigramas (pg_trgm).
+        Otros motores siguen usando ILIKE
+        """
+        dialect = engine.dialect.name
+        try:
+            with engine.begin() as conn:
+                if dialect == "sqlite":
+                    self._ensure_sqlite_fts(conn)
+                elif dialect == "postgresql":
+                    self._ensure_postgres_indexes(conn)
+                else:
+                    return
+            self.fts_dialect = dialect
+            logger.info(f" Índice de búsqueda local listo ({dialect})")
+        except Exception as e:
+            logger.error(f"No se pudo crear el índice de búsqueda local: {e}")
+
+    def _ensure_sqlite_fts(self, conn):
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'songs_fts'"
+        ).first()
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS songs_fts USING fts5("
+            "title, artist, content='songs', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        conn.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS songs_fts_ai AFTER INSERT ON songs BEGIN "
+            "INSERT INTO songs_fts(rowid, title, artist) VALUES (new.id, new.title, new.artist); END"
+        )
+        conn.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS songs_fts_ad AFTER DELETE ON songs BEGIN "
+            "INSERT INTO songs_fts(songs_fts, rowid, title, artist) VALUES ('delete', old.id, old.title, old.artist); END"
+        )
+        conn.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS songs_fts_au AFTER UPDATE OF title, artist ON songs BEGIN "
+            "INSERT INTO songs_fts(songs_fts, rowid, title, artist) VALUES ('delete', old.id, old.title, old.artist); "
+            "INSERT INTO songs_fts(rowid, title, artist) VALUES (new.id, new.title, new.artist); END"
+        )
+        if not exists:
+            # Indexar las canciones que ya había antes de crear la tabla
+            conn.exec_driver_sql("INSERT INTO songs_fts(songs_fts) VALUES ('rebuild')")
+
+    def _ensure_postgres_indexes(self, conn):
+        conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_songs_search_tsv ON songs USING gin ({self.PG_TSVECTOR})"
+        )
+        conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_songs_title_trgm ON songs USING gin (title gin_trgm_ops)")
+        conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_songs_artist_trgm ON songs USING gin (artist gin_trgm_ops)")
+
+    def search_terms(self, query: str) -> List[str]:
+        return [term for term in re.findall(r'\w+', self.fold(query)) if len(term) > 1][:8]
+
+    def search_local_scored(self, db: Session, query: str, limit: int) -> List[Tuple[Song, float]]:
+        """
+        Canciones del catálogo con su relevancia (fracción de términos de la
+        consulta presentes en título/artista, 0-1), de más a menos relevante
+        """
+        terms = self.search_terms(query)
+        if not terms:
+            return []
+
+        candidates = self._candidates(db, query, terms, limit * self.CANDIDATE_FACTOR)
+        scored = []
+        for position, song in enumerate(candidates):
+            words = re.findall(r'\w+', self.fold(f"{song.title} {song.artist}"))
+            matched = sum(1 for term in terms if any(word.startswith(term) for word in words))
+            scored.append((song, matched / len(terms), position))
+
+        # Relevancia, después popularidad y el orden del motor (rank)
+        scored.sort(key=lambda item: (-item[1], -(item[0].view_count or 0), item[2]))
+        return [(song, score) for song, score, _ in scored[:limit]]
+
+    def _candidates(self, db: Session, query: str, terms: List[str], limit: int) -> List[Song]:
+        try:
+            if self.fts_dialect == "sqlite":
+                match = " OR ".join(f'"{term}"*' for term in terms)
+                ids = [row[0] for row in db.execute(
+                    text("SELECT rowid FROM songs_fts WHERE songs_fts MATCH :match ORDER BY rank LIMIT :limit"),
+                    {"match": match, "limit": limit}
+                )]
+                return self.get_in_order(db, ids)
+
+            if self.fts_dialect == "postgresql":
+                ids = [row[0] for row in db.execute(
+                    text(
+                        f"SELECT id FROM songs "
+                        f"WHERE {self.PG_TSVECTOR} @@ to_tsquery('simple', :tsquery) "
+                        f"OR title % :query OR artist % :query "
+                        f"ORDER BY ts_rank({self.PG_TSVECTOR}, to_tsquery('simple', :tsquery)) DESC, "
+                        f"greatest(similarity(title, :query), similarity(artist, :query)) DESC "
+                        f"LIMIT :limit"
+                    ),
+                    {"tsquery": " | ".join(f"{term}:*" for term in terms), "query": query, "limit": limit}
+                )]
+                return self.get_in_order(db, ids)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error en búsqueda de texto completo, usando ILIKE: {e}")
+
+        filters = [
+            or_(Song.title.ilike(f"%{term}%"), Song.artist.ilike(f"%{term}%"))
+            for term in query.split() if len(term) > 1
+        ][:5]
+        if not filters:
+            return []
+        return db.query(Song).filter(or_(*filters)).order_by(
+            Song.view_count.desc()
+        ).limit(limit).all()
+
+    def get_in_order(self, db: Session, ids: List[int]) -> List[Song]:
+        if not ids:
+            return []
+        songs = {song.id: song for song in db.query(Song).filter(Song.id.in_(ids)).all()}
+        return [songs[song_id] for song_id in ids if song_id in songs]
+
+    def youtube_rows(self, results: List[Dict], language: Optional[str]) -> List[Dict]:
+        """Filas de Song para ingest() a partir de resultados de youtube_service"""
+        return [
+            {
+                "title": result["title"],
+                "artist": result["artist"],
+                "youtube_id": result["youtube_id"],
+                "thumbnail_url": result.get("thumbnail_url"),
+                "language": language
+            }
+            for result in results
+        ]
+
+    def ingest(self, db: Session, rows: List[Dict], key: str = "youtube_id") -> Tuple[List[Song], int]:
+        """
+        Guarda un lote de canciones en una sola transacción: un SELECT ... IN
+        para las existentes y un INSERT ... ON CONFLICT DO NOTHING RETURNING
+        para las nuevas. Las filas que otra petición insertó a la vez se
+        recuperan con un segundo SELECT. Devuelve (canciones en el orden de
+        entrada, número de creadas)
+        """
+        column = getattr(Song, key)
+        unique_rows: Dict[str, Dict] = {}
+        for row in rows:
+            if row.get(key):
+                unique_rows.setdefault(row[key], row)
+        if not unique_rows:
+            return [], 0
+
+        found = self._by_key(db, column, list(unique_rows))
+        missing = [row for value, row in unique_rows.items() if value not in found]
+
+        created: List[Song] = []
+        if missing:
+            created = self._insert_missing(db, missing, key)
+            for song in created:
+                found[getattr(song, key)] = song
+
+            raced = [row[key] for row in missing if row[key] not in found]
+            if raced:
+                found.update(self._by_key(db, column, raced))
+
+            # Huellas de las canciones nuevas en la misma transacción
+            # (imports locales: ambos servicios dependen de este módulo)
+            from app.services.song_fingerprints import song_fingerprinter
+            from app.services.suggest_index import suggest_index
+            song_fingerprinter.assign(db, created)
+
+        db.commit()
+        if created:
+            suggest_index.add_songs(created)
+        return [found[value] for value in unique_rows if value in found], len(created)
+
+    def collapse_duplicates(self, songs: List[Song]) -> List[Song]:
+        """Una sola entrada por grupo de casi duplicados (la primera que aparece)"""
+        seen = set()
+        collapsed = []
+        for song in songs:
+            cluster = song.canonical_song_id or song.id
+            if cluster not in seen:
+                seen.add(cluster)
+                collapsed.append(song)
+        return collapsed
+
+    def _by_key(self, db: Session, column, values: List[str]) -> Dict[str, Song]:
+        return {getattr(song, column.key): song for song in db.query(Song).filter(column.in_(values)).all()}
+
+    def _insert_missing(self, db: Session, rows: List[Dict], key: str) -> List[Song]:
+        # Un INSERT multi-fila necesita las mismas columnas en todas las filas
+        columns = set().union(*rows)
+        defaults = {
+            name: Song.__table__.c[name].default.arg if Song.__table__.c[name].default is not None else None
+            for name in columns
+        }
+        values = [{name: row.get(name, defaults[name]) for name in columns} for row in rows]
+
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            # Solo se ignora el choque en la clave del lote (carrera con otra
+            # petición); cualquier otra violación de unicidad debe fallar
+            stmt = insert(Song).values(values).on_conflict_do_nothing(index_elements=[key]).returning(Song)
+            return list(db.scalars(stmt))
+
+        # Otros motores: inserción normal (sin protección ante carreras)
+        songs = [Song(**row) for row in values]
+        db.add_all(songs)
+        db.flush()
+        return songs
+
+
+# Instancia global
+catalog_service = CatalogService()
@@ -0,0 +1,262 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from app.core.config import settings
+from app.services.page_cache import page_cache, CachedPage
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8'
+}
+
+
+class TokenBucket:
+    """
+    Token bucket por host: `rate` peticiones/segundo con ráfagas de hasta `capacity`
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = max(rate, 0.01)
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Bloquea hasta obtener un token. Devuelve los segundos esperados."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+    def block_for(self, seconds: float):
+        """Vacía el bucket y no entrega tokens durante `seconds` (Retry-After)"""
+        with self.lock:
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+@dataclass
+class HostState:
+    session: requests.Session
+    bucket: TokenBucket
+    semaphore: threading.BoundedSemaphore
+    throttled: int = 0  # 429/503 seguidos sin Retry-After (backoff exponencial)
+
+
+class HttpClient:
+    """
+    Capa HTTP saliente compartida: un pool de conexiones por host, rate limit
+    por host, límite de concurrencia y respeto de Retry-After / 429
+    """
+
+    RETRY_STATUSES = (429, 503)
+
+    def __init__(self):
+        self.default_rate = settings.HTTP_DEFAULT_RATE
+        self.default_burst = settings.HTTP_DEFAULT_BURST
+        self.max_concurrency = settings.HTTP_MAX_CONCURRENCY_PER_HOST
+        self.pool_maxsize = settings.HTTP_POOL_MAXSIZE
+        self.max_retry_after = settings.HTTP_MAX_RETRY_AFTER
+        self.throttle_backoff = settings.HTTP_THROTTLE_BACKOFF_SECONDS
+        self.host_rates = settings.HTTP_HOST_RATES
+        self.hosts: Dict[str, HostState] = {}
+        self.lock = threading.Lock()
+        logger.info(" HTTP client initialized")
+
+    def _host_state(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state:
+            return state
+
+        with self.lock:
+            state = self.hosts.get(host)
+            if not state:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+
+                rate = self.host_rates.get(host, self.default_rate)
+                state = HostState(
+                    session=session,
+                    bucket=TokenBucket(rate, self.default_burst),
+                    semaphore=threading.BoundedSemaphore(self.max_concurrency)
+                )
+                self.hosts[host] = state
+        return state
+
+    @contextmanager
+    def slot(self, host: str):
+        """
+        Reserva un turno para `host` (token + concurrencia). Sirve también para
+        clientes de terceros que hacen sus propias peticiones (deep-translator)
+        """
+        state = self._host_state(host)
+        waited = state.bucket.acquire()
+        if waited > 0.05:
+            logger.debug(f"   {host}: esperado {waited:.2f}s por rate limit")
+
+        state.semaphore.acquire()
+        try:
+            yield state
+        finally:
+            state.semaphore.release()
+
+    def penalize(self, host: str, seconds: Optional[float] = None) -> float:
+        """
+        Detiene las peticiones a `host` tras un 429 o similar. Sin Retry-After
+        la pausa crece 1, 2, 4... x HTTP_THROTTLE_BACKOFF_SECONDS hasta el máximo
+        """
+        state = self._host_state(host)
+        if seconds is None:
+            seconds = min(self.throttle_backoff * 2 ** state.throttled, self.max_retry_after)
+            state.throttled += 1
+        logger.warning(f"   {host}: throttled, pausando {seconds:.1f}s")
+        state.bucket.block_for(seconds)
+        return seconds
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urlsplit(url).netloc
+
+        with self.slot(host) as state:
+            response = state.session.request(method, url, **kwargs)
+
+        if response.status_code in self.RETRY_STATUSES:
+            retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+            wait = self.penalize(host, retry_after)
+
+            # Solo se reintenta una vez y si la espera es razonable
+            if wait <= self.max_retry_after:
+                with self.slot(host) as state:
+                    response = state.session.request(method, url, **kwargs)
+                if response.status_code in self.RETRY_STATUSES:
+                    self.penalize(host, self._parse_retry_after(response.headers.get("Retry-After")))
+
+        if response.status_code not in self.RETRY_STATUSES:
+            state.throttled = 0
+
+        return response
+
+    def get(self, url: str, cache: bool = False, **kwargs) -> requests.Response:
+        """
+        GET. Con `cache=True` usa la caché de páginas en disco: sirve la copia
+        local si es reciente (o en modo offline) y si no revalida con
+        If-None-Match / If-Modified-Since, de modo que repetir cuesta un 304
+        """
+        if not cache or not page_cache.enabled:
+            return self.request("GET", url, **kwargs)
+
+        cached = page_cache.get(url)
+        if cached:
+            age = time.time() - cached.fetched_at
+            if settings.PAGE_CACHE_OFFLINE or age < settings.PAGE_CACHE_FRESH_SECONDS:
+                return self._response_from_cache(cached)
+
+            headers = dict(kwargs.pop("headers", None) or {})
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+            kwargs["headers"] = headers
+        elif settings.PAGE_CACHE_OFFLINE:
+            return self._offline_miss(url)
+
+        try:
+            response = self.request("GET", url, **kwargs)
+        except requests.RequestException:
+            if cached:
+                logger.debug(f"   Red no disponible, usando copia en caché de {url}")
+                return self._response_from_cache(cached)
+            raise
+
+        if response.status_code == 304 and cached:
+            page_cache.touch(url)
+            return self._response_from_cache(cached)
+
+        if response.status_code == 200:
+            page_cache.put(
+                url,
+                response.content,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                content_type=response.headers.get("Content-Type"),
+                encoding=response.encoding
+            )
+
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _response_from_cache(self, cached: CachedPage) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.url = cached.url
+        response._content = cached.content
+        response.encoding = cached.encoding
+        response.headers = CaseInsensitiveDict({
+            "Content-Type": cached.content_type or "",
+            "X-From-Cache": "1"
+        })
+        return response
+
+    def _offline_miss(self, url: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 504  # igual que only-if-cached
+        response.url = url
+        response._content = b""
+        return response
+
+    def _parse_retry_after(self, value: Optional[str]) -> Optional[float]:
+        return parse_retry_after(value)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos de una cabecera Retry-After (segundos o fecha HTTP); None si no es válida"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(retry_at.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+# Instancia global
+http_client = HttpClient()
@@ -0,0 +1,223 @@
+import math
+import re
+import logging
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.models import Song
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Textos semilla para construir los perfiles de n-gramas de cada idioma.
+# Vocabulario frecuente y típico de letras de canciones
+SEED_TEXTS = {
+    "es": """
+        yo te quiero y tú me quieres, el amor de mi vida está en tu corazón.
+        no sé qué hacer sin ti, mi amor, esta noche quiero bailar contigo.
+        cuando te veo se me olvida todo, dime que sí, que nunca te vas a ir.
+        la vida es una canción que cantamos juntos hasta el amanecer.
+        ella baila sola en la calle, con la luna y las estrellas del cielo.
+        porque tú eres mía y yo soy tuyo, dame un beso y vámonos de aquí.
+        todos los días pienso en ti, en tus ojos y en tu boca, mi cariño.
+        si me dejas me muero, no quiero perderte, quédate conmigo para siempre.
+        estamos bien, nadie nos puede parar, vamos a la fiesta con los amigos.
+        también tengo ganas de verte otra vez, lo que pasó ya no importa más.
+        hay que vivir el momento, después de la tormenta siempre sale el sol.
+    """,
+    "en": """
+        i love you and you love me, you are the only one in my heart tonight.
+        i don't know what to do without you, baby, let's dance all night long.
+        when i see you everything is gone, tell me that you will never leave.
+        life is a song that we sing together until the morning light.
+        she is dancing on her own in the street with the moon and the stars.
+        because you are mine and i am yours, give me a kiss and take me away.
+        every day i think about you, your eyes and your smile, my darling.
+        if you leave me i will die, i don't want to lose you, stay with me forever.
+        we are fine, nobody can stop us now, we're going to the party with friends.
+        i want to see you again, what happened before doesn't matter anymore.
+        you have to live the moment, after the storm the sun always shines.
+    """,
+    "pt": """
+        eu te amo e você me ama, o amor da minha vida está no seu coração.
+        não sei o que fazer sem você, meu amor, esta noite quero dançar com você.
+        quando eu te vejo esqueço tudo, diz que sim, que nunca vai embora.
+        a vida é uma canção que a gente canta junto até o amanhecer.
+        ela dança sozinha na rua, com a lua e as estrelas do céu.
+        porque você é minha e eu sou seu, me dá um beijo e vamos embora daqui.
+        todos os dias eu penso em você, nos seus olhos e na sua boca, meu bem.
+        se você me deixar eu morro, não quero te perder, fica comigo pra sempre.
+        estamos bem, ninguém pode nos parar, vamos pra festa com os amigos.
+        também tenho vontade de te ver de novo, o que aconteceu não importa mais.
+        tem que viver o momento, depois da tempestade sempre vem o sol.
+    """,
+    "fr": """
+        je t'aime et tu m'aimes, l'amour de ma vie est dans ton cœur ce soir.
+        je ne sais pas quoi faire sans toi, mon amour, ce soir je veux danser avec toi.
+        quand je te vois j'oublie tout, dis-moi oui, que tu ne partiras jamais.
+        la vie est une chanson que nous chantons ensemble jusqu'au matin.
+        elle danse toute seule dans la rue, avec la lune et les étoiles du ciel.
+        parce que tu es à moi et je suis à toi, donne-moi un baiser et partons d'ici.
+        tous les jours je pense à toi, à tes yeux et à ta bouche, ma chérie.
+        si tu me quittes je meurs, je ne veux pas te perdre, reste avec moi pour toujours.
+        nous allons bien, personne ne peut nous arrêter, on va à la fête avec les amis.
+        j'ai aussi envie de te revoir, ce qui s'est passé n'a plus d'importance.
+        il faut vivre le moment, après la tempête le soleil revient toujours.
+    """,
+    "it": """
+        io ti amo e tu mi ami, l'amore della mia vita è nel tuo cuore stasera.
+        non so cosa fare senza di te, amore mio, stanotte voglio ballare con te.
+        quando ti vedo dimentico tutto, dimmi di sì, che non te ne andrai mai.
+        la vita è una canzone che cantiamo insieme fino all'alba.
+        lei balla da sola per la strada, con la luna e le stelle del cielo.
+        perché tu sei mia e io sono tuo, dammi un bacio e andiamo via di qui.
+        tutti i giorni penso a te, ai tuoi occhi e alla tua bocca, tesoro mio.
+        se mi lasci io muoio, non voglio perderti, resta con me per sempre.
+        stiamo bene, nessuno ci può fermare, andiamo alla festa con gli amici.
+        anche io ho voglia di rivederti, quello che è successo non importa più.
+        bisogna vivere il momento, dopo la tempesta torna sempre il sole.
+    """,
+    "de": """
+        ich liebe dich und du liebst mich, die liebe meines lebens ist in deinem herzen.
+        ich weiß nicht, was ich ohne dich tun soll, heute nacht will ich mit dir tanzen.
+        wenn ich dich sehe, vergesse ich alles, sag mir ja, dass du niemals gehst.
+        das leben ist ein lied, das wir zusammen singen bis zum morgen.
+        sie tanzt allein auf der straße, mit dem mond und den sternen am himmel.
+        weil du mein bist und ich dein bin, gib mir einen kuss und lass uns gehen.
+        jeden tag denke ich an dich, an deine augen und deinen mund, mein schatz.
+        wenn du mich verlässt, sterbe ich, ich will dich nicht verlieren, bleib bei mir.
+        uns geht es gut, niemand kann uns aufhalten, wir gehen mit den freunden zur party.
+        ich möchte dich auch wiedersehen, was passiert ist, ist nicht mehr wichtig.
+        man muss den moment leben, nach dem sturm scheint immer die sonne.
+    """,
+}
+
+
+class LanguageDetector:
+    """
+    Identificador de idioma local (sin red) basado en n-gramas de caracteres.
+    Cada n-grama tiene un vector de log-probabilidades (una por idioma) y la
+    puntuación de un texto es la suma de los vectores de sus n-gramas
+    """
+
+    NGRAM_SIZES = (1, 2, 3)
+
+    def __init__(self):
+        self.languages: List[str] = list(SEED_TEXTS.keys())
+        self.weights: Dict[str, List[float]] = {}
+        self.unseen: List[float] = []
+        self._train(SEED_TEXTS)
+        logger.info(f" Language Detector initialized ({', '.join(self.languages)})")
+
+    def _train(self, corpora: Dict[str, str]):
+        counts = {lang: Counter(self._ngrams(text)) for lang, text in corpora.items()}
+        vocabulary = set().union(*counts.values())
+        vocab_size = len(vocabulary)
+
+        totals = {lang: sum(counter.values()) for lang, counter in counts.items()}
+        # Suavizado de Laplace: un n-grama no visto tiene probabilidad 1/(total+V)
+        self.unseen = [-math.log(totals[lang] + vocab_size) for lang in self.languages]
+
+        for ngram in vocabulary:
+            self.weights[ngram] = [
+                math.log(counts[lang][ngram] + 1) + self.unseen[i]
+                for i, lang in enumerate(self.languages)
+            ]
+
+    def _normalize(self, text: str) -> str:
+        text = unicodedata.normalize("NFC", text.lower())
+        # Solo letras; números, signos y emojis no aportan
+        text = re.sub(r"[^\w\s']|\d|_", " ", text)
+        return " ".join(text.split())
+
+    def _ngrams(self, text: str) -> Iterable[str]:
+        for word in self._normalize(text).split():
+            padded = f" {word} "
+            for n in self.NGRAM_SIZES:
+                for i in range(len(padded) - n + 1):
+                    gram = padded[i:i + n]
+                    if gram.strip():
+                        yield gram
+
+    def scores(self, text: str) -> Tuple[List[float], int]:
+        """Log-verosimilitud por idioma y número de n-gramas usados"""
+        totals = [0.0] * len(self.languages)
+        used = 0
+
+        for gram, count in Counter(self._ngrams(text)).items():
+            row = self.weights.get(gram, self.unseen)
+            for i, value in enumerate(row):
+                totals[i] += value * count
+            used += count
+
+        return totals, used
+
+    def detect(self, text: Optional[str]) -> Tuple[Optional[str], float]:
+        """Devuelve (idioma, confianza 0-1). (None, 0.0) si no hay texto suficiente"""
+        if not text:
+            return None, 0.0
+
+        totals, used = self.scores(text[:settings.LANGUAGE_DETECTION_MAX_CHARS])
+        if used < settings.LANGUAGE_DETECTION_MIN_NGRAMS:
+            return None, 0.0
+
+        # Softmax sobre la log-verosimilitud media por n-grama
+        averaged = [total / used for total in totals]
+        best = max(averaged)
+        exps = [math.exp((value - best) * used ** 0.5) for value in averaged]
+        index = averaged.index(best)
+        return self.languages[index], exps[index] / sum(exps)
+
+    def detect_batch(self, texts: List[Optional[str]]) -> List[Tuple[Optional[str], float]]:
+        return [self.detect(text) for text in texts]
+
+    def detect_confident(self, text: Optional[str]) -> Optional[str]:
+        """Idioma solo si supera LANGUAGE_DETECTION_MIN_CONFIDENCE"""
+        language, confidence = self.detect(text)
+        if language and confidence >= settings.LANGUAGE_DETECTION_MIN_CONFIDENCE:
+            return language
+        return None
+
+    def song_text(self, song: Song) -> str:
+        """Texto de la canción a analizar: letras si existen, si no el título"""
+        lyrics = song.lyrics or ""
+        if len(lyrics) > 50 and "no disponibles" not in lyrics.lower():
+            return lyrics
+        return song.title or ""
+
+    def backfill(self, db: Session, overwrite: bool = False, batch_size: int = 500) -> dict:
+        """
+        Recorre el catálogo por lotes y rellena Song.language con el idioma
+        detectado (solo si la confianza es suficiente)
+        """
+        result = {"scanned": 0, "updated": 0, "low_confidence": 0}
+        last_id = 0
+
+        while True:
+            query = db.query(Song).filter(Song.id > last_id)
+            if not overwrite:
+                query = query.filter((Song.language == None) | (Song.language == ""))
+            songs = query.order_by(Song.id).limit(batch_size).all()
+            if not songs:
+                break
+
+            detections = self.detect_batch([self.song_text(song) for song in songs])
+            for song, (language, confidence) in zip(songs, detections):
+                result["scanned"] += 1
+                if not language or confidence < settings.LANGUAGE_DETECTION_MIN_CONFIDENCE:
+                    result["low_confidence"] += 1
+                elif song.language != language:
+                    song.language = language
+                    result["updated"] += 1
+
+            db.commit()
+            last_id = songs[-1].id
+
+        logger.info(f" Backfill de idiomas: {result}")
+        return result
+
+
+# Instancia global
+language_detector = LanguageDetector()
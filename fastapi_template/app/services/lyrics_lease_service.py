@@ -0,0 +1,116 @@
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Song, LyricsFetchLease
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LyricsLeaseService:
+    """
+    Leases en BD para que un solo worker haga el scraping de letras de una
+    canción; el resto espera el resultado en lugar de repetir el trabajo
+    """
+
+    def __init__(self):
+        self.ttl = timedelta(seconds=settings.LYRICS_LEASE_TTL_SECONDS)
+        logger.info(" Lyrics Lease Service initialized")
+
+    async def try_acquire(self, db: AsyncSession, song_id: int) -> Optional[str]:
+        """
+        Intenta reclamar la canción. Devuelve el token del lease o None si
+        otro worker tiene un lease vigente
+        """
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+
+        if await self._insert_lease(db, song_id, token, now + self.ttl):
+            await db.commit()
+            return token
+
+        # Ya existe: solo se puede quitar si expiró (worker caído)
+        result = await db.execute(
+            update(LyricsFetchLease).where(
+                LyricsFetchLease.song_id == song_id,
+                LyricsFetchLease.expires_at < now
+            ).values(owner=token, expires_at=now + self.ttl)
+        )
+        await db.commit()
+
+        if result.rowcount:
+            logger.info(f" Lease expirado recuperado para canción {song_id}")
+            return token
+        return None
+
+    async def _insert_lease(self, db: AsyncSession, song_id: int, token: str, expires_at: datetime) -> bool:
+        """
+        INSERT ... ON CONFLICT DO NOTHING donde existe: un conflicto no hace
+        rollback de la sesión (que expiraría la canción ya cargada)
+        """
+        values = {"song_id": song_id, "owner": token, "expires_at": expires_at}
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            result = await db.execute(insert(LyricsFetchLease).values(values).on_conflict_do_nothing())
+            return result.rowcount == 1
+
+        try:
+            db.add(LyricsFetchLease(**values))
+            await db.commit()
+            return True
+        except IntegrityError:
+            await db.rollback()
+            return False
+
+    async def release(self, db: AsyncSession, song_id: int, token: str):
+        """Libera el lease si sigue siendo nuestro"""
+        try:
+            await db.execute(
+                delete(LyricsFetchLease).where(
+                    LyricsFetchLease.song_id == song_id,
+                    LyricsFetchLease.owner == token
+                )
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error liberando lease de canción {song_id}: {e}")
+
+    async def wait_for_release(self, db: AsyncSession, song_id: int, timeout: float) -> bool:
+        """
+        Espera a que el worker que tiene el lease termine.
+        Devuelve False si se agota el tiempo
+        """
+        deadline = asyncio.get_running_loop().time() + timeout
+
+        while True:
+            active = await db.scalar(
+                select(LyricsFetchLease.song_id).where(
+                    LyricsFetchLease.song_id == song_id,
+                    LyricsFetchLease.expires_at >= datetime.utcnow()
+                )
+            )
+            # Cerrar la transacción de lectura para ver el commit del otro worker
+            await db.commit()
+
+            if not active:
+                return True
+
+            if asyncio.get_running_loop().time() >= deadline:
+                return False
+
+            await asyncio.sleep(settings.LYRICS_LEASE_POLL_SECONDS)
+
+    async def current_lyrics(self, db: AsyncSession, song_id: int) -> Optional[str]:
+        return await db.scalar(select(Song.lyrics).where(Song.id == song_id))
+
+
+# Instancia global
+lyrics_lease_service = LyricsLeaseService()
@@ -1,12 +1,11 @@
 import os
 import logging
 from typing import Optional, List, Tuple
-import requests
 from bs4 import BeautifulSoup
 import re
 from urllib.parse import quote_plus, quote
-import time
 import unicodedata
+from app.services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +16,8 @@ class LyricsService:
     """
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8'
-        })
+        # Pool por host + rate limit compartido (ver http_client)
+        self.http = http_client
         self.genius_token = os.getenv("GENIUS_ACCESS_TOKEN", "")
         logger.info(" Lyrics Service DEFINITIVO initialized")
 
@@ -185,7 +181,7 @@ class LyricsService:
         """Lyrics.ovh API"""
         try:
             url = f"https://api.lyrics.ovh/v1/{quote(artist)}/{quote(title)}"
-            response = self.session.get(url, timeout=8)
+            response = self.http.get(url, timeout=8, cache=True)
             
             if response.status_code == 200:
                 return response.json().get('lyrics', '').strip()
@@ -201,7 +197,7 @@ class LyricsService:
             title_url = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
             
             url = f"https://www.letras.com/{artist_url}/{title_url}/"
-            response = self.session.get(url, timeout=10)
+            response = self.http.get(url, timeout=10, cache=True)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -229,7 +225,7 @@ class LyricsService:
             title_url = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
             
             url = f"https://www.vagalume.com.br/{artist_url}/{title_url}.html"
-            response = self.session.get(url, timeout=10)
+            response = self.http.get(url, timeout=10, cache=True)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -249,7 +245,7 @@ class LyricsService:
         """Musixmatch scraping"""
         try:
             search_url = f"https://www.musixmatch.com/search/{quote_plus(f'{artist} {title}')}/tracks"
-            response = self.session.get(search_url, timeout=10)
+            response = self.http.get(search_url, timeout=10, cache=True)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -257,9 +253,8 @@ class LyricsService:
                 
                 if track_link and track_link.get('href'):
                     track_url = 'https://www.musixmatch.com' + track_link['href']
-                    time.sleep(0.3)
                     
-                    track_response = self.session.get(track_url, timeout=10)
+                    track_response = self.http.get(track_url, timeout=10, cache=True)
                     if track_response.status_code == 200:
                         track_soup = BeautifulSoup(track_response.content, 'html.parser')
                         lyrics_spans = track_soup.find_all('span', class_='lyrics__content__ok')
@@ -275,7 +270,7 @@ class LyricsService:
         """Genius API JSON"""
         try:
             search_url = f"https://genius.com/api/search/multi?q={quote_plus(f'{artist} {title}')}"
-            response = self.session.get(search_url, timeout=10)
+            response = self.http.get(search_url, timeout=10, cache=True)
             
             if response.status_code == 200:
                 data = response.json()
@@ -296,8 +291,7 @@ class LyricsService:
     def _scrape_genius_page(self, url: str) -> Optional[str]:
         """Scrape Genius page"""
         try:
-            time.sleep(0.5)
-            response = self.session.get(url, timeout=15)
+            response = self.http.get(url, timeout=15, cache=True)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -325,7 +319,7 @@ class LyricsService:
             title_clean = re.sub(r'[^a-z0-9]', '', title.lower())
             
             url = f"https://www.azlyrics.com/lyrics/{artist_clean}/{title_clean}.html"
-            response = self.session.get(url, timeout=10)
+            response = self.http.get(url, timeout=10, cache=True)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -347,7 +341,7 @@ class LyricsService:
             title_url = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
             
             url = f"http://www.songlyrics.com/{artist_url}/{title_url}-lyrics/"
-            response = self.session.get(url, timeout=10)
+            response = self.http.get(url, timeout=10, cache=True)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPage:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: Optional[str]
+    encoding: Optional[str]
+    fetched_at: float
+    size: int = 0
+    content: bytes = b""
+
+
+class PageCache:
+    """
+    Caché en disco de páginas descargadas, direccionada por hash de la URL.
+    Cuerpo comprimido con zlib, límite de tamaño con expulsión LRU y
+    ETag / Last-Modified guardados para revalidar con GET condicional
+    """
+
+    def __init__(self):
+        self.enabled = settings.PAGE_CACHE_ENABLED
+        self.directory = settings.PAGE_CACHE_DIR
+        self.max_bytes = settings.PAGE_CACHE_MAX_BYTES
+        self.lock = threading.Lock()
+        self.total_bytes = None  # se calcula en el primer uso
+        logger.info(f" Page cache: {'enabled' if self.enabled else 'disabled'} ({self.directory})")
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".json", base + ".z"
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Devuelve la página cacheada (y la marca como usada) o None"""
+        if not self.enabled:
+            return None
+
+        meta_path, data_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(data_path, "rb") as f:
+                content = zlib.decompress(f.read())
+            os.utime(data_path)  # mtime = último acceso, para LRU
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error) as e:
+            logger.debug(f"Entrada de caché corrupta para {url}: {e}")
+            self.delete(url)
+            return None
+
+        meta.pop("content", None)
+        return CachedPage(content=content, **meta)
+
+    def put(
+        self,
+        url: str,
+        content: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        content_type: Optional[str] = None,
+        encoding: Optional[str] = None
+    ):
+        """Guarda (o reemplaza) la página y aplica el límite de tamaño"""
+        if not self.enabled:
+            return
+
+        meta_path, data_path = self._paths(url)
+        compressed = zlib.compress(content, 6)
+        page = CachedPage(
+            url=url,
+            etag=etag,
+            last_modified=last_modified,
+            content_type=content_type,
+            encoding=encoding,
+            fetched_at=time.time(),
+            size=len(compressed)
+        )
+        meta = asdict(page)
+        meta.pop("content")
+
+        try:
+            with self.lock:
+                self._ensure_size_loaded()
+                self.total_bytes -= self._size_on_disk(data_path)
+                os.makedirs(os.path.dirname(data_path), exist_ok=True)
+                self._write_atomic(data_path, compressed)
+                self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+                self.total_bytes += len(compressed)
+
+                if self.total_bytes > self.max_bytes:
+                    self._evict()
+        except OSError as e:
+            logger.warning(f"No se pudo cachear {url}: {e}")
+
+    def touch(self, url: str):
+        """Actualiza fetched_at tras una revalidación 304"""
+        page = self.get(url)
+        if page:
+            meta_path, _ = self._paths(url)
+            meta = asdict(page)
+            meta.pop("content")
+            meta["fetched_at"] = time.time()
+            try:
+                self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+            except OSError:
+                pass
+
+    def delete(self, url: str):
+        meta_path, data_path = self._paths(url)
+        with self.lock:
+            size = self._size_on_disk(data_path)
+            for path in (meta_path, data_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            if self.total_bytes is not None:
+                self.total_bytes -= size
+
+    def _ensure_size_loaded(self):
+        if self.total_bytes is None:
+            self.total_bytes = sum(size for _, size, _ in self._scan())
+
+    def _scan(self):
+        """(ruta .z, tamaño, último acceso) de todas las entradas"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".z"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        """Expulsa las entradas menos usadas hasta quedar al 90% del límite"""
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        self.total_bytes = sum(size for _, size, _ in entries)
+        evicted = 0
+
+        for data_path, size, _ in entries:
+            if self.total_bytes <= target:
+                break
+            for path in (data_path, data_path[:-2] + ".json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.total_bytes -= size
+            evicted += 1
+
+        logger.info(f" Page cache: {evicted} entradas expulsadas")
+
+    def _size_on_disk(self, path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _write_atomic(self, path: str, data: bytes):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+# Instancia global
+page_cache = PageCache()
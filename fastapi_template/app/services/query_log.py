@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy import Select, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.models import SearchQueryLog, SearchQueryRollup
+from app.services.youtube_service import youtube_service, YouTubeSearchError
+from app.services.catalog_service import catalog_service
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLog:
+    """
+    Registro de búsquedas. record() solo añade a un buffer en memoria; una
+    tarea en segundo plano lo vuelca por lotes (filas crudas + contadores
+    por hora y idioma). top_queries() lee los contadores
+    """
+
+    def __init__(self):
+        self.buffer: Deque[Tuple[str, str, Optional[int], datetime]] = deque(maxlen=settings.QUERY_LOG_MAX_BUFFER)
+        self.lock = threading.Lock()
+        self.last_prune: Optional[datetime] = None
+        logger.info(" Query Log initialized")
+
+    def normalize(self, query: str) -> str:
+        return " ".join(query.lower().split())[:200]
+
+    def record(self, query: str, language: Optional[str], user_id: Optional[int] = None):
+        if not settings.QUERY_LOG_ENABLED:
+            return
+        query = self.normalize(query)
+        if query:
+            with self.lock:
+                self.buffer.append((query, language or "unknown", user_id, datetime.utcnow()))
+
+    def flush(self) -> int:
+        """Escribe el buffer en una transacción; devuelve las búsquedas escritas"""
+        with self.lock:
+            entries = list(self.buffer)
+            self.buffer.clear()
+        if not entries:
+            return 0
+
+        rollups = Counter(
+            (query, language, created_at.replace(minute=0, second=0, microsecond=0))
+            for query, language, _, created_at in entries
+        )
+
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(SearchQueryLog, [
+                {"query": query, "language": language, "user_id": user_id, "created_at": created_at}
+                for query, language, user_id, created_at in entries
+            ])
+            self._add_to_rollups(db, rollups)
+            self._prune(db)
+            db.commit()
+            return len(entries)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error guardando el registro de búsquedas: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _add_to_rollups(self, db: Session, rollups: Dict[Tuple[str, str, datetime], int]):
+        rows = [
+            {"query": query, "language": language, "window_start": window_start, "count": count}
+            for (query, language, window_start), count in rollups.items()
+        ]
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            stmt = insert(SearchQueryRollup).values(rows)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["query", "language", "window_start"],
+                set_={"count": SearchQueryRollup.count + stmt.excluded.count}
+            ))
+            return
+
+        for row in rows:
+            updated = db.query(SearchQueryRollup).filter(
+                SearchQueryRollup.query == row["query"],
+                SearchQueryRollup.language == row["language"],
+                SearchQueryRollup.window_start == row["window_start"]
+            ).update({"count": SearchQueryRollup.count + row["count"]})
+            if not updated:
+                db.add(SearchQueryRollup(**row))
+
+    def _prune(self, db: Session):
+        """Borra el registro crudo antiguo como mucho una vez por hora"""
+        now = datetime.utcnow()
+        if self.last_prune and now - self.last_prune < timedelta(hours=1):
+            return
+        self.last_prune = now
+        db.query(SearchQueryLog).filter(
+            SearchQueryLog.created_at < now - timedelta(days=settings.QUERY_LOG_RETENTION_DAYS)
+        ).delete(synchronize_session=False)
+
+    def top_queries(self, db: Session, language: Optional[str], hours: int, limit: int) -> List[dict]:
+        rows = db.execute(self.top_queries_stmt(language, hours, limit)).all()
+        return [{"query": row.query, "count": row.total} for row in rows]
+
+    def top_queries_stmt(self, language: Optional[str], hours: int, limit: int) -> Select:
+        total = func.sum(SearchQueryRollup.count).label("total")
+        now = datetime.utcnow()
+        # Rango cerrado: con solo ">=" SQLite prefiere recorrer entero el índice
+        # único (query, ...) para ahorrarse ordenar el GROUP BY
+        stmt = select(SearchQueryRollup.query, total).where(
+            SearchQueryRollup.window_start.between(now - timedelta(hours=hours), now)
+        )
+        if language:
+            stmt = stmt.where(SearchQueryRollup.language == language)
+        return stmt.group_by(SearchQueryRollup.query).order_by(total.desc()).limit(limit)
+
+    def languages(self, db: Session, hours: int) -> List[str]:
+        return [
+            language for (language,) in db.query(SearchQueryRollup.language).filter(
+                SearchQueryRollup.window_start >= datetime.utcnow() - timedelta(hours=hours)
+            ).distinct().all()
+        ]
+
+    async def run_forever(self):
+        """Tarea periódica lanzada desde el lifespan de la app"""
+        while True:
+            await asyncio.sleep(settings.QUERY_LOG_FLUSH_SECONDS)
+            await asyncio.to_thread(self.flush)
+
+
+class SearchWarmer:
+    """
+    Precarga la caché de búsquedas de YouTube y el catálogo con las
+    búsquedas más frecuentes de cada idioma, al arrancar y periódicamente.
+    Solo renueva (saltándose la caché) las entradas que caducarían antes de
+    la próxima ejecución, con un máximo de QUERY_WARM_MAX_SEARCHES llamadas
+    a la API por ejecución; una cuota agotada detiene la ejecución
+    """
+
+    def __init__(self):
+        self.last_run: Optional[dict] = None
+        logger.info(" Search Warmer initialized")
+
+    async def run_once(self) -> dict:
+        result = {"queries": 0, "refreshed": 0, "still_fresh": 0, "failed": 0, "songs_added": 0}
+        if not youtube_service.youtube:
+            result["skipped"] = "YouTube API not configured"
+            self.last_run = result
+            return result
+
+        try:
+            # Las consultas (motor síncrono) van en hilos, nunca en el bucle de eventos
+            top_by_language = await asyncio.to_thread(self._top_queries)
+            for language, top in top_by_language.items():
+                for entry in top:
+                    result["queries"] += 1
+                    ttl_left = youtube_service.cache_ttl_left(entry["query"], settings.QUERY_WARM_RESULTS)
+                    if ttl_left > settings.QUERY_WARM_INTERVAL_SECONDS:
+                        result["still_fresh"] += 1
+                        continue
+                    if result["refreshed"] + result["failed"] >= settings.QUERY_WARM_MAX_SEARCHES:
+                        result["budget_exhausted"] = True
+                        break
+                    
+                    try:
+                        results = await youtube_service.search_checked(
+                            entry["query"], settings.QUERY_WARM_RESULTS, refresh=True
+                        )
+                    except YouTubeSearchError as e:
+                        result["failed"] += 1
+                        if e.quota_exceeded:
+                            result["quota_exceeded"] = True
+                            break
+                        logger.error(f"Error precalentando '{entry['query']}': {e}")
+                        continue
+                    
+                    rows = catalog_service.youtube_rows(
+                        results, language if language != "unknown" else None
+                    )
+                    result["refreshed"] += 1
+                    result["songs_added"] += await asyncio.to_thread(self._ingest, rows)
+                
+                if result.get("budget_exhausted") or result.get("quota_exceeded"):
+                    break
+        except Exception as e:
+            logger.error(f"Error precalentando búsquedas: {e}")
+            result["error"] = str(e)
+
+        self.last_run = result
+        logger.info(f" Búsquedas precalentadas: {result}")
+        return result
+
+    def _top_queries(self) -> Dict[str, List[dict]]:
+        """idioma -> búsquedas más frecuentes de la ventana"""
+        db = SessionLocal()
+        try:
+            return {
+                language: query_log.top_queries(
+                    db, language, settings.QUERY_WARM_WINDOW_HOURS, settings.QUERY_WARM_TOP_QUERIES
+                )
+                for language in query_log.languages(db, settings.QUERY_WARM_WINDOW_HOURS)
+            }
+        finally:
+            db.close()
+
+    def _ingest(self, rows: List[dict]) -> int:
+        """Guarda los resultados en el catálogo; devuelve las canciones nuevas"""
+        db = SessionLocal()
+        try:
+            _, created = catalog_service.ingest(db, rows)
+            return created
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def run_forever(self):
+        """Tarea periódica lanzada desde el lifespan de la app"""
+        while True:
+            await self.run_once()
+            await asyncio.sleep(settings.QUERY_WARM_INTERVAL_SECONDS)
+
+
+# Instancias globales
+query_log = QueryLog()
+search_warmer = SearchWarmer()
@@ -1,10 +1,12 @@
 import logging
+from datetime import datetime, timedelta
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import Select, func, and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import User, Song, Recommendation, Playlist, PlaylistSong
 from app.schemas.schemas import RecommendationResponse
 from app.services.youtube_service import youtube_service
+from app.services.catalog_service import catalog_service
 import asyncio
 
 logger = logging.getLogger(__name__)
@@ -23,17 +25,74 @@ class RecommendationService:
         }
         logger.info(" Recommendation Service initialized")
     
+    # Consultas del catálogo, separadas para que tests/test_query_plans.py
+    # analice el plan de las mismas sentencias que se ejecutan
+    
+    def popular_stmt(self, language: str, limit: int) -> Select:
+        return select(Song).where(
+            and_(
+                Song.language == language,
+                Song.youtube_id.isnot(None),  
+                Song.youtube_id != ""
+            )
+        ).order_by(
+            Song.view_count.desc()
+        ).limit(limit)
+    
+    def artist_songs_stmt(self, artist: str, language: str, exclude_ids: List[int], limit: int) -> Select:
+        return select(Song).where(
+            and_(
+                Song.artist.ilike(f"%{artist}%"),
+                Song.language == language,
+                Song.youtube_id.isnot(None),  
+                Song.id.notin_(exclude_ids)
+            )
+        ).limit(limit)
+    
+    def trending_stmt(self, language: str, limit: int) -> Select:
+        recent_date = datetime.utcnow() - timedelta(days=30)
+        return select(Song).where(
+            and_(
+                Song.language == language,
+                Song.created_at >= recent_date,
+                Song.youtube_id.isnot(None)  
+            )
+        ).order_by(
+            Song.view_count.desc()
+        ).limit(limit)
+    
+    def diverse_stmt(self, language: str, limit: int) -> Select:
+        return select(Song).where(
+            and_(
+                Song.language == language,
+                Song.youtube_id.isnot(None),  
+                Song.view_count > 0
+            )
+        ).order_by(
+            func.random()
+        ).limit(limit)
+    
+    def playlist_history_stmt(self, user_id: int) -> Select:
+        return select(Song).join(PlaylistSong).join(Playlist).where(Playlist.owner_id == user_id)
+    
+    def recommendation_history_stmt(self, user_id: int) -> Select:
+        return select(Song).join(Recommendation).where(Recommendation.user_id == user_id)
+    
     async def get_recommendations(
         self, 
-        db: Session, 
+        db: AsyncSession, 
         user_id: int, 
         language: Optional[str] = None, 
-        limit: int = 20
+        limit: int = 20,
+        read_db: Optional[AsyncSession] = None
     ) -> List[RecommendationResponse]:
         """
-        Genera recomendaciones inteligentes basadas en múltiples estrategias
+        Genera recomendaciones inteligentes basadas en múltiples estrategias.
+        El catálogo se lee de read_db (réplica) si se pasa; el historial del
+        usuario y las canciones nuevas de YouTube van siempre por db (primaria)
         """
-        user = db.query(User).filter(User.id == user_id).first()
+        catalog_db = read_db or db
+        user = await db.get(User, user_id)
         if not user:
             logger.warning(f"Usuario {user_id} no encontrado")
             return []
@@ -44,31 +103,32 @@ class RecommendationService:
         recommendations = []
         
         
-        popular_recs = await self._get_popular_recommendations(db, target_language, limit)
+        popular_recs = await self._get_popular_recommendations(catalog_db, target_language, limit)
         recommendations.extend(popular_recs)
         logger.info(f"    {len(popular_recs)} recomendaciones populares")
         
         
-        search_based = await self._get_search_based_recommendations(db, user_id, target_language, limit // 2)
+        user_songs = await self._get_user_song_history(db, user_id)
+        
+        search_based = await self._get_search_based_recommendations(catalog_db, user_songs, target_language, limit // 2)
         recommendations.extend(search_based)
         logger.info(f"    {len(search_based)} basadas en búsquedas")
         
         
-        trending = await self._get_trending_recommendations(db, target_language, limit // 3)
+        trending = await self._get_trending_recommendations(catalog_db, target_language, limit // 3)
         recommendations.extend(trending)
         logger.info(f"   {len(trending)} trending")
         
         
-        user_songs = self._get_user_song_history(db, user_id)
         if user_songs:
             similar_artist_recs = await self._get_similar_artist_recommendations(
-                db, user_songs, target_language, limit // 3
+                catalog_db, user_songs, target_language, limit // 3
             )
             recommendations.extend(similar_artist_recs)
             logger.info(f"    {len(similar_artist_recs)} de artistas similares")
         
         
-        diverse_recs = await self._get_diverse_recommendations(db, target_language, limit // 4)
+        diverse_recs = await self._get_diverse_recommendations(catalog_db, target_language, limit // 4)
         recommendations.extend(diverse_recs)
         logger.info(f"    {len(diverse_recs)} diversas")
         
@@ -93,7 +153,7 @@ class RecommendationService:
     
     async def _fetch_youtube_recommendations(
         self,
-        db: Session,
+        db: AsyncSession,
         language: str,
         limit: int
     ) -> List[RecommendationResponse]:
@@ -134,41 +194,12 @@ class RecommendationService:
             
             queries = queries_by_language.get(language, queries_by_language['es'])
             
-            recommendations = []
+            youtube_results = []
             
             for query in queries[:2]:  # Solo las primeras 2 queries
                 try:
                     logger.info(f"   🔍 Buscando en YouTube: '{query}'")
-                    youtube_results = await youtube_service.search_music(query, 5)
-                    
-                    for yt_result in youtube_results:
-                        # Verificar si ya existe
-                        existing = db.query(Song).filter(
-                            Song.youtube_id == yt_result['youtube_id']
-                        ).first()
-                        
-                        if existing:
-                            song = existing
-                        else:
-                            # Crear nueva canción
-                            song = Song(
-                                title=yt_result['title'],
-                                artist=yt_result['artist'],
-                                youtube_id=yt_result['youtube_id'],
-                                thumbnail_url=yt_result.get('thumbnail_url'),
-                                language=language,
-                                view_count=0
-                            )
-                            db.add(song)
-                            db.commit()
-                            db.refresh(song)
-                        
-                        rec = RecommendationResponse(
-                            song=song,
-                            score=0.65,
-                            reason=f"Popular en {language}"
-                        )
-                        recommendations.append(rec)
+                    youtube_results.extend(await youtube_service.search_music(query, 5))
                     
                     await asyncio.sleep(0.5)  # Rate limiting
                     
@@ -176,6 +207,16 @@ class RecommendationService:
                     logger.error(f"Error buscando '{query}': {e}")
                     continue
             
+            songs, _ = await db.run_sync(catalog_service.ingest, catalog_service.youtube_rows(youtube_results, language))
+            recommendations = [
+                RecommendationResponse(
+                    song=song,
+                    score=0.65,
+                    reason=f"Popular en {language}"
+                )
+                for song in songs
+            ]
+            
             return recommendations[:limit]
             
         except Exception as e:
@@ -184,21 +225,13 @@ class RecommendationService:
     
     async def _get_popular_recommendations(
         self, 
-        db: Session, 
+        db: AsyncSession, 
         language: str, 
         limit: int
     ) -> List[RecommendationResponse]:
         """Canciones más populares CON youtube_id"""
         try:
-            popular_songs = db.query(Song).filter(
-                and_(
-                    Song.language == language,
-                    Song.youtube_id.isnot(None),  
-                    Song.youtube_id != ""
-                )
-            ).order_by(
-                Song.view_count.desc()
-            ).limit(limit * 2).all()
+            popular_songs = (await db.scalars(self.popular_stmt(language, limit * 2))).all()
             
             recommendations = []
             for song in popular_songs:
@@ -218,15 +251,13 @@ class RecommendationService:
     
     async def _get_search_based_recommendations(
         self,
-        db: Session,
-        user_id: int,
+        db: AsyncSession,
+        user_songs: List[Song],
         language: str,
         limit: int
     ) -> List[RecommendationResponse]:
         """Basado en el historial CON youtube_id"""
         try:
-            user_songs = self._get_user_song_history(db, user_id)
-            
             if not user_songs:
                 return []
             
@@ -237,14 +268,9 @@ class RecommendationService:
             
             recommendations = []
             for artist in artists[:5]:
-                similar_songs = db.query(Song).filter(
-                    and_(
-                        Song.artist.ilike(f"%{artist}%"),
-                        Song.language == language,
-                        Song.youtube_id.isnot(None),  
-                        Song.id.notin_([s.id for s in user_songs])
-                    )
-                ).limit(3).all()
+                similar_songs = (await db.scalars(self.artist_songs_stmt(
+                    artist, language, [s.id for s in user_songs], 3
+                ))).all()
                 
                 for song in similar_songs:
                     rec = RecommendationResponse(
@@ -262,25 +288,13 @@ class RecommendationService:
     
     async def _get_trending_recommendations(
         self,
-        db: Session,
+        db: AsyncSession,
         language: str,
         limit: int
     ) -> List[RecommendationResponse]:
         """Canciones trending CON youtube_id"""
         try:
-            from datetime import datetime, timedelta
-            
-            recent_date = datetime.utcnow() - timedelta(days=30)
-            
-            trending = db.query(Song).filter(
-                and_(
-                    Song.language == language,
-                    Song.created_at >= recent_date,
-                    Song.youtube_id.isnot(None)  
-                )
-            ).order_by(
-                Song.view_count.desc()
-            ).limit(limit).all()
+            trending = (await db.scalars(self.trending_stmt(language, limit))).all()
             
             recommendations = []
             for song in trending:
@@ -299,7 +313,7 @@ class RecommendationService:
     
     async def _get_similar_artist_recommendations(
         self,
-        db: Session,
+        db: AsyncSession,
         user_songs: List[Song],
         language: str,
         limit: int
@@ -314,14 +328,9 @@ class RecommendationService:
                 
                 for word in artist_words:
                     if len(word) > 3:
-                        similar_songs = db.query(Song).filter(
-                            and_(
-                                Song.artist.ilike(f"%{word}%"),
-                                Song.language == language,
-                                Song.youtube_id.isnot(None),  
-                                Song.id.notin_([s.id for s in user_songs])
-                            )
-                        ).limit(2).all()
+                        similar_songs = (await db.scalars(self.artist_songs_stmt(
+                            word, language, [s.id for s in user_songs], 2
+                        ))).all()
                         
                         for song in similar_songs:
                             rec = RecommendationResponse(
@@ -339,21 +348,13 @@ class RecommendationService:
     
     async def _get_diverse_recommendations(
         self,
-        db: Session,
+        db: AsyncSession,
         language: str,
         limit: int
     ) -> List[RecommendationResponse]:
         """Recomendaciones diversas CON youtube_id"""
         try:
-            diverse = db.query(Song).filter(
-                and_(
-                    Song.language == language,
-                    Song.youtube_id.isnot(None),  
-                    Song.view_count > 0
-                )
-            ).order_by(
-                func.random()
-            ).limit(limit).all()
+            diverse = (await db.scalars(self.diverse_stmt(language, limit))).all()
             
             recommendations = []
             for song in diverse:
@@ -370,16 +371,12 @@ class RecommendationService:
             logger.error(f"Error en diverse_recommendations: {e}")
             return []
     
-    def _get_user_song_history(self, db: Session, user_id: int) -> List[Song]:
+    async def _get_user_song_history(self, db: AsyncSession, user_id: int) -> List[Song]:
         """Obtiene el historial de canciones del usuario"""
         try:
-            playlist_songs = db.query(Song).join(PlaylistSong).join(Playlist).filter(
-                Playlist.owner_id == user_id
-            ).all()
+            playlist_songs = (await db.scalars(self.playlist_history_stmt(user_id))).all()
             
-            viewed_songs = db.query(Song).join(Recommendation).filter(
-                Recommendation.user_id == user_id
-            ).all()
+            viewed_songs = (await db.scalars(self.recommendation_history_stmt(user_id))).all()
             
             all_songs = list(set(playlist_songs + viewed_songs))
             
@@ -410,13 +407,14 @@ class RecommendationService:
         self, 
         recommendations: List[RecommendationResponse]
     ) -> List[RecommendationResponse]:
-        """Remueve duplicados y ordena por score"""
+        """Remueve duplicados (incluidas versiones del mismo grupo) y ordena por score"""
         seen_ids = set()
         unique = []
         
         for rec in recommendations:
-            if rec.song.id not in seen_ids:
-                seen_ids.add(rec.song.id)
+            cluster_id = rec.song.canonical_song_id or rec.song.id
+            if cluster_id not in seen_ids:
+                seen_ids.add(cluster_id)
                 unique.append(rec)
         
         unique.sort(key=lambda x: x.score, reverse=True)
@@ -0,0 +1,144 @@
+import json
+import secrets
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import SearchCursorState
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SearchCursor:
+    """Estado de una búsqueda paginada; el cliente solo ve el id opaco"""
+    id: str
+    user_id: int
+    query: str
+    language: Optional[str]
+    page_size: int
+    pending_ids: List[int] = field(default_factory=list)  # canciones del catálogo aún no servidas
+    youtube_token: Optional[str] = None  # pageToken de la siguiente página de YouTube
+    youtube_done: bool = False
+    seen_keys: Set[str] = field(default_factory=set)
+    seen_clusters: Set[int] = field(default_factory=set)
+    version: int = 0  # 0: todavía no guardado
+
+    @property
+    def exhausted(self) -> bool:
+        return not self.pending_ids and self.youtube_done
+
+    def state(self) -> str:
+        return json.dumps({
+            "pending_ids": self.pending_ids,
+            "youtube_token": self.youtube_token,
+            "youtube_done": self.youtube_done,
+            "seen_keys": sorted(self.seen_keys),
+            "seen_clusters": sorted(self.seen_clusters),
+        })
+
+
+class SearchCursorStore:
+    """
+    Cursores de búsqueda en BD (tabla search_cursors) con TTL, para que
+    cualquier worker sirva la página siguiente. Cada página solo pide a
+    YouTube la siguiente página (pageToken) y sirve su parte del catálogo.
+    Dos peticiones a la vez con el mismo cursor: save() solo acepta la
+    primera (version), la otra debe reintentar
+    """
+
+    PRUNE_INTERVAL = timedelta(minutes=5)
+
+    def __init__(self):
+        self.ttl = timedelta(seconds=settings.SEARCH_CURSOR_TTL_SECONDS)
+        self.last_prune: Optional[datetime] = None
+        logger.info(" Search Cursor Store initialized")
+
+    def create(self, user_id: int, query: str, language: Optional[str], page_size: int) -> SearchCursor:
+        """Cursor nuevo; se guarda con save() después de servir la primera página"""
+        return SearchCursor(
+            id=secrets.token_urlsafe(16),
+            user_id=user_id,
+            query=query,
+            language=language,
+            page_size=page_size
+        )
+
+    async def get(self, db: AsyncSession, cursor_id: str, user_id: int) -> Optional[SearchCursor]:
+        """Cursor vigente del usuario"""
+        row = await db.scalar(select(SearchCursorState).where(
+            SearchCursorState.id == cursor_id,
+            SearchCursorState.user_id == user_id,
+            SearchCursorState.expires_at >= datetime.utcnow()
+        ))
+        if not row:
+            return None
+
+        state = json.loads(row.state)
+        return SearchCursor(
+            id=row.id,
+            user_id=row.user_id,
+            query=row.query,
+            language=row.language,
+            page_size=row.page_size,
+            pending_ids=state["pending_ids"],
+            youtube_token=state["youtube_token"],
+            youtube_done=state["youtube_done"],
+            seen_keys=set(state["seen_keys"]),
+            seen_clusters=set(state["seen_clusters"]),
+            version=row.version
+        )
+
+    async def save(self, db: AsyncSession, cursor: SearchCursor) -> bool:
+        """
+        Guarda el cursor tras servir una página y renueva el TTL. False si otra
+        petición avanzó el mismo cursor desde que se leyó
+        """
+        expires_at = datetime.utcnow() + self.ttl
+        if cursor.version == 0:
+            await self._prune(db)
+            db.add(SearchCursorState(
+                id=cursor.id,
+                user_id=cursor.user_id,
+                query=cursor.query,
+                language=cursor.language,
+                page_size=cursor.page_size,
+                state=cursor.state(),
+                version=1,
+                expires_at=expires_at
+            ))
+            await db.commit()
+            cursor.version = 1
+            return True
+
+        result = await db.execute(
+            update(SearchCursorState).where(
+                SearchCursorState.id == cursor.id,
+                SearchCursorState.version == cursor.version
+            ).values(state=cursor.state(), version=cursor.version + 1, expires_at=expires_at)
+        )
+        await db.commit()
+        if not result.rowcount:
+            return False
+        cursor.version += 1
+        return True
+
+    async def discard(self, db: AsyncSession, cursor: SearchCursor):
+        if cursor.version:
+            await db.execute(delete(SearchCursorState).where(SearchCursorState.id == cursor.id))
+            await db.commit()
+
+    async def _prune(self, db: AsyncSession):
+        """Borra los cursores caducados, como mucho cada PRUNE_INTERVAL por proceso"""
+        now = datetime.utcnow()
+        if self.last_prune and now - self.last_prune < self.PRUNE_INTERVAL:
+            return
+        self.last_prune = now
+        await db.execute(delete(SearchCursorState).where(SearchCursorState.expires_at < now))
+
+
+# Instancia global
+search_cursor_store = SearchCursorStore()
@@ -0,0 +1,176 @@
+import zlib
+import random
+import hashlib
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from app.models.models import Song, SongFingerprint, SongFingerprintBucket
+from app.services.catalog_service import catalog_service
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SongFingerprinter:
+    """
+    Agrupa canciones casi duplicadas (VEVO, Topic, lyric videos, resubidas).
+    Cada canción tiene una firma MinHash de los 3-gramas de su clave
+    normalizada (catalog_service.song_key); la firma se parte en bandas (LSH)
+    y solo se comparan canciones que comparten algún bucket. La canción más
+    antigua del grupo es la canónica (canonical_song_id NULL) y el resto
+    apunta a ella
+    """
+
+    SHINGLE_SIZE = 3
+    PRIME = (1 << 61) - 1
+
+    def __init__(self):
+        self.num_perm = settings.FINGERPRINT_NUM_PERM
+        self.bands = settings.FINGERPRINT_BANDS
+        self.rows = self.num_perm // self.bands
+        # Permutaciones fijas: las firmas guardadas deben seguir siendo comparables
+        rng = random.Random(20240601)
+        self.permutations = [
+            (rng.randrange(1, self.PRIME), rng.randrange(0, self.PRIME))
+            for _ in range(self.num_perm)
+        ]
+        logger.info(f" Song Fingerprinter initialized ({self.bands} bands x {self.rows} rows)")
+
+    def signature(self, title: str, artist: str) -> Optional[List[int]]:
+        key = catalog_service.song_key(title, artist)
+        if len(key) < self.SHINGLE_SIZE:
+            return None
+        shingles = {
+            zlib.crc32(key[i:i + self.SHINGLE_SIZE].encode("utf-8"))
+            for i in range(len(key) - self.SHINGLE_SIZE + 1)
+        }
+        return [
+            min((a * shingle + b) % self.PRIME for shingle in shingles)
+            for a, b in self.permutations
+        ]
+
+    def band_buckets(self, signature: List[int]) -> List[Tuple[int, str]]:
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(",".join(map(str, rows)).encode(), digest_size=8).hexdigest()
+            buckets.append((band, digest))
+        return buckets
+
+    def similarity(self, a: List[int], b: List[int]) -> float:
+        """Jaccard estimado: fracción de posiciones iguales de la firma"""
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+    def assign(self, db: Session, songs: List[Song]) -> int:
+        """
+        Modo incremental: calcula la firma de las canciones nuevas, busca
+        candidatas en los buckets y las une al grupo más parecido. No hace
+        commit. Devuelve cuántas se marcaron como duplicadas
+        """
+        signatures: Dict[int, List[int]] = {}
+        buckets: Dict[int, List[Tuple[int, str]]] = {}
+        for song in songs:
+            signature = self.signature(song.title, song.artist)
+            if signature:
+                signatures[song.id] = signature
+                buckets[song.id] = self.band_buckets(signature)
+        if not signatures:
+            return 0
+
+        # Un solo sondeo de buckets para todo el lote
+        all_buckets = {bucket for song_buckets in buckets.values() for bucket in song_buckets}
+        bucket_members: Dict[Tuple[int, str], Set[int]] = {}
+        for band, bucket, song_id in db.query(
+            SongFingerprintBucket.band, SongFingerprintBucket.bucket, SongFingerprintBucket.song_id
+        ).filter(
+            tuple_(SongFingerprintBucket.band, SongFingerprintBucket.bucket).in_(list(all_buckets))
+        ).all():
+            bucket_members.setdefault((band, bucket), set()).add(song_id)
+
+        candidate_ids = set().union(*bucket_members.values()) if bucket_members else set()
+        known = self._load_signatures(db, candidate_ids)
+        canonical_of = {
+            song_id: canonical_id or song_id
+            for song_id, canonical_id in db.query(Song.id, Song.canonical_song_id).filter(
+                Song.id.in_(list(known))
+            ).all()
+        } if known else {}
+
+        duplicates = 0
+        new_buckets = []
+        for song in sorted(songs, key=lambda s: s.id):
+            signature = signatures.get(song.id)
+            if not signature:
+                continue
+
+            candidates = set()
+            for bucket in buckets[song.id]:
+                candidates |= bucket_members.get(bucket, set())
+            candidates.discard(song.id)
+
+            best_id, best_score = None, 0.0
+            for candidate_id in candidates:
+                if candidate_id not in known or candidate_id not in canonical_of:
+                    continue  # canción borrada
+                score = self.similarity(signature, known[candidate_id])
+                if score > best_score or (score == best_score and best_id and candidate_id < best_id):
+                    best_id, best_score = candidate_id, score
+
+            if best_id and best_score >= settings.FINGERPRINT_MIN_SIMILARITY:
+                song.canonical_song_id = canonical_of[best_id]
+                duplicates += 1
+
+            # Las siguientes canciones del mismo lote también pueden coincidir con esta
+            known[song.id] = signature
+            canonical_of[song.id] = song.canonical_song_id or song.id
+            for bucket in buckets[song.id]:
+                bucket_members.setdefault(bucket, set()).add(song.id)
+                new_buckets.append({"band": bucket[0], "bucket": bucket[1], "song_id": song.id})
+
+        db.bulk_insert_mappings(SongFingerprint, [
+            {"song_id": song_id, "signature": ",".join(f"{value:x}" for value in signature)}
+            for song_id, signature in signatures.items()
+        ])
+        db.bulk_insert_mappings(SongFingerprintBucket, new_buckets)
+        return duplicates
+
+    def backfill(self, db: Session, batch_size: Optional[int] = None) -> dict:
+        """Modo por lotes: huellas para todo el catálogo, de la canción más antigua a la más nueva"""
+        batch_size = batch_size or settings.FINGERPRINT_BATCH_SIZE
+        result = {"fingerprinted": 0, "duplicates": 0}
+        fingerprinted = db.query(SongFingerprint.song_id)
+        last_id = 0
+
+        while True:
+            songs = db.query(Song).filter(
+                Song.id > last_id,
+                ~Song.id.in_(fingerprinted)
+            ).order_by(Song.id).limit(batch_size).all()
+            if not songs:
+                break
+
+            result["duplicates"] += self.assign(db, songs)
+            result["fingerprinted"] += len(songs)
+            db.commit()
+            last_id = songs[-1].id
+
+        result["clusters"] = db.query(Song.canonical_song_id).filter(
+            Song.canonical_song_id != None
+        ).distinct().count()
+        logger.info(f" Huellas de canciones: {result}")
+        return result
+
+    def _load_signatures(self, db: Session, song_ids: Set[int]) -> Dict[int, List[int]]:
+        if not song_ids:
+            return {}
+        return {
+            song_id: [int(value, 16) for value in signature.split(",")]
+            for song_id, signature in db.query(SongFingerprint.song_id, SongFingerprint.signature).filter(
+                SongFingerprint.song_id.in_(list(song_ids))
+            ).all()
+        }
+
+
+# Instancia global
+song_fingerprinter = SongFingerprinter()
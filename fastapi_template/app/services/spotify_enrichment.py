@@ -0,0 +1,241 @@
+import re
+import json
+import asyncio
+import logging
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.models import Song, PipelineCheckpoint
+from app.services.spotify_service import spotify_service, SpotifyRateLimited, SpotifyUnavailable
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SpotifyEnrichmentPipeline:
+    """
+    Rellena Song.spotify_id, Song.audio_features y Song.genre en tres etapas:
+      1. resolve:  busca en Spotify las canciones sin spotify_id (1 búsqueda por canción)
+      2. features: /audio-features en lotes de 100 ids
+      3. genres:   /tracks (artistas) y /artists en lotes de 50 ids
+    Es reanudable: la etapa resolve guarda un checkpoint y las otras solo
+    procesan canciones que todavía no tienen el dato. Ante un 429
+    persistente se detiene y continúa en la siguiente ejecución.
+    Las consultas usan el motor síncrono en hilos (asyncio.to_thread): nunca
+    bloquean el bucle de eventos mientras esperan a la base de datos
+    """
+
+    RESOLVE_CHECKPOINT = "spotify_enrichment.resolve"
+    MIN_TITLE_SIMILARITY = 0.6
+
+    def __init__(self):
+        self.running = False
+        self.last_run: Optional[dict] = None
+        logger.info(" Spotify Enrichment Pipeline initialized")
+
+    async def run(self) -> dict:
+        if not spotify_service.enabled:
+            return {"skipped": "Spotify credentials not configured"}
+        if self.running:
+            return {"skipped": "already running"}
+
+        self.running = True
+        result = {"resolved": 0, "features": 0, "genres": 0, "rate_limited": False}
+        try:
+            result["resolved"] = await self._resolve_stage()
+            result["features"] = await self._features_stage()
+            result["genres"] = await self._genres_stage()
+        except SpotifyRateLimited as e:
+            logger.warning(f" Enriquecimiento detenido por rate limit: {e}")
+            result["rate_limited"] = True
+            result["retry_after"] = e.retry_after
+        except Exception as e:
+            logger.error(f"Error en enriquecimiento Spotify: {e}")
+            result["error"] = str(e)
+        finally:
+            self.running = False
+            self.last_run = result
+
+        logger.info(f" Enriquecimiento Spotify: {result}")
+        return result
+
+    async def _resolve_stage(self) -> int:
+        last_id, songs = await asyncio.to_thread(self._resolve_candidates)
+
+        # El checkpoint solo avanza por canciones realmente buscadas: ante un
+        # 429 o un fallo se guarda lo hecho y se reintenta desde ahí
+        matches: Dict[int, Dict] = {}
+        searched: List[Song] = []
+        stopped: Optional[Exception] = None
+        for song in songs:
+            try:
+                results = await spotify_service.search_track_strict(f"{song.title} {song.artist}", limit=3)
+            except (SpotifyRateLimited, SpotifyUnavailable) as e:
+                stopped = e
+                break
+            match = self._best_match(song, results)
+            if match:
+                matches[song.id] = match
+            searched.append(song)
+            last_id = song.id
+
+        updated = await asyncio.to_thread(self._save_resolved, searched, matches)
+
+        if isinstance(stopped, SpotifyRateLimited):
+            raise stopped
+        if stopped:
+            raise RuntimeError(f"búsqueda en Spotify fallida, se reanudará tras la canción {last_id}: {stopped}")
+        return updated
+
+    def _resolve_candidates(self) -> Tuple[int, List[Song]]:
+        """Checkpoint actual y siguiente lote de canciones sin spotify_id"""
+        db = SessionLocal()
+        try:
+            checkpoint = self._checkpoint(db, self.RESOLVE_CHECKPOINT)
+            songs = db.query(Song).filter(
+                Song.id > checkpoint.last_id,
+                Song.spotify_id == None
+            ).order_by(Song.id).limit(settings.SPOTIFY_ENRICH_RESOLVE_LIMIT).all()
+            return checkpoint.last_id, songs
+        finally:
+            db.close()
+
+    def _save_resolved(self, searched: List[Song], matches: Dict[int, Dict]) -> int:
+        """Guarda los spotify_id encontrados y avanza el checkpoint tras la última canción buscada"""
+        db = SessionLocal()
+        try:
+            # spotify_id es único: no asignar ids que ya tiene otra canción
+            candidate_ids = [match["spotify_id"] for match in matches.values()]
+            taken = {
+                spotify_id for (spotify_id,) in db.query(Song.spotify_id).filter(
+                    Song.spotify_id.in_(candidate_ids)
+                ).all()
+            } if candidate_ids else set()
+
+            updates = []
+            for song in searched:
+                match = matches.get(song.id)
+                if not match or match["spotify_id"] in taken:
+                    continue
+                taken.add(match["spotify_id"])
+                update = {"id": song.id, "spotify_id": match["spotify_id"]}
+                if not song.duration and match.get("duration"):
+                    update["duration"] = match["duration"] // 1000
+                updates.append(update)
+
+            db.bulk_update_mappings(Song, updates)
+            if searched:
+                self._checkpoint(db, self.RESOLVE_CHECKPOINT).last_id = searched[-1].id
+            db.commit()
+            return len(updates)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _features_stage(self) -> int:
+        updated = 0
+        last_id = 0
+
+        while True:
+            songs = await asyncio.to_thread(self._pending_songs, Song.audio_features, last_id)
+            if not songs:
+                return updated
+
+            features = await spotify_service.get_audio_features_batch([song.spotify_id for song in songs])
+            updates = [
+                {"id": song.id, "audio_features": json.dumps(features[song.spotify_id])}
+                for song in songs if song.spotify_id in features
+            ]
+            await asyncio.to_thread(self._bulk_update, updates)
+
+            updated += len(updates)
+            last_id = songs[-1].id
+
+    async def _genres_stage(self) -> int:
+        updated = 0
+        last_id = 0
+
+        while True:
+            songs = await asyncio.to_thread(self._pending_songs, Song.genre, last_id)
+            if not songs:
+                return updated
+
+            tracks = await spotify_service.get_tracks_batch([song.spotify_id for song in songs])
+            primary_artist = {
+                track_id: track["artists"][0]["id"]
+                for track_id, track in tracks.items()
+                if track.get("artists")
+            }
+            artists = await spotify_service.get_artists_batch(sorted(set(primary_artist.values())))
+
+            updates = []
+            for song in songs:
+                artist = artists.get(primary_artist.get(song.spotify_id))
+                if artist and artist.get("genres"):
+                    updates.append({"id": song.id, "genre": ", ".join(artist["genres"][:3])})
+            await asyncio.to_thread(self._bulk_update, updates)
+
+            updated += len(updates)
+            last_id = songs[-1].id
+
+    def _pending_songs(self, column, last_id: int) -> List[Song]:
+        db = SessionLocal()
+        try:
+            return db.query(Song).filter(
+                Song.id > last_id,
+                Song.spotify_id != None,
+                ~Song.spotify_id.like("mock_%"),
+                column == None
+            ).order_by(Song.id).limit(settings.SPOTIFY_ENRICH_BATCH_SIZE).all()
+        finally:
+            db.close()
+
+    def _bulk_update(self, updates: List[Dict]):
+        db = SessionLocal()
+        try:
+            db.bulk_update_mappings(Song, updates)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _best_match(self, song: Song, results: List[Dict]) -> Optional[Dict]:
+        title = self._normalize(song.title)
+        best, best_score = None, 0.0
+
+        for result in results:
+            if result["spotify_id"].startswith("mock_"):
+                continue
+            candidate = self._normalize(result["title"])
+            score = SequenceMatcher(None, title, candidate).ratio()
+            # Los títulos de YouTube suelen incluir el artista
+            if candidate and candidate in title:
+                score = max(score, 0.9)
+            if score > best_score:
+                best, best_score = result, score
+
+        return best if best_score >= self.MIN_TITLE_SIMILARITY else None
+
+    def _normalize(self, text: str) -> str:
+        text = unicodedata.normalize("NFKD", text.lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        text = re.sub(r"\(.*?\)|\[.*?\]", " ", text)
+        return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+    def _checkpoint(self, db: Session, name: str) -> PipelineCheckpoint:
+        checkpoint = db.query(PipelineCheckpoint).filter(PipelineCheckpoint.name == name).first()
+        if not checkpoint:
+            checkpoint = PipelineCheckpoint(name=name, last_id=0)
+            db.add(checkpoint)
+            db.commit()
+        return checkpoint
+
+
+# Instancia global
+spotify_enrichment = SpotifyEnrichmentPipeline()
@@ -1,145 +1,273 @@
-import os
-import base64
-import requests
-from typing import List, Dict, Optional
+import time
 import asyncio
+import httpx
+from typing import List, Dict, Optional
 from app.core.config import settings
+from app.services.http_client import parse_retry_after
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class SpotifyRateLimited(Exception):
+    """Spotify is still rate limiting after the built-in retry"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Spotify rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class SpotifyUnavailable(Exception):
+    """Spotify request failed (no token, HTTP error or non-200 answer)"""
+
+
 class SpotifyService:
+    TOKEN_URL = "https://accounts.spotify.com/api/token"
+
     def __init__(self):
         self.client_id = settings.SPOTIFY_CLIENT_ID
         self.client_secret = settings.SPOTIFY_CLIENT_SECRET
         self.access_token = None
+        self.token_expires_at = 0.0
         self.base_url = "https://api.spotify.com/v1"
-        
-        # Only initialize if credentials are provided and not placeholder values
-        if (self.client_id and self.client_id != "your_spotify_client_id_here" and 
-            self.client_secret and self.client_secret != "your_spotify_client_secret_here"):
-            try:
-                # Get token synchronously in init
-                self._get_access_token_sync()
-            except Exception as e:
-                logger.warning(f"Failed to initialize Spotify service: {e}")
-        else:
+
+        # Created lazily inside the running event loop; importing this module
+        # never touches the network
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        # Only enabled if credentials are provided and not placeholder values
+        self.enabled = bool(
+            self.client_id and self.client_id != "your_spotify_client_id_here" and
+            self.client_secret and self.client_secret != "your_spotify_client_secret_here"
+        )
+        if not self.enabled:
             logger.info("Spotify credentials not provided, service will use mock data")
 
-    def _get_access_token_sync(self):
-        """Get Spotify access token synchronously"""
-        if not self.client_id or not self.client_secret:
+    def _http(self) -> httpx.AsyncClient:
+        """Pooled async client bound to the current event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    settings.SPOTIFY_TIMEOUT_SECONDS,
+                    connect=settings.SPOTIFY_CONNECT_TIMEOUT_SECONDS
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.SPOTIFY_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.SPOTIFY_MAX_CONNECTIONS
+                )
+            )
+            self._loop = loop
+            self._refresh_task = None
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_access_token(self) -> Optional[str]:
+        """
+        Return a valid token. Tokens close to expiry are refreshed in the
+        background while the current one is still used; concurrent callers
+        share a single refresh task
+        """
+        if not self.enabled:
             return None
-            
-        try:
-            auth_string = f"{self.client_id}:{self.client_secret}"
-            auth_bytes = auth_string.encode("utf-8")
-            auth_base64 = str(base64.b64encode(auth_bytes), "utf-8")
 
-            headers = {
-                "Authorization": f"Basic {auth_base64}",
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
+        now = time.monotonic()
+        if self.access_token and now < self.token_expires_at:
+            if now >= self.token_expires_at - settings.SPOTIFY_TOKEN_REFRESH_MARGIN_SECONDS:
+                self._start_refresh()
+            return self.access_token
 
-            data = {"grant_type": "client_credentials"}
-            
-            response = requests.post("https://accounts.spotify.com/api/token", headers=headers, data=data)
-            
-            if response.status_code == 200:
-                token_data = response.json()
-                self.access_token = token_data["access_token"]
-                logger.info("Spotify access token obtained successfully")
-                return self.access_token
-            else:
-                logger.error(f"Failed to get Spotify access token: {response.status_code}")
-                return None
-                
+        try:
+            return await asyncio.shield(self._start_refresh())
         except Exception as e:
             logger.error(f"Error getting Spotify access token: {e}")
             return None
 
+    def _start_refresh(self) -> asyncio.Task:
+        self._http()  # makes sure the task belongs to the current loop
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_access_token())
+        return self._refresh_task
+
+    async def _refresh_access_token(self) -> Optional[str]:
+        """Client credentials flow"""
+        try:
+            response = await self._http().post(
+                self.TOKEN_URL,
+                auth=(self.client_id, self.client_secret),
+                data={"grant_type": "client_credentials"}
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Error getting Spotify access token: {e}")
+            return self.access_token if time.monotonic() < self.token_expires_at else None
+
+        if response.status_code == 200:
+            token_data = response.json()
+            self.access_token = token_data["access_token"]
+            self.token_expires_at = time.monotonic() + token_data.get("expires_in", 3600)
+            logger.info("Spotify access token obtained successfully")
+            return self.access_token
+
+        logger.error(f"Failed to get Spotify access token: {response.status_code}")
+        return None
+
+    async def _api_get(self, path: str, params: Optional[Dict] = None) -> Optional[httpx.Response]:
+        """GET against the Web API with one retry on 401 (token) or 429 (Retry-After)"""
+        token = await self._get_access_token()
+        if not token:
+            return None
+
+        for attempt in range(2):
+            response = await self._http().get(
+                f"{self.base_url}{path}",
+                headers={"Authorization": f"Bearer {token}"},
+                params=params
+            )
+
+            if response.status_code == 401 and attempt == 0:  # Token revoked or expired
+                # Only if nobody refreshed it meanwhile: a newer token must not be discarded
+                if self.access_token == token:
+                    self.token_expires_at = 0.0
+                token = await self._get_access_token()
+                if not token:
+                    return response
+                continue
+
+            if response.status_code == 429 and attempt == 0:
+                retry_after = self._retry_after(response, 1.0)
+                if retry_after > settings.HTTP_MAX_RETRY_AFTER:
+                    return response
+                logger.warning(f"Spotify rate limit, retrying in {retry_after}s")
+                await asyncio.sleep(retry_after)
+                continue
+
+            return response
+
+        return response
+
+    @staticmethod
+    def _retry_after(response: httpx.Response, default: float) -> float:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        return default if retry_after is None else retry_after
+
     async def search_track(self, query: str, limit: int = 10) -> List[Dict]:
         """Search for tracks on Spotify"""
-        if not self.access_token:
-            # Try to get token if not available
-            self._get_access_token_sync()
-            
-        if not self.access_token:
+        if not self.enabled:
             # Return mock data if Spotify API is not configured
             return self._get_mock_results(query, limit)
 
         try:
-            headers = {
-                "Authorization": f"Bearer {self.access_token}"
-            }
-
-            params = {
-                "q": query,
-                "type": "track",
-                "limit": limit
-            }
-
-            response = requests.get(f"{self.base_url}/search", headers=headers, params=params)
-            
-            if response.status_code == 401:  # Token expired
-                self._get_access_token_sync()
-                if self.access_token:
-                    headers["Authorization"] = f"Bearer {self.access_token}"
-                    response = requests.get(f"{self.base_url}/search", headers=headers, params=params)
-
-            if response.status_code == 200:
-                data = response.json()
-                tracks = data["tracks"]["items"]
-                
-                results = []
-                for track in tracks:
-                    artist_names = [artist["name"] for artist in track["artists"]]
-                    
-                    results.append({
-                        "spotify_id": track["id"],
-                        "title": track["name"],
-                        "artist": ", ".join(artist_names),
-                        "duration": track["duration_ms"],
-                        "thumbnail_url": track["album"]["images"][0]["url"] if track["album"]["images"] else None,
-                        "preview_url": track["preview_url"],
-                        "external_url": track["external_urls"]["spotify"]
-                    })
-                
-                return results
-            else:
-                logger.error(f"Spotify API error: {response.status_code} - {response.text}")
-                return self._get_mock_results(query, limit)
-
+            return await self.search_track_strict(query, limit)
+        except (SpotifyRateLimited, SpotifyUnavailable) as e:
+            logger.error(f"Spotify API error: {e}")
+            return self._get_mock_results(query, limit)
         except Exception as e:
             logger.error(f"Spotify service error: {e}")
             return self._get_mock_results(query, limit)
 
+    async def search_track_strict(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Like search_track but never falls back to mock data (for batch jobs that
+        must know whether the search really ran). Raises SpotifyRateLimited if
+        Spotify keeps answering 429 and SpotifyUnavailable on any other failure
+        """
+        params = {
+            "q": query,
+            "type": "track",
+            "limit": limit
+        }
+
+        try:
+            response = await self._api_get("/search", params)
+        except httpx.HTTPError as e:
+            raise SpotifyUnavailable(str(e)) from e
+
+        if response is None:
+            raise SpotifyUnavailable("no access token")
+        if response.status_code == 429:
+            raise SpotifyRateLimited(self._retry_after(response, 0.0))
+        if response.status_code != 200:
+            raise SpotifyUnavailable(f"HTTP {response.status_code}")
+
+        results = []
+        for track in response.json()["tracks"]["items"]:
+            artist_names = [artist["name"] for artist in track["artists"]]
+
+            results.append({
+                "spotify_id": track["id"],
+                "title": track["name"],
+                "artist": ", ".join(artist_names),
+                "artist_ids": [artist["id"] for artist in track["artists"]],
+                "duration": track["duration_ms"],
+                "thumbnail_url": track["album"]["images"][0]["url"] if track["album"]["images"] else None,
+                "preview_url": track["preview_url"],
+                "external_url": track["external_urls"]["spotify"]
+            })
+
+        return results
+
     async def get_track_features(self, track_id: str) -> Optional[Dict]:
         """Get audio features for a track"""
-        if not self.access_token:
-            self._get_access_token_sync()
-            
-        if not self.access_token:
+        if not self.enabled:
             return None
 
         try:
-            headers = {
-                "Authorization": f"Bearer {self.access_token}"
-            }
+            response = await self._api_get(f"/audio-features/{track_id}")
 
-            response = requests.get(f"{self.base_url}/audio-features/{track_id}", headers=headers)
-            
-            if response.status_code == 200:
+            if response is not None and response.status_code == 200:
                 return response.json()
             else:
-                logger.error(f"Failed to get track features: {response.status_code}")
+                status_code = response.status_code if response is not None else "no token"
+                logger.error(f"Failed to get track features: {status_code}")
                 return None
 
         except Exception as e:
             logger.error(f"Error getting track features: {e}")
             return None
 
+    async def _get_batch(self, path: str, ids: List[str], key: str, max_ids: int) -> Dict[str, Dict]:
+        """
+        Call a Spotify batch endpoint (?ids=a,b,c) in slices of max_ids.
+        Raises SpotifyRateLimited if Spotify keeps answering 429
+        """
+        results: Dict[str, Dict] = {}
+
+        for start in range(0, len(ids), max_ids):
+            batch = ids[start:start + max_ids]
+            response = await self._api_get(path, {"ids": ",".join(batch)})
+
+            if response is None:
+                break
+            if response.status_code == 429:
+                raise SpotifyRateLimited(self._retry_after(response, 0.0))
+            if response.status_code != 200:
+                logger.error(f"Spotify batch {path} error: {response.status_code}")
+                continue
+
+            for item in response.json().get(key, []):
+                if item and item.get("id"):
+                    results[item["id"]] = item
+
+        return results
+
+    async def get_audio_features_batch(self, track_ids: List[str]) -> Dict[str, Dict]:
+        """Audio features for up to 100 tracks per request"""
+        return await self._get_batch("/audio-features", track_ids, "audio_features", 100)
+
+    async def get_tracks_batch(self, track_ids: List[str]) -> Dict[str, Dict]:
+        """Full track objects for up to 50 tracks per request"""
+        return await self._get_batch("/tracks", track_ids, "tracks", 50)
+
+    async def get_artists_batch(self, artist_ids: List[str]) -> Dict[str, Dict]:
+        """Artist objects (with genres) for up to 50 artists per request"""
+        return await self._get_batch("/artists", artist_ids, "artists", 50)
+
     def _get_mock_results(self, query: str, limit: int) -> List[Dict]:
         """Return mock Spotify results when API is not available"""
         mock_results = [
@@ -158,4 +286,4 @@ class SpotifyService:
 
 
 # Global instance
-spotify_service = SpotifyService()
\ No newline at end of file
+spotify_service = SpotifyService()
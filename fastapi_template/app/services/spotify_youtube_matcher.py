@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.models import Song, SpotifyYouTubeLink
+from app.services.youtube_service import youtube_service, YouTubeSearchError
+from app.services.catalog_service import catalog_service
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SpotifyYouTubeMatcher:
+    """
+    Enlaza canciones de Spotify con un video de YouTube una sola vez y
+    guarda el resultado en spotify_youtube_links (también los fallos, para no
+    repetir la búsqueda). Solo se guarda si la búsqueda llegó a la API: un
+    error deja la canción pendiente y una cuota agotada detiene la ejecución.
+    La confianza combina similitud de título, de
+    artista y cercanía de duración
+    """
+
+    TITLE_WEIGHT = 0.5
+    ARTIST_WEIGHT = 0.3
+    DURATION_WEIGHT = 0.2
+    CANDIDATES = 5
+
+    def __init__(self):
+        self.running = False
+        self.last_run: Optional[dict] = None
+        logger.info(" Spotify-YouTube Matcher initialized")
+
+    def linked_youtube_ids(self, db: Session, spotify_ids: List[str]) -> Dict[str, str]:
+        """spotify_id -> youtube_id para los enlaces ya conocidos"""
+        if not spotify_ids:
+            return {}
+        rows = db.query(SpotifyYouTubeLink.spotify_id, SpotifyYouTubeLink.youtube_id).filter(
+            SpotifyYouTubeLink.spotify_id.in_(spotify_ids),
+            SpotifyYouTubeLink.youtube_id != None
+        ).all()
+        return {spotify_id: youtube_id for spotify_id, youtube_id in rows}
+
+    async def run(self) -> dict:
+        if self.running:
+            return {"skipped": "already running"}
+        if not youtube_service.youtube:
+            return {"skipped": "YouTube API not configured"}
+
+        self.running = True
+        result = {"scanned": 0, "linked": 0, "unmatched": 0, "failed": 0}
+        try:
+            # Las consultas (motor síncrono) van en hilos, nunca en el bucle de eventos
+            songs = await asyncio.to_thread(self._pending_songs)
+
+            new_links: List[SpotifyYouTubeLink] = []
+            assignments: Dict[int, str] = {}
+            for song in songs:
+                result["scanned"] += 1
+                try:
+                    youtube_id, confidence = await self.match(song)
+                except YouTubeSearchError as e:
+                    result["failed"] += 1
+                    if e.quota_exceeded:
+                        logger.warning(" Cuota de YouTube agotada, enlace detenido hasta la próxima ejecución")
+                        result["quota_exceeded"] = True
+                        break
+                    logger.error(f"Error buscando '{song.title}' en YouTube: {e}")
+                    continue
+                new_links.append(SpotifyYouTubeLink(
+                    spotify_id=song.spotify_id, youtube_id=youtube_id, confidence=confidence
+                ))
+                if youtube_id:
+                    assignments[song.id] = youtube_id
+                    result["linked"] += 1
+                else:
+                    result["unmatched"] += 1
+
+            await asyncio.to_thread(self._save, new_links, assignments)
+        except Exception as e:
+            logger.error(f"Error enlazando Spotify con YouTube: {e}")
+            result["error"] = str(e)
+        finally:
+            self.running = False
+            self.last_run = result
+
+        logger.info(f" Enlaces Spotify-YouTube: {result}")
+        return result
+
+    async def run_forever(self):
+        """Tarea periódica lanzada desde el lifespan de la app"""
+        while True:
+            await self.run()
+            await asyncio.sleep(settings.YOUTUBE_LINK_INTERVAL_SECONDS)
+
+    def _pending_songs(self) -> List[Song]:
+        """Canciones de Spotify sin video que nunca se han intentado enlazar"""
+        attempted = select(SpotifyYouTubeLink.spotify_id)
+        db = SessionLocal()
+        try:
+            return db.query(Song).filter(
+                Song.spotify_id != None,
+                ~Song.spotify_id.like("mock_%"),
+                (Song.youtube_id == None) | (Song.youtube_id == ""),
+                ~Song.spotify_id.in_(attempted)
+            ).order_by(Song.view_count.desc(), Song.id).limit(settings.YOUTUBE_LINK_BATCH_SIZE).all()
+        finally:
+            db.close()
+
+    def _save(self, new_links: List[SpotifyYouTubeLink], assignments: Dict[int, str]):
+        db = SessionLocal()
+        try:
+            db.add_all(new_links)
+            self._assign_youtube_ids(db, assignments)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def match(self, song: Song) -> Tuple[Optional[str], float]:
+        """
+        Mejor video para la canción: (youtube_id, confianza) o (None, mejor confianza).
+        Lanza YouTubeSearchError si la búsqueda falla
+        """
+        candidates = await youtube_service.search_checked(f"{song.artist} {song.title}", self.CANDIDATES)
+        if not candidates:
+            return None, 0.0
+
+        durations = await youtube_service.get_durations([c["youtube_id"] for c in candidates])
+        best_id, best_score = None, 0.0
+        for candidate in candidates:
+            score = self.score(song, candidate, durations.get(candidate["youtube_id"]))
+            if score > best_score:
+                best_id, best_score = candidate["youtube_id"], score
+
+        if best_score >= settings.YOUTUBE_LINK_MIN_CONFIDENCE:
+            return best_id, round(best_score, 3)
+        return None, round(best_score, 3)
+
+    def score(self, song: Song, candidate: Dict, duration: Optional[int]) -> float:
+        song_artist = catalog_service.normalize_artist(song.artist)
+        song_title = catalog_service.normalize_title(song.title, song.artist)
+        title = catalog_service.normalize_title(candidate["title"], candidate["artist"])
+        artist = catalog_service.normalize_artist(candidate["artist"])
+
+        title_score = SequenceMatcher(None, song_title, title).ratio()
+        artist_score = SequenceMatcher(None, song_artist, artist).ratio()
+        # El canal no siempre es el artista: basta con que aparezca en el título del video
+        if song_artist and song_artist in catalog_service.fold(candidate["title"]):
+            artist_score = max(artist_score, 0.9)
+
+        if song.duration and duration:
+            # 0 s de diferencia = 1.0; 30 s o más = 0.0 (versiones extendidas, videoclips con intro)
+            duration_score = max(0.0, 1 - abs(song.duration - duration) / 30)
+        else:
+            duration_score = 0.5
+
+        return (
+            self.TITLE_WEIGHT * title_score +
+            self.ARTIST_WEIGHT * artist_score +
+            self.DURATION_WEIGHT * duration_score
+        )
+
+    def _assign_youtube_ids(self, db: Session, assignments: Dict[int, str]):
+        """Copia el youtube_id a la canción si ninguna otra lo tiene (youtube_id es único)"""
+        if not assignments:
+            return
+        taken = {
+            youtube_id for (youtube_id,) in db.query(Song.youtube_id).filter(
+                Song.youtube_id.in_(list(assignments.values()))
+            ).all()
+        }
+        updates = []
+        for song_id, youtube_id in assignments.items():
+            if youtube_id not in taken:
+                updates.append({"id": song_id, "youtube_id": youtube_id})
+                taken.add(youtube_id)
+        db.bulk_update_mappings(Song, updates)
+
+
+# Instancia global
+spotify_youtube_matcher = SpotifyYouTubeMatcher()
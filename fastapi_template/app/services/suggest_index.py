@@ -0,0 +1,129 @@
+import bisect
+import logging
+import threading
+from typing import Dict, List, Tuple
+from sqlalchemy.orm import Session
+from app.models.models import Song
+from app.services.catalog_service import catalog_service
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SuggestIndex:
+    """
+    Índice en memoria para autocompletar: un array ordenado de claves
+    normalizadas (título, cada palabra del título en adelante y artista)
+    consultado con bisect. Los resultados se ordenan por view_count. Solo
+    indexa canciones canónicas (una por grupo de casi duplicados)
+    """
+
+    MAX_WORD_SUFFIXES = 4
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._refs: List[Tuple[str, object]] = []  # ("song", id) o ("artist", clave)
+        self._songs: Dict[int, Tuple[str, str, int]] = {}  # id -> (título, artista, vistas)
+        self._artists: Dict[str, List] = {}  # clave -> [nombre, vistas acumuladas]
+        logger.info(" Suggest Index initialized")
+
+    def rebuild(self, db: Session):
+        """Construcción completa desde la base de datos (al arrancar)"""
+        rows = db.query(Song.id, Song.title, Song.artist, Song.view_count).filter(
+            Song.canonical_song_id == None
+        ).all()
+
+        entries = []
+        songs, artists = {}, {}
+        for song_id, title, artist, view_count in rows:
+            songs[song_id] = (title, artist, view_count or 0)
+            entries.extend((key, ("song", song_id)) for key in self._song_keys(title, artist))
+            artist_key = catalog_service.normalize_artist(artist)
+            if artist_key:
+                if artist_key not in artists:
+                    artists[artist_key] = [artist, 0]
+                    entries.append((artist_key, ("artist", artist_key)))
+                artists[artist_key][1] += view_count or 0
+
+        entries.sort(key=lambda entry: entry[0])
+        with self._lock:
+            self._keys = [key for key, _ in entries]
+            self._refs = [ref for _, ref in entries]
+            self._songs, self._artists = songs, artists
+        logger.info(f" Índice de sugerencias: {len(songs)} canciones, {len(artists)} artistas")
+
+    def add_songs(self, songs: List[Song]):
+        """Alta incremental de canciones nuevas (p. ej. desde catalog_service.ingest)"""
+        with self._lock:
+            for song in songs:
+                if song.canonical_song_id or song.id in self._songs:
+                    continue
+                self._songs[song.id] = (song.title, song.artist, song.view_count or 0)
+                for key in self._song_keys(song.title, song.artist):
+                    self._insert(key, ("song", song.id))
+
+                artist_key = catalog_service.normalize_artist(song.artist)
+                if artist_key and artist_key not in self._artists:
+                    self._artists[artist_key] = [song.artist, 0]
+                    self._insert(artist_key, ("artist", artist_key))
+                if artist_key:
+                    self._artists[artist_key][1] += song.view_count or 0
+
+    def record_view(self, song: Song):
+        """Actualiza el peso de una canción tras una reproducción"""
+        with self._lock:
+            entry = self._songs.get(song.id)
+            if not entry:
+                return
+            self._songs[song.id] = (entry[0], entry[1], song.view_count or 0)
+            artist = self._artists.get(catalog_service.normalize_artist(entry[1]))
+            if artist:
+                artist[1] += max(0, (song.view_count or 0) - entry[2])
+
+    def suggest(self, query: str, limit: int = 8) -> List[Dict]:
+        prefix = " ".join(catalog_service.fold(query).split())
+        if len(prefix) < settings.SUGGEST_MIN_CHARS:
+            return []
+
+        candidates: Dict[Tuple[str, object], int] = {}
+        with self._lock:
+            start = bisect.bisect_left(self._keys, prefix)
+            end = min(len(self._keys), start + settings.SUGGEST_MAX_SCAN)
+            for i in range(start, end):
+                if not self._keys[i].startswith(prefix):
+                    break
+                ref = self._refs[i]
+                if ref not in candidates:
+                    candidates[ref] = self._weight(ref)
+
+            ranked = sorted(candidates.items(), key=lambda item: -item[1])[:limit]
+            return [self._suggestion(ref, weight) for ref, weight in ranked]
+
+    def _song_keys(self, title: str, artist: str) -> List[str]:
+        normalized = catalog_service.normalize_title(title, artist)
+        words = normalized.split()
+        # El título completo y desde cada palabra: "me pregunto" encuentra "titi me pregunto"
+        return [" ".join(words[i:]) for i in range(min(len(words), self.MAX_WORD_SUFFIXES))]
+
+    def _insert(self, key: str, ref: Tuple[str, object]):
+        index = bisect.bisect_right(self._keys, key)
+        self._keys.insert(index, key)
+        self._refs.insert(index, ref)
+
+    def _weight(self, ref: Tuple[str, object]) -> int:
+        kind, value = ref
+        if kind == "song":
+            return self._songs[value][2]
+        return self._artists[value][1]
+
+    def _suggestion(self, ref: Tuple[str, object], weight: int) -> Dict:
+        kind, value = ref
+        if kind == "song":
+            title, artist, _ = self._songs[value]
+            return {"type": "song", "song_id": value, "text": title, "artist": artist, "weight": weight}
+        return {"type": "artist", "text": self._artists[value][0], "weight": weight}
+
+
+# Instancia global
+suggest_index = SuggestIndex()
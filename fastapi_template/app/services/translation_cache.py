@@ -0,0 +1,250 @@
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from app.models.models import TranslationCacheEntry
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationCache:
+    """
+    Caché de traducciones en dos niveles: LRU en memoria + tabla persistente.
+    Clave: (sha256 del texto normalizado, idioma origen, idioma destino)
+    """
+
+    def __init__(self):
+        self.max_size = settings.TRANSLATION_CACHE_MEMORY_SIZE
+        self.memory: "OrderedDict[Tuple[str, str, str], Tuple[str, Optional[str]]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        logger.info(" Translation Cache initialized")
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normaliza unicode, saltos de línea y espacios sobrantes"""
+        text = unicodedata.normalize("NFC", text).replace("\r\n", "\n")
+        return "\n".join(line.strip() for line in text.strip().split("\n"))
+
+    def make_key(self, text: str, source_lang: str, target_lang: str) -> Tuple[str, str, str]:
+        text_hash = hashlib.sha256(self.normalize(text).encode("utf-8")).hexdigest()
+        return text_hash, source_lang, target_lang
+
+    def get(self, db: Session, text: str, source_lang: str, target_lang: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Devuelve (traducción, proveedor) o None"""
+        key = self.make_key(text, source_lang, target_lang)
+
+        with self.lock:
+            cached = self.memory.get(key)
+            if cached:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return cached
+
+        entry = db.query(TranslationCacheEntry).filter(
+            TranslationCacheEntry.text_hash == key[0],
+            TranslationCacheEntry.source_lang == source_lang,
+            TranslationCacheEntry.target_lang == target_lang
+        ).first()
+
+        if not entry:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_hit_at = datetime.utcnow()
+        db.commit()
+
+        value = (entry.translated_text, entry.provider)
+        self._remember(key, value)
+        with self.lock:
+            self.db_hits += 1
+        return value
+
+    def contains(self, db: Session, text: str, source_lang: str, target_lang: str) -> bool:
+        """Comprueba si existe la entrada sin contarla como acierto"""
+        key = self.make_key(text, source_lang, target_lang)
+        if key in self.memory:
+            return True
+        return db.query(TranslationCacheEntry.id).filter(
+            TranslationCacheEntry.text_hash == key[0],
+            TranslationCacheEntry.source_lang == source_lang,
+            TranslationCacheEntry.target_lang == target_lang
+        ).first() is not None
+
+    def set(
+        self,
+        db: Session,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        translated_text: str,
+        provider: Optional[str]
+    ):
+        """Guarda una traducción en memoria y en la tabla"""
+        key = self.make_key(text, source_lang, target_lang)
+        self._remember(key, (translated_text, provider))
+
+        try:
+            db.add(TranslationCacheEntry(
+                text_hash=key[0],
+                source_lang=source_lang,
+                target_lang=target_lang,
+                translated_text=translated_text,
+                provider=provider
+            ))
+            db.commit()
+        except IntegrityError:
+            # Otro worker la guardó antes: nos quedamos con la más reciente
+            db.rollback()
+            db.query(TranslationCacheEntry).filter(
+                TranslationCacheEntry.text_hash == key[0],
+                TranslationCacheEntry.source_lang == source_lang,
+                TranslationCacheEntry.target_lang == target_lang
+            ).update(
+                {"translated_text": translated_text, "provider": provider},
+                synchronize_session=False
+            )
+            db.commit()
+
+    def get_many(self, db: Session, texts: List[str], source_lang: str, target_lang: str) -> Dict[str, str]:
+        """Busca varios textos (p. ej. líneas) con una sola consulta a la tabla"""
+        found: Dict[str, str] = {}
+        pending: Dict[str, str] = {}
+
+        with self.lock:
+            for text in texts:
+                key = self.make_key(text, source_lang, target_lang)
+                cached = self.memory.get(key)
+                if cached:
+                    self.memory.move_to_end(key)
+                    found[text] = cached[0]
+                else:
+                    pending[key[0]] = text
+            self.hits += len(found)
+
+        if pending:
+            rows = db.query(TranslationCacheEntry).filter(
+                TranslationCacheEntry.text_hash.in_(list(pending.keys())),
+                TranslationCacheEntry.source_lang == source_lang,
+                TranslationCacheEntry.target_lang == target_lang
+            ).all()
+
+            for row in rows:
+                text = pending[row.text_hash]
+                found[text] = row.translated_text
+                self._remember((row.text_hash, source_lang, target_lang), (row.translated_text, row.provider))
+
+            with self.lock:
+                self.db_hits += len(rows)
+                self.misses += len(pending) - len(rows)
+
+        return found
+
+    def set_many(
+        self,
+        db: Session,
+        translations: Dict[str, str],
+        source_lang: str,
+        target_lang: str,
+        provider: Optional[str]
+    ):
+        """Guarda varias traducciones en un solo commit"""
+        if not translations:
+            return
+
+        entries = {}
+        for text, translated_text in translations.items():
+            key = self.make_key(text, source_lang, target_lang)
+            self._remember(key, (translated_text, provider))
+            entries[key[0]] = translated_text
+
+        existing = {
+            text_hash for (text_hash,) in db.query(TranslationCacheEntry.text_hash).filter(
+                TranslationCacheEntry.text_hash.in_(list(entries.keys())),
+                TranslationCacheEntry.source_lang == source_lang,
+                TranslationCacheEntry.target_lang == target_lang
+            ).all()
+        }
+
+        db.add_all([
+            TranslationCacheEntry(
+                text_hash=text_hash,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                translated_text=translated_text,
+                provider=provider
+            )
+            for text_hash, translated_text in entries.items()
+            if text_hash not in existing
+        ])
+        try:
+            db.commit()
+        except IntegrityError:
+            # Carrera con otro worker: lo que falte se guardará en otra ocasión
+            db.rollback()
+
+    def line_memory(self, db: Session) -> "LineMemory":
+        return LineMemory(self, db)
+
+    def stats(self, db: Session) -> dict:
+        """Estadísticas de uso y de qué proveedor produjo cada entrada"""
+        by_provider = db.query(
+            TranslationCacheEntry.provider,
+            func.count(TranslationCacheEntry.id).label("entries"),
+            func.coalesce(func.sum(TranslationCacheEntry.hit_count), 0).label("hits")
+        ).group_by(TranslationCacheEntry.provider).all()
+
+        with self.lock:
+            return {
+                "memory_entries": len(self.memory),
+                "memory_hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "providers": [
+                    {
+                        "provider": row.provider or "unknown",
+                        "entries": row.entries,
+                        "hits": int(row.hits)
+                    }
+                    for row in by_provider
+                ]
+            }
+
+    def _remember(self, key: Tuple[str, str, str], value: Tuple[str, Optional[str]]):
+        with self.lock:
+            self.memory[key] = value
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_size:
+                self.memory.popitem(last=False)
+
+
+class LineMemory:
+    """
+    Memoria de traducción por líneas ligada a una sesión de BD
+    (interfaz que usa TranslationService.translate_lines)
+    """
+
+    def __init__(self, cache: TranslationCache, db: Session):
+        self.cache = cache
+        self.db = db
+
+    def lookup(self, lines: List[str], source_lang: str, target_lang: str) -> Dict[str, str]:
+        return self.cache.get_many(self.db, lines, source_lang, target_lang)
+
+    def store(self, translations: Dict[str, str], source_lang: str, target_lang: str, provider: Optional[str]):
+        self.cache.set_many(self.db, translations, source_lang, target_lang, provider)
+
+
+# Instancia global
+translation_cache = TranslationCache()
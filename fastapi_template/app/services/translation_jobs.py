@@ -0,0 +1,298 @@
+import re
+import uuid
+import asyncio
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.models import TranslationJobRecord, TranslationJobChunk
+from app.services.translation_service import translation_service
+from app.services.translation_cache import translation_cache
+from app.core.config import settings
+from app.core.streaming import format_frame
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TranslationJob:
+    """Estado de un trabajo leído de la BD (translation_jobs + sus fragmentos)"""
+    id: str
+    user_id: int
+    text: str
+    source_lang: str
+    target_lang: str
+    segments: List[str]
+    results: List[Optional[str]]
+    status: str = "running"  # running | done
+    failed_segments: int = 0
+    providers: Counter = field(default_factory=Counter)
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def completed(self) -> int:
+        return sum(1 for result in self.results if result is not None)
+
+    @property
+    def provider(self) -> Optional[str]:
+        return self.providers.most_common(1)[0][0] if self.providers else None
+
+    def ready_prefix(self) -> List[str]:
+        """Fragmentos ya traducidos en orden, hasta el primer hueco"""
+        ready = []
+        for result in self.results:
+            if result is None:
+                break
+            ready.append(result)
+        return ready
+
+    def to_dict(self) -> dict:
+        ready = self.ready_prefix()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "source_lang": self.source_lang,
+            "target_lang": self.target_lang,
+            "total_chunks": len(self.segments),
+            "completed_chunks": self.completed,
+            "failed_chunks": self.failed_segments,
+            "provider": self.provider,
+            "translated": "\n\n".join(ready),
+        }
+
+
+class TranslationJobManager:
+    """
+    Traducciones como trabajos en segundo plano: se divide el texto en
+    estrofas, cada una se traduce en un executor y el resultado se puede
+    consultar o recibir en streaming a medida que se completa.
+    El estado vive en BD (un registro por fragmento, escrito por el hilo que
+    lo tradujo), así que cualquier worker sirve la consulta y el streaming;
+    los fragmentos solo los traduce el worker que creó el trabajo
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.TRANSLATION_JOB_WORKERS,
+            thread_name_prefix="translation-job"
+        )
+        self.ttl = timedelta(seconds=settings.TRANSLATION_JOB_TTL_SECONDS)
+        logger.info(" Translation Job Manager initialized")
+
+    def submit(self, text: str, target_lang: str, source_lang: str, user_id: int) -> TranslationJob:
+        db = SessionLocal()
+        try:
+            self._expire_jobs(db)
+
+            # El texto completo ya está traducido: el trabajo nace terminado
+            cached = translation_cache.get(db, text, source_lang, target_lang)
+            segments = [text] if cached else self._split_segments(text, settings.TRANSLATION_JOB_SEGMENT_CHARS)
+
+            now = datetime.utcnow()
+            record = TranslationJobRecord(
+                id=uuid.uuid4().hex,
+                user_id=user_id,
+                text=text,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                status="done" if cached else "running",
+                created_at=now,
+                finished_at=now if cached else None
+            )
+            db.add(record)
+            db.flush()
+            db.add_all(
+                TranslationJobChunk(
+                    job_id=record.id,
+                    index=index,
+                    source=segment,
+                    translated=cached[0] if cached else None,
+                    provider=(cached[1] or "cache") if cached else None
+                )
+                for index, segment in enumerate(segments)
+            )
+            db.commit()
+            job_id = record.id
+        finally:
+            db.close()
+
+        if not cached:
+            for index, segment in enumerate(segments):
+                self.executor.submit(self._run_segment, job_id, index, segment, target_lang, source_lang)
+            logger.info(f" Trabajo de traducción {job_id}: {len(segments)} fragmentos")
+
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[TranslationJob]:
+        db = SessionLocal()
+        try:
+            record = db.get(TranslationJobRecord, job_id)
+            if not record:
+                return None
+            chunks = db.execute(
+                select(TranslationJobChunk)
+                .where(TranslationJobChunk.job_id == job_id)
+                .order_by(TranslationJobChunk.index)
+            ).scalars().all()
+        finally:
+            db.close()
+
+        job = TranslationJob(
+            id=record.id,
+            user_id=record.user_id,
+            text=record.text,
+            source_lang=record.source_lang,
+            target_lang=record.target_lang,
+            segments=[chunk.source for chunk in chunks],
+            results=[chunk.translated for chunk in chunks],
+            status=record.status,
+            created_at=record.created_at,
+            finished_at=record.finished_at
+        )
+        for chunk in chunks:
+            if chunk.translated is None:
+                continue
+            if chunk.provider:
+                job.providers[chunk.provider] += 1
+            else:
+                job.failed_segments += 1
+        return job
+
+    async def stream(self, job: TranslationJob, sse: bool = False) -> AsyncIterator[str]:
+        """
+        Emite cada fragmento en orden en cuanto está listo (NDJSON o SSE)
+        y un frame final con el resumen. Relee el trabajo de la BD en cada
+        vuelta, porque lo puede estar traduciendo otro worker
+        """
+        sent = 0
+        total = len(job.results)
+
+        while True:
+            ready = job.ready_prefix()
+            for index in range(sent, len(ready)):
+                yield format_frame({
+                    "type": "chunk",
+                    "index": index,
+                    "total": total,
+                    "text": ready[index]
+                }, sse)
+            sent = len(ready)
+
+            if job.status == "done" and sent >= len(job.results):
+                summary = job.to_dict()
+                summary.pop("translated")
+                summary["type"] = "done"
+                yield format_frame(summary, sse)
+                return
+
+            await asyncio.sleep(settings.TRANSLATION_JOB_POLL_SECONDS)
+            job = await asyncio.to_thread(self.get, job.id) or job
+
+    def _run_segment(self, job_id: str, index: int, segment: str, target_lang: str, source_lang: str):
+        db = SessionLocal()
+        try:
+            try:
+                translated, provider, _ = translation_service.translate_lines(
+                    segment,
+                    target_lang,
+                    source_lang,
+                    translation_cache.line_memory(db)
+                )
+            except Exception as e:
+                logger.error(f"Trabajo {job_id}: fragmento {index} falló: {e}")
+                translated, provider = segment, None
+
+            db.execute(
+                update(TranslationJobChunk).where(
+                    TranslationJobChunk.job_id == job_id,
+                    TranslationJobChunk.index == index
+                ).values(translated=translated, provider=provider)
+            )
+            db.commit()
+
+            pending = db.scalar(
+                select(func.count()).select_from(TranslationJobChunk).where(
+                    TranslationJobChunk.job_id == job_id,
+                    TranslationJobChunk.translated.is_(None)
+                )
+            )
+            if pending:
+                return
+
+            # Varios hilos pueden ver el último fragmento a la vez: solo el
+            # que cambia el estado cierra el trabajo y lo cachea
+            finished_at = datetime.utcnow()
+            result = db.execute(
+                update(TranslationJobRecord).where(
+                    TranslationJobRecord.id == job_id,
+                    TranslationJobRecord.status == "running"
+                ).values(status="done", finished_at=finished_at)
+            )
+            db.commit()
+            if not result.rowcount:
+                return
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Trabajo {job_id}: no se pudo guardar el fragmento {index}: {e}")
+            return
+        finally:
+            db.close()
+
+        job = self.get(job_id)
+        if not job:
+            return
+        elapsed = (job.finished_at - job.created_at).total_seconds()
+        logger.info(f" Trabajo de traducción {job_id} completado en {elapsed:.2f}s")
+
+        if not job.failed_segments:
+            db = SessionLocal()
+            try:
+                translation_cache.set(
+                    db, job.text, job.source_lang, job.target_lang,
+                    "\n\n".join(job.results), job.provider
+                )
+            except Exception as e:
+                logger.error(f"No se pudo cachear el trabajo {job_id}: {e}")
+            finally:
+                db.close()
+
+    def _split_segments(self, text: str, max_chars: int) -> List[str]:
+        """Agrupa estrofas (separadas por líneas en blanco) hasta max_chars"""
+        stanzas = [s.strip() for s in re.split(r"\n\s*\n", text.replace("\r\n", "\n")) if s.strip()]
+        segments = []
+        current = ""
+
+        for stanza in stanzas:
+            if current and len(current) + len(stanza) + 2 > max_chars:
+                segments.append(current)
+                current = stanza
+            else:
+                current = f"{current}\n\n{stanza}" if current else stanza
+
+        if current:
+            segments.append(current)
+        return segments or [text]
+
+    def _expire_jobs(self, db: Session):
+        """
+        Borra los trabajos terminados hace más del TTL y los que siguen sin
+        terminar tras el TTL (el worker que los traducía se cayó)
+        """
+        cutoff = datetime.utcnow() - self.ttl
+        expired = select(TranslationJobRecord.id).where(or_(
+            TranslationJobRecord.finished_at < cutoff,
+            and_(TranslationJobRecord.finished_at.is_(None), TranslationJobRecord.created_at < cutoff)
+        ))
+        # Sin depender de ON DELETE CASCADE (SQLite no aplica las FK por defecto)
+        db.execute(delete(TranslationJobChunk).where(TranslationJobChunk.job_id.in_(expired)))
+        db.execute(delete(TranslationJobRecord).where(TranslationJobRecord.id.in_(expired)))
+
+
+# Instancia global
+translation_job_manager = TranslationJobManager()
@@ -0,0 +1,123 @@
+import time
+import asyncio
+import logging
+from typing import List
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.models import Song, TranslationCacheEntry
+from app.services.translation_service import translation_service
+from app.services.translation_cache import translation_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationMaterializer:
+    """
+    Pre-traduce en segundo plano las letras de las canciones más populares
+    de cada idioma a los idiomas destino más pedidos, con un presupuesto
+    de tiempo y de caracteres por ejecución
+    """
+
+    # El frontend traduce las letras con detección automática del origen
+    SOURCE_LANG = "auto"
+
+    def __init__(self):
+        self.last_run = None
+        logger.info(" Translation Materializer initialized")
+
+    def most_requested_targets(self, db: Session, limit: int) -> List[str]:
+        """Idiomas destino ordenados por traducciones guardadas + aciertos"""
+        requests = (
+            func.count(TranslationCacheEntry.id) + func.coalesce(func.sum(TranslationCacheEntry.hit_count), 0)
+        ).label("requests")
+
+        rows = db.query(
+            TranslationCacheEntry.target_lang,
+            requests
+        ).group_by(
+            TranslationCacheEntry.target_lang
+        ).order_by(
+            requests.desc()
+        ).limit(limit).all()
+
+        targets = [row.target_lang for row in rows]
+        for default in settings.TRANSLATION_PREWARM_DEFAULT_TARGETS:
+            if len(targets) >= limit:
+                break
+            if default not in targets:
+                targets.append(default)
+        return targets
+
+    def popular_songs(self, db: Session, language: str, limit: int) -> List[Song]:
+        """Canciones más vistas del idioma que ya tienen letras guardadas"""
+        songs = db.query(Song).filter(
+            Song.language == language,
+            Song.lyrics.isnot(None)
+        ).order_by(
+            Song.view_count.desc()
+        ).limit(limit * 2).all()
+
+        return [
+            song for song in songs
+            if len(song.lyrics) > 50 and "no disponibles" not in song.lyrics.lower()
+        ][:limit]
+
+    def run_once(self) -> dict:
+        """Una pasada completa; se detiene al agotar el presupuesto"""
+        started = time.monotonic()
+        deadline = started + settings.TRANSLATION_PREWARM_MAX_SECONDS
+        chars_budget = settings.TRANSLATION_PREWARM_MAX_CHARS
+        result = {"translated": 0, "already_cached": 0, "chars_translated": 0, "budget_exhausted": False}
+
+        db = SessionLocal()
+        try:
+            targets = self.most_requested_targets(db, settings.TRANSLATION_PREWARM_TOP_TARGETS)
+            languages = [
+                language for (language,) in db.query(Song.language).filter(Song.language.isnot(None)).distinct().all()
+            ]
+            logger.info(f" Pre-traduciendo top {settings.TRANSLATION_PREWARM_TOP_SONGS} de {languages} a {targets}")
+
+            for language in languages:
+                for song in self.popular_songs(db, language, settings.TRANSLATION_PREWARM_TOP_SONGS):
+                    for target in targets:
+                        if target == language:
+                            continue
+
+                        if time.monotonic() >= deadline or result["chars_translated"] >= chars_budget:
+                            result["budget_exhausted"] = True
+                            return result
+
+                        if translation_cache.contains(db, song.lyrics, self.SOURCE_LANG, target):
+                            result["already_cached"] += 1
+                            continue
+
+                        translated, provider, stats = translation_service.translate_lines(
+                            song.lyrics, target, self.SOURCE_LANG, translation_cache.line_memory(db)
+                        )
+                        result["chars_translated"] += stats["chars_translated"]
+
+                        if provider:
+                            translation_cache.set(db, song.lyrics, self.SOURCE_LANG, target, translated, provider)
+                            result["translated"] += 1
+            return result
+        except Exception as e:
+            logger.error(f"Error en pre-traducción: {e}")
+            result["error"] = str(e)
+            return result
+        finally:
+            db.close()
+            result["elapsed_seconds"] = round(time.monotonic() - started, 2)
+            self.last_run = result
+            logger.info(f" Pre-traducción terminada: {result}")
+
+    async def run_forever(self):
+        """Tarea periódica lanzada desde el lifespan de la app"""
+        while True:
+            await asyncio.to_thread(self.run_once)
+            await asyncio.sleep(settings.TRANSLATION_PREWARM_INTERVAL_SECONDS)
+
+
+# Instancia global
+translation_materializer = TranslationMaterializer()
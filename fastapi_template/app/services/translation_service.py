@@ -1,7 +1,13 @@
 import logging
-from typing import Optional
-import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from deep_translator import GoogleTranslator, LibreTranslator, MyMemoryTranslator
+from deep_translator.exceptions import TooManyRequests, LanguageNotSupportedException
+from app.services.http_client import http_client
+from app.services.language_detector import language_detector
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -11,116 +17,244 @@ class TranslationService:
     Servicio de traducción usando deep-translator (compatible)
     """
     
+    # (nombre, cliente, host para el rate limit compartido, tamaño máximo de fragmento)
+    PROVIDERS = [
+        ("Google Translate", GoogleTranslator, "translate.google.com", 4500),
+        ("LibreTranslate", LibreTranslator, "libretranslate.com", 3000),
+        ("MyMemory", MyMemoryTranslator, "api.mymemory.translated.net", 500),
+    ]
+    
     def __init__(self):
+        # Un pool de hilos por proveedor con su propio límite de paralelismo
+        self.executors = {
+            name: ThreadPoolExecutor(
+                max_workers=settings.TRANSLATION_PARALLELISM.get(name, 1),
+                thread_name_prefix=f"translate-{name.split()[0].lower()}"
+            )
+            for name, _, _, _ in self.PROVIDERS
+        }
+        # Los clientes de deep-translator guardan estado por petición,
+        # así que se reutilizan por hilo y no se comparten entre hilos
+        self._local = threading.local()
         logger.info(" Translation Service initialized")
     
     def translate(self, text: str, target_lang: str = "en", source_lang: str = "auto") -> Optional[str]:
         """
         Traduce texto usando múltiples servicios
         """
+        translated, _ = self.translate_with_provider(text, target_lang, source_lang)
+        return translated
+    
+    def translate_with_provider(
+        self, 
+        text: str, 
+        target_lang: str = "en", 
+        source_lang: str = "auto"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Igual que translate() pero devuelve también el proveedor que tradujo.
+        El proveedor es None si no se tradujo (se devuelve el texto original)
+        """
         if not text or len(text.strip()) == 0:
-            return text
+            return text, None
+        
+        # Detección local: evita traducir lo que ya está en el idioma destino
+        # y ahorra al proveedor detectar el idioma de origen
+        if source_lang == "auto":
+            detected = language_detector.detect_confident(text)
+            if detected and detected == target_lang.split("-")[0].lower():
+                logger.info(f" El texto ya está en {target_lang}, no se traduce")
+                return text, "Language detection"
+            if detected:
+                source_lang = detected
         
         logger.info(f" Traduciendo de {source_lang} a {target_lang}")
         
+        result = self._translate_text(text, target_lang, source_lang)
+        if result:
+            return result
+        
+        logger.warning("⚠️ No se pudo traducir, devolviendo texto original")
+        return text, None
+    
+    def translate_lines(
+        self, 
+        text: str, 
+        target_lang: str = "en", 
+        source_lang: str = "auto",
+        memory=None
+    ) -> Tuple[str, Optional[str], Dict[str, int]]:
+        """
+        Modo memoria de traducción: solo traduce las líneas únicas que no
+        estén ya en `memory` (coros y estribillos se traducen una vez) y
+        reconstruye el texto en el orden original.
+        `memory` debe tener lookup(lines, src, tgt) y store(dict, src, tgt, provider)
+        Devuelve (texto traducido, proveedor, estadísticas). Si alguna línea
+        no se pudo traducir el proveedor es None: el texto queda en parte en
+        el idioma original y no debe guardarse como traducción completa
+        """
+        lines = text.replace("\r\n", "\n").split("\n")
+        unique_lines = list(dict.fromkeys(line.strip() for line in lines if line.strip()))
+        
+        translations = memory.lookup(unique_lines, source_lang, target_lang) if memory else {}
+        missing = [line for line in unique_lines if line not in translations]
+        
+        stats = {
+            "lines": sum(1 for line in lines if line.strip()),
+            "unique_lines": len(unique_lines),
+            "from_memory": len(unique_lines) - len(missing),
+            "chars_total": sum(len(line) for line in lines),
+            "chars_translated": sum(len(line) for line in missing),
+        }
+        logger.info(
+            f" Memoria de traducción: {stats['unique_lines']} líneas únicas de {stats['lines']}, "
+            f"{stats['from_memory']} ya traducidas"
+        )
+        
+        provider = None
+        stats["failed_lines"] = 0
+        for batch in self._batch_lines(missing, settings.TRANSLATION_MEMORY_BATCH_CHARS):
+            new_translations, batch_provider = self._translate_line_batch(batch, target_lang, source_lang)
+            stats["failed_lines"] += sum(1 for line in batch if line not in new_translations)
+            if not new_translations:
+                continue
+            
+            provider = provider or batch_provider
+            translations.update(new_translations)
+            if memory:
+                memory.store(new_translations, source_lang, target_lang, batch_provider)
+        
+        if not provider and stats["from_memory"]:
+            provider = "Translation memory"
+        if stats["failed_lines"]:
+            logger.warning(f"⚠️ {stats['failed_lines']} líneas sin traducir, no se guarda como traducción completa")
+            provider = None
+        
+        result = "\n".join(
+            translations.get(line.strip(), line.strip()) if line.strip() else ""
+            for line in lines
+        )
+        return result, provider, stats
+    
+    def _batch_lines(self, lines: List[str], max_chars: int) -> List[List[str]]:
+        """Agrupa líneas en lotes de como máximo max_chars caracteres"""
+        batches = []
+        current: List[str] = []
+        size = 0
+        
+        for line in lines:
+            if current and size + len(line) + 1 > max_chars:
+                batches.append(current)
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 1
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _translate_line_batch(
+        self, 
+        batch: List[str], 
+        target_lang: str, 
+        source_lang: str
+    ) -> Tuple[Dict[str, str], Optional[str]]:
+        """
+        Traduce un lote de líneas en una sola petición. Si el proveedor no
+        conserva el número de líneas, se traduce línea a línea
+        """
+        translated, provider = self.translate_with_provider("\n".join(batch), target_lang, source_lang)
+        if not provider:
+            return {}, None
         
-        methods = [
-            ("Google Translate", lambda: self._translate_with_google(text, target_lang, source_lang)),
-            ("LibreTranslate", lambda: self._translate_with_libre(text, target_lang, source_lang)),
-            ("MyMemory", lambda: self._translate_with_mymemory(text, target_lang, source_lang)),
+        translated_lines = [line.strip() for line in translated.split("\n") if line.strip()]
+        if len(translated_lines) == len(batch):
+            return dict(zip(batch, translated_lines)), provider
+        
+        logger.info(f"   Lote desalineado ({len(translated_lines)}/{len(batch)} líneas), traduciendo línea a línea")
+        result = {}
+        for line in batch:
+            line_translated, line_provider = self.translate_with_provider(line, target_lang, source_lang)
+            if line_provider:
+                result[line] = line_translated.strip()
+                provider = line_provider
+        return result, provider
+    
+    def _translate_text(
+        self, 
+        text: str, 
+        target_lang: str, 
+        source_lang: str, 
+        provider_index: int = 0
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Traduce los fragmentos del texto en paralelo con un proveedor. Los
+        fragmentos que fallen se reintentan (solos) con el siguiente proveedor.
+        Devuelve (texto, proveedor que tradujo más fragmentos) o None
+        """
+        if provider_index >= len(self.PROVIDERS):
+            return None
+        
+        name, _, _, max_chunk_size = self.PROVIDERS[provider_index]
+        chunks = self._split_text(text, max_chunk_size) if len(text) > max_chunk_size else [text]
+        logger.info(f"   {name}: {len(chunks)} fragmento(s)")
+        
+        futures = [
+            self.executors[name].submit(self._translate_chunk, provider_index, chunk, target_lang, source_lang)
+            for chunk in chunks
         ]
         
-        for method_name, method in methods:
+        translated_chunks = []
+        used = Counter()
+        
+        # Se recorren en orden para que la salida sea determinista
+        for i, (chunk, future) in enumerate(zip(chunks, futures)):
             try:
-                logger.info(f"   Intentando {method_name}...")
-                result = method()
-                
-                if result and len(result) > 0:
-                    logger.info(f"    Traducido con {method_name}")
-                    return result
-                    
+                translated = future.result()
+                if not translated:
+                    raise ValueError("respuesta vacía")
+                translated_chunks.append(translated)
+                used[name] += 1
             except Exception as e:
-                logger.error(f"    {method_name} falló: {e}")
-                continue
+                logger.error(f"    {name} falló en fragmento {i+1}/{len(chunks)}: {e}")
+                fallback = self._translate_text(chunk, target_lang, source_lang, provider_index + 1)
+                if not fallback:
+                    return None
+                translated_chunks.append(fallback[0])
+                used[fallback[1]] += 1
         
-        logger.warning("⚠️ No se pudo traducir, devolviendo texto original")
-        return text
+        return "\n\n".join(translated_chunks), used.most_common(1)[0][0]
     
-    def _translate_with_google(self, text: str, target_lang: str, source_lang: str) -> Optional[str]:
-        """Usa Google Translate vía deep-translator"""
-        try:
-            
-            max_chunk_size = 4500
-            
-            if len(text) > max_chunk_size:
-                chunks = self._split_text(text, max_chunk_size)
-                translated_chunks = []
-                
-                for i, chunk in enumerate(chunks):
-                    logger.info(f"      Traduciendo fragmento {i+1}/{len(chunks)}")
-                    
-                    translator = GoogleTranslator(source=source_lang, target=target_lang)
-                    translated = translator.translate(chunk)
-                    translated_chunks.append(translated)
-                    
-                    time.sleep(0.5)  
-                
-                return "\n\n".join(translated_chunks)
-            else:
-                translator = GoogleTranslator(source=source_lang, target=target_lang)
-                return translator.translate(text)
-                
-        except Exception as e:
-            logger.error(f"Google Translate error: {e}")
-            return None
+    def _translate_chunk(self, provider_index: int, chunk: str, target_lang: str, source_lang: str) -> str:
+        name, translator_class, host, _ = self.PROVIDERS[provider_index]
+        translator = self._client(name, translator_class, source_lang, target_lang)
+        return self._throttled(host, translator, chunk)
     
-    def _translate_with_libre(self, text: str, target_lang: str, source_lang: str) -> Optional[str]:
-        """Usa LibreTranslate"""
-        try:
-            max_chunk_size = 3000
-            
-            if len(text) > max_chunk_size:
-                chunks = self._split_text(text, max_chunk_size)
-                translated_chunks = []
-                
-                for chunk in chunks:
-                    translator = LibreTranslator(source=source_lang, target=target_lang)
-                    translated = translator.translate(chunk)
-                    translated_chunks.append(translated)
-                    time.sleep(0.5)
-                
-                return "\n\n".join(translated_chunks)
-            else:
-                translator = LibreTranslator(source=source_lang, target=target_lang)
-                return translator.translate(text)
-                
-        except Exception as e:
-            logger.error(f"LibreTranslate error: {e}")
-            return None
+    def _client(self, name: str, translator_class, source_lang: str, target_lang: str):
+        """Cliente reutilizable por (proveedor, origen, destino) dentro del hilo actual"""
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+        
+        key = (name, source_lang, target_lang)
+        if key not in clients:
+            try:
+                clients[key] = translator_class(source=source_lang, target=target_lang)
+            except LanguageNotSupportedException:
+                # Algunos proveedores usan otros códigos (p. ej. MyMemory "es-ES")
+                clients[key] = translator_class(source="auto", target=target_lang)
+        return clients[key]
     
-    def _translate_with_mymemory(self, text: str, target_lang: str, source_lang: str) -> Optional[str]:
-        """Usa MyMemory API"""
-        try:
-            max_chunk_size = 500
-            
-            if len(text) > max_chunk_size:
-                chunks = self._split_text(text, max_chunk_size)
-                translated_chunks = []
-                
-                for chunk in chunks:
-                    translator = MyMemoryTranslator(source=source_lang, target=target_lang)
-                    translated = translator.translate(chunk)
-                    translated_chunks.append(translated)
-                    time.sleep(1)  # Rate limiting estricto
-                
-                return "\n\n".join(translated_chunks)
-            else:
-                translator = MyMemoryTranslator(source=source_lang, target=target_lang)
-                return translator.translate(text)
-                
-        except Exception as e:
-            logger.error(f"MyMemory error: {e}")
-            return None
+    def _throttled(self, host: str, translator, text: str) -> str:
+        """Traduce respetando el rate limit del host del proveedor"""
+        with http_client.slot(host) as state:
+            try:
+                translated = translator.translate(text)
+            except TooManyRequests:
+                http_client.penalize(host)
+                raise
+            state.throttled = 0
+            return translated
     
     def _split_text(self, text: str, max_size: int) -> list:
         """Divide texto en fragmentos por líneas"""
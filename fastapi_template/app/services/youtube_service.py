@@ -1,15 +1,34 @@
 import os
+import re
+import time
+import asyncio
 import logging
-from typing import List, Dict, Optional
+import threading
+import httplib2
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+
+class YouTubeSearchError(Exception):
+    """La búsqueda en la API de YouTube falló (quota_exceeded: cuota diaria agotada)"""
+    
+    def __init__(self, message: str, quota_exceeded: bool = False):
+        super().__init__(message)
+        self.quota_exceeded = quota_exceeded
+
+
 class YouTubeService:
     def __init__(self):
         self.api_key = os.getenv("YOUTUBE_API_KEY")
         self.youtube = None
+        self._local = threading.local()
+        # (query, limit, pageToken) -> (expira, resultados, siguiente pageToken); solo resultados reales
+        self._search_cache: OrderedDict = OrderedDict()
         
         logger.info(f" Inicializando YouTube Service...")
         logger.info(f" API Key presente: {'Sí' if self.api_key else 'No'}")
@@ -25,68 +44,206 @@ class YouTubeService:
         else:
             logger.warning(" YouTube API Key NO encontrada en variables de entorno")
     
-    async def search_music(self, query: str, limit: int = 10) -> List[Dict]:
+    async def search_music(self, query: str, limit: int = 10, timeout: Optional[float] = None) -> List[Dict]:
         """Search for music on YouTube with improved song title matching"""
-        logger.info(f"🎵 Buscando en YouTube: '{query}' (limit: {limit})")
+        results, _ = await self.search_page(query, limit, timeout=timeout)
+        return results
+    
+    async def search_page(
+        self, query: str, limit: int = 10, page_token: Optional[str] = None, timeout: Optional[float] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Una página de resultados y el pageToken de la siguiente (None si no hay más).
+        timeout: segundos de espera del socket en la llamada HTTP (None: los del cliente)
+        """
+        logger.info(f"🎵 Buscando en YouTube: '{query}' (limit: {limit}, page: {page_token or 1})")
         
         if not self.youtube:
             logger.warning(" YouTube API no disponible, usando datos mock")
-            return self._get_mock_youtube_results(query, limit)
+            return self._get_mock_youtube_results(query, limit), None
+        
+        key = self._cache_key(query, limit, page_token)
+        cached = self._search_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._search_cache.move_to_end(key)
+            logger.info(f" Búsqueda servida desde caché: '{query}'")
+            return cached[1], cached[2]
+        
+        # El cliente de Google es bloqueante: se ejecuta en un hilo para no
+        # frenar el event loop. Un deadline con asyncio.wait_for solo deja de
+        # esperar: el hilo sigue hasta que la petición HTTP termina, así que
+        # quien tenga deadline debe pasarlo también como timeout. La cuota se
+        # gasta igual si la petición llegó a YouTube
+        results, next_token, ok = await asyncio.to_thread(self._search_sync, query, limit, page_token, timeout)
+        if ok:
+            self._cache_search(key, results, next_token)
+        return results, next_token
+    
+    async def search_checked(self, query: str, limit: int = 10, refresh: bool = False) -> List[Dict]:
+        """
+        Como search_music pero sin datos mock, para procesos en segundo plano que
+        guardan el resultado: lanza YouTubeSearchError si la API no responde.
+        Con refresh=True ignora la caché y renueva la entrada
+        """
+        if not self.youtube:
+            raise YouTubeSearchError("YouTube API no disponible")
+        
+        key = self._cache_key(query, limit)
+        cached = self._search_cache.get(key)
+        if cached and cached[0] > time.monotonic() and not refresh:
+            self._search_cache.move_to_end(key)
+            return cached[1]
         
         try:
-            
-            # Esto permite encontrar canciones específicas por nombre
-            search_query = query
-            logger.info(f"🔍 Query de búsqueda: {search_query}")
-            
-            search_response = self.youtube.search().list(
-                q=search_query,
-                part='id,snippet',
-                maxResults=limit,
-                type='video',
-                videoCategoryId='10',  
-                order='relevance',  
-                safeSearch='none'
-            ).execute()
-            
-            results = []
-            for item in search_response.get('items', []):
-                if 'videoId' in item['id']:
-                    video_id = item['id']['videoId']
-                    title = item['snippet']['title']
-                    channel = item['snippet']['channelTitle']
-                    
-                    
-                    thumbnails = item['snippet']['thumbnails']
-                    thumbnail = (
-                        thumbnails.get('high', {}).get('url') or
-                        thumbnails.get('medium', {}).get('url') or
-                        thumbnails.get('default', {}).get('url')
-                    )
-                    
-                    
-                    artist = self._extract_artist_name(title, channel)
-                    
-                    result = {
-                        'youtube_id': video_id,
-                        'title': title,
-                        'artist': artist,
-                        'thumbnail_url': thumbnail
-                    }
-                    results.append(result)
-                    logger.info(f" Encontrado: {title} por {artist} (ID: {video_id})")
-            
-            logger.info(f" Total encontrados en YouTube: {len(results)}")
-            return results
+            results, next_token = await asyncio.to_thread(self._search_api, query, limit, None)
+        except HttpError as e:
+            content = (e.content or b"").decode("utf-8", "ignore").lower()
+            quota = "quotaexceeded" in content or "dailylimitexceeded" in content
+            raise YouTubeSearchError(f"YouTube API HttpError {e.resp.status}", quota_exceeded=quota) from e
+        except Exception as e:
+            raise YouTubeSearchError(f"YouTube service error: {e}") from e
+        
+        self._cache_search(key, results, next_token)
+        return results
+    
+    def cache_ttl_left(self, query: str, limit: int = 10) -> float:
+        """Segundos que le quedan a la búsqueda en caché (0 si no está)"""
+        cached = self._search_cache.get(self._cache_key(query, limit))
+        return max(cached[0] - time.monotonic(), 0.0) if cached else 0.0
+    
+    def _cache_key(self, query: str, limit: int, page_token: Optional[str] = None):
+        return (" ".join(query.lower().split()), limit, page_token)
+    
+    def _cache_search(self, key, results: List[Dict], next_token: Optional[str]):
+        self._search_cache[key] = (
+            time.monotonic() + settings.YOUTUBE_SEARCH_CACHE_TTL_SECONDS, results, next_token
+        )
+        self._search_cache.move_to_end(key)
+        while len(self._search_cache) > settings.YOUTUBE_SEARCH_CACHE_SIZE:
+            self._search_cache.popitem(last=False)
+    
+    def _client(self):
+        """
+        Cliente por hilo: el transporte httplib2 del cliente de Google
+        no es seguro entre hilos
+        """
+        client = getattr(self._local, "youtube", None)
+        if client is None:
+            client = build('youtube', 'v3', developerKey=self.api_key)
+            self._local.youtube = client
+        return client
+    
+    def _http(self, timeout: Optional[float]) -> Optional[httplib2.Http]:
+        """Transporte httplib2 por hilo con ese timeout (None: el del cliente)"""
+        if timeout is None:
+            return None
+        transports = getattr(self._local, "http", None)
+        if transports is None:
+            transports = self._local.http = {}
+        if timeout not in transports:
+            transports[timeout] = httplib2.Http(timeout=timeout)
+        return transports[timeout]
+    
+    def _search_sync(
+        self, query: str, limit: int, page_token: Optional[str] = None, timeout: Optional[float] = None
+    ) -> Tuple[List[Dict], Optional[str], bool]:
+        """Búsqueda bloqueante: (resultados, siguiente pageToken, True si vienen de la API)"""
+        try:
+            results, next_token = self._search_api(query, limit, page_token, timeout)
+            return results, next_token, True
             
         except HttpError as e:
             logger.error(f" YouTube API HttpError: {e}")
             logger.error(f"Detalles: {e.content if hasattr(e, 'content') else 'N/A'}")
-            return self._get_mock_youtube_results(query, limit)
+            return self._get_mock_youtube_results(query, limit), None, False
         except Exception as e:
             logger.error(f" YouTube service error: {e}")
             logger.error(f"Tipo de error: {type(e).__name__}")
-            return self._get_mock_youtube_results(query, limit)
+            return self._get_mock_youtube_results(query, limit), None, False
+    
+    def _search_api(
+        self, query: str, limit: int, page_token: Optional[str] = None, timeout: Optional[float] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Llamada a search().list; los errores de la API se propagan"""
+        # Esto permite encontrar canciones específicas por nombre
+        search_query = query
+        logger.info(f"🔍 Query de búsqueda: {search_query}")
+        
+        search_response = self._client().search().list(
+            q=search_query,
+            part='id,snippet',
+            maxResults=limit,
+            type='video',
+            videoCategoryId='10',  
+            order='relevance',  
+            safeSearch='none',
+            pageToken=page_token
+        ).execute(http=self._http(timeout))
+        
+        results = []
+        for item in search_response.get('items', []):
+            if 'videoId' in item['id']:
+                video_id = item['id']['videoId']
+                title = item['snippet']['title']
+                channel = item['snippet']['channelTitle']
+                
+                
+                thumbnails = item['snippet']['thumbnails']
+                thumbnail = (
+                    thumbnails.get('high', {}).get('url') or
+                    thumbnails.get('medium', {}).get('url') or
+                    thumbnails.get('default', {}).get('url')
+                )
+                
+                
+                artist = self._extract_artist_name(title, channel)
+                
+                result = {
+                    'youtube_id': video_id,
+                    'title': title,
+                    'artist': artist,
+                    'thumbnail_url': thumbnail
+                }
+                results.append(result)
+                logger.info(f" Encontrado: {title} por {artist} (ID: {video_id})")
+        
+        logger.info(f" Total encontrados en YouTube: {len(results)}")
+        return results, search_response.get('nextPageToken')
+    
+    async def get_durations(self, video_ids: List[str]) -> Dict[str, int]:
+        """Duración en segundos de varios videos (videos().list admite 50 ids por llamada)"""
+        video_ids = [video_id for video_id in video_ids if not video_id.startswith('mock_')]
+        if not self.youtube or not video_ids:
+            return {}
+        return await asyncio.to_thread(self._durations_sync, video_ids)
+    
+    def _durations_sync(self, video_ids: List[str]) -> Dict[str, int]:
+        durations = {}
+        for start in range(0, len(video_ids), 50):
+            batch = video_ids[start:start + 50]
+            try:
+                response = self._client().videos().list(
+                    part='contentDetails',
+                    id=','.join(batch),
+                    maxResults=len(batch)
+                ).execute()
+            except Exception as e:
+                logger.error(f" Error obteniendo duraciones: {e}")
+                continue
+            
+            for item in response.get('items', []):
+                seconds = self._parse_duration(item.get('contentDetails', {}).get('duration', ''))
+                if seconds:
+                    durations[item['id']] = seconds
+        return durations
+    
+    def _parse_duration(self, value: str) -> Optional[int]:
+        """Duración ISO 8601 de YouTube (PT1H3M25S) a segundos"""
+        match = re.fullmatch(r'P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', value or '')
+        if not match:
+            return None
+        days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+        return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
     
     def _extract_artist_name(self, title: str, channel: str) -> str:
         """
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from alembic.config import Config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Set before anything imports app.database: the tests get a throwaway SQLite
+# database unless TEST_DATABASE_URL points them somewhere else (e.g. Postgres)
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db"
+)
+
+
+@pytest.fixture(scope="session")
+def alembic_config() -> Config:
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    return config
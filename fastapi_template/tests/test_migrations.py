@@ -0,0 +1,80 @@
+"""
+alembic upgrade head on databases that existed before the migrations: the
+committed music_api.db (created by create_all at the baseline, without
+canonical_song_id) and one created by create_all on the current models.
+Both must end up with the schema of a database migrated from scratch.
+"""
+import os
+import shutil
+
+import pytest
+from alembic import command
+from sqlalchemy import create_engine, inspect, text
+from app.models.models import Base
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def upgrade(alembic_config, url: str):
+    engine = create_engine(url)
+    try:
+        with engine.begin() as connection:
+            alembic_config.attributes["connection"] = connection
+            command.upgrade(alembic_config, "head")
+    finally:
+        alembic_config.attributes.pop("connection", None)
+        engine.dispose()
+
+
+def schema(url: str) -> dict:
+    engine = create_engine(url)
+    try:
+        inspector = inspect(engine)
+        return {
+            table: (
+                sorted(column["name"] for column in inspector.get_columns(table)),
+                sorted(index["name"] for index in inspector.get_indexes(table)),
+            )
+            for table in inspector.get_table_names()
+            if not table.startswith("songs_fts")
+        }
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def fresh_schema(alembic_config, tmp_path):
+    url = f"sqlite:///{tmp_path / 'fresh.db'}"
+    upgrade(alembic_config, url)
+    return schema(url)
+
+
+def test_upgrade_pre_alembic_baseline_database(alembic_config, tmp_path, fresh_schema):
+    path = tmp_path / "music_api.db"
+    shutil.copy(os.path.join(ROOT, "music_api.db"), path)
+    url = f"sqlite:///{path}"
+
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        songs_before = connection.scalar(text("SELECT count(*) FROM songs"))
+    engine.dispose()
+
+    upgrade(alembic_config, url)
+
+    assert schema(url) == fresh_schema
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        assert connection.scalar(text("SELECT count(*) FROM songs")) == songs_before
+        assert connection.scalar(text("SELECT version_num FROM alembic_version")) is not None
+    engine.dispose()
+
+
+def test_upgrade_database_created_by_the_app(alembic_config, tmp_path, fresh_schema):
+    url = f"sqlite:///{tmp_path / 'create_all.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    upgrade(alembic_config, url)
+
+    assert schema(url) == fresh_schema
@@ -0,0 +1,93 @@
+"""
+EXPLAIN the hot queries on a database migrated to head and fail if any of
+them reads a table with a full scan instead of an index.
+
+On Postgres (TEST_DATABASE_URL=postgresql://...) sequential scans are
+disabled for the transaction, so a "Seq Scan" in the plan means no index can
+serve the query (small tables would otherwise always be scanned).
+"""
+import json
+
+import pytest
+from alembic import command
+from app.database import engine
+from app.api.v1.admin import api_usage_stmt
+from app.api.v1.music import trending_stmt
+from app.services.query_log import query_log
+from app.services.recommendation_service import recommendation_service as recommendations
+
+
+def hot_queries():
+    """The statements the services and endpoints run, built by their own code"""
+    return {
+        # recommendation_service
+        "popular recommendations": recommendations.popular_stmt("es", 40),
+        "trending recommendations": recommendations.trending_stmt("es", 10),
+        "similar artist recommendations": recommendations.artist_songs_stmt("bunny", "es", [1, 2, 3], 3),
+        "diverse recommendations": recommendations.diverse_stmt("es", 5),
+        "user playlist history": recommendations.playlist_history_stmt(1),
+        "user recommendation history": recommendations.recommendation_history_stmt(1),
+        # music / admin
+        "trending by language": trending_stmt("es", 20),
+        "trending": trending_stmt(None, 20),
+        "api usage stats": api_usage_stmt(7),
+        # query_log
+        "top queries by language": query_log.top_queries_stmt("es", 24, 20),
+        "top queries": query_log.top_queries_stmt(None, 24, 20),
+    }
+
+
+def stops_at_limit(sql: str) -> bool:
+    """
+    Whether the LIMIT can end an index walk early. With a GROUP BY every row
+    is read before the limit applies, so walking a whole index is a full scan
+    """
+    return " LIMIT " in sql and " GROUP BY " not in sql
+
+
+def sqlite_full_scans(conn, sql: str):
+    details = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+    # "SCAN songs" reads the whole table; "SCAN songs USING INDEX ..." walks a
+    # whole index in order, which is only cheap when a LIMIT stops it early
+    full_scans = [
+        detail for detail in details
+        if detail.startswith("SCAN ") and "CONSTANT ROW" not in detail
+        and not (" USING " in detail and stops_at_limit(sql))
+    ]
+    return full_scans, details
+
+
+def postgres_full_scans(conn, sql: str):
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+
+    nodes, stack = [], [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get("Plans", []))
+    full_scans = [f"Seq Scan on {node['Relation Name']}" for node in nodes if node["Node Type"] == "Seq Scan"]
+    details = [node["Node Type"] + (f" on {node['Relation Name']}" if "Relation Name" in node else "") for node in nodes]
+    return full_scans, details
+
+
+@pytest.fixture(scope="module")
+def migrated_engine(alembic_config):
+    command.upgrade(alembic_config, "head")
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name", list(hot_queries()))
+def test_hot_query_uses_an_index(migrated_engine, name):
+    stmt = hot_queries()[name]
+    sql = str(stmt.compile(dialect=migrated_engine.dialect, compile_kwargs={"literal_binds": True}))
+
+    with migrated_engine.connect() as conn, conn.begin():
+        if migrated_engine.dialect.name == "postgresql":
+            full_scans, plan = postgres_full_scans(conn, sql)
+        else:
+            full_scans, plan = sqlite_full_scans(conn, sql)
+
+    assert not full_scans, f"{name} does a full scan:\n  " + "\n  ".join(plan)
@@ -0,0 +1,133 @@
+"""
+Concurrent writers through WriteSerializedSession on a file SQLite database.
+busy_timeout is cut to 100 ms and every writer holds its transaction open
+longer than that, so any writer that got past the gate while another one
+had written would fail with "database is locked".
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.core.sqlite_profile import WriteSerializedSession, apply_pragmas, track_writes, write_gate
+from app.models.models import Base, Song
+
+HOLD_SECONDS = 0.2
+
+
+@pytest.fixture
+def gated_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_BUSY_TIMEOUT_MS", 100)
+    # A fresh lock per test: each asyncio.run has its own event loop
+    monkeypatch.setattr(write_gate, "_lock", None)
+    path = tmp_path / "write_gate.db"
+
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    apply_pragmas(async_engine.sync_engine)
+    track_writes(async_engine.sync_engine)
+    yield async_sessionmaker(
+        async_engine, class_=WriteSerializedSession, autoflush=False, expire_on_commit=False
+    ), async_engine
+
+
+def count_songs(session) -> int:
+    return session.query(Song).count()
+
+
+def add_song(session, title: str, commit: bool):
+    session.add(Song(title=title, artist="gate"))
+    session.flush()
+    if commit:
+        session.commit()
+
+
+async def flush_writer(factory, index):
+    async with factory() as db:
+        db.add(Song(title=f"flush-{index}", artist="gate"))
+        await db.flush()
+        await asyncio.sleep(HOLD_SECONDS)
+        await db.commit()
+
+
+async def dml_writer(factory, index):
+    async with factory() as db:
+        await db.execute(insert(Song).values(title=f"dml-{index}", artist="gate"))
+        await asyncio.sleep(HOLD_SECONDS)
+        await db.execute(update(Song).where(Song.title == f"dml-{index}").values(view_count=1))
+        await db.commit()
+
+
+async def run_sync_committing_writer(factory, index):
+    async with factory() as db:
+        await db.run_sync(count_songs)
+        await db.run_sync(add_song, f"run-sync-{index}", True)
+        await asyncio.sleep(HOLD_SECONDS)
+
+
+async def run_sync_open_writer(factory, index):
+    async with factory() as db:
+        await db.run_sync(add_song, f"run-sync-open-{index}", False)
+        await asyncio.sleep(HOLD_SECONDS)
+        await db.commit()
+
+
+WRITERS = [flush_writer, dml_writer, run_sync_committing_writer, run_sync_open_writer]
+
+
+def test_concurrent_writers_never_hit_a_locked_database(gated_db):
+    factory, async_engine = gated_db
+
+    async def main():
+        try:
+            await asyncio.gather(*(
+                writer(factory, index) for index in range(3) for writer in WRITERS
+            ))
+            async with factory() as db:
+                return await db.scalar(select(func.count()).select_from(Song))
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(main()) == 3 * len(WRITERS)
+    assert not write_gate.lock.locked()
+
+
+def test_read_only_run_sync_never_takes_the_gate(gated_db):
+    factory, async_engine = gated_db
+
+    async def main():
+        try:
+            async with factory() as db:
+                before = write_gate.acquisitions
+                await db.run_sync(count_songs)
+                await db.execute(select(Song).limit(1))
+                await db.run_sync(count_songs)
+                held = db._holds_gate
+                await db.commit()
+                return write_gate.acquisitions - before, held
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(main()) == (0, False)
+
+
+def test_run_sync_keeps_the_gate_for_an_open_write(gated_db):
+    factory, async_engine = gated_db
+
+    async def main():
+        try:
+            async with factory() as db:
+                await db.run_sync(add_song, "committed", True)
+                after_commit = db._holds_gate
+                await db.run_sync(add_song, "open", False)
+                while_open = db._holds_gate, write_gate.lock.locked()
+                await db.commit()
+                return after_commit, while_open, write_gate.lock.locked()
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(main()) == (False, (True, True), False)